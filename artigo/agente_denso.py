@@ -0,0 +1,107 @@
+import random
+from collections import defaultdict
+import numpy as np
+
+# AGENTE Q-LEARNING COM TABELA DENSA
+# Mesma regra de atualização do QLearningAgent, mas a Tabela Q é um array
+# float32 (locais × períodos × ações) indexado pelos códigos das categorias,
+# em vez de um dicionário de dicionários com chaves f-string.
+#
+# Ações que o agente ainda não aprendeu num estado ficam com -inf. Assim o
+# comportamento do dicionário é preservado: o argmax e o max(Q(s')) só olham
+# ações já aprendidas, e um estado sem nada aprendido vale 0.
+
+class QLearningAgentDenso:
+    def __init__(self, actions, locations, periods, alpha=0.1, gamma=0.9, epsilon=0.1):
+        self.actions = list(actions)
+        self.locations = list(locations)
+        self.periods = list(periods)
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+
+        self.indice_local = {loc: i for i, loc in enumerate(self.locations)}
+        self.indice_periodo = {per: i for i, per in enumerate(self.periods)}
+        self.indice_acao = {acao: i for i, acao in enumerate(self.actions)}
+
+        self.q = np.full((len(self.locations), len(self.periods), len(self.actions)),
+                         -np.inf, dtype=np.float32)
+        # Nº de atualizações de cada (local, período, ação): peso na fusão de tabelas
+        self.visitas = np.zeros(self.q.shape, dtype=np.int32)
+
+    def expandir(self, locations=(), periods=()):
+        """
+        Acrescenta locais/períodos novos ao fim dos vocabulários (os códigos
+        antigos não mudam). As linhas novas começam sem nada aprendido (-inf).
+        Retorna o nº de locais e de períodos acrescentados.
+        """
+        novos_loc = [l for l in dict.fromkeys(locations) if l not in self.indice_local]
+        novos_per = [p for p in dict.fromkeys(periods) if p not in self.indice_periodo]
+        if not novos_loc and not novos_per:
+            return 0, 0
+        n_loc, n_per, _ = self.q.shape
+        for loc in novos_loc:
+            self.indice_local[loc] = len(self.locations)
+            self.locations.append(loc)
+        for per in novos_per:
+            self.indice_periodo[per] = len(self.periods)
+            self.periods.append(per)
+
+        forma = (len(self.locations), len(self.periods), len(self.actions))
+        q = np.full(forma, -np.inf, dtype=np.float32)
+        visitas = np.zeros(forma, dtype=np.int32)
+        q[:n_loc, :n_per] = self.q
+        visitas[:n_loc, :n_per] = self.visitas
+        self.q, self.visitas = q, visitas
+        return len(novos_loc), len(novos_per)
+
+    # --- API por códigos (caminho rápido) ---
+    def choose_action_idx(self, location_id, period_id):
+        """Epsilon-greedy sobre os códigos; retorna o índice da ação."""
+        if random.random() < self.epsilon:
+            return random.randrange(len(self.actions))
+        linha = self.q[location_id, period_id]
+        melhor = int(linha.argmax())
+        if linha[melhor] == -np.inf:  # estado ainda sem nada aprendido
+            return random.randrange(len(self.actions))
+        return melhor
+
+    def learn_idx(self, location_id, period_id, action_id, reward, next_location_id, next_period_id):
+        current_q = self.q[location_id, period_id, action_id]
+        if current_q == -np.inf:
+            current_q = 0.0
+        max_next_q = self.q[next_location_id, next_period_id].max()
+        if max_next_q == -np.inf:
+            max_next_q = 0.0
+        self.q[location_id, period_id, action_id] = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
+        self.visitas[location_id, period_id, action_id] += 1
+
+    # --- API antiga (estados em dicionário), para quem ainda usa ---
+    def codificar(self, state):
+        return self.indice_local[state['Location']], self.indice_periodo[state['Time']]
+
+    def get_state_key(self, state):
+        return f"{state['Location']}_{state['Time']}"
+
+    def choose_action(self, state):
+        return self.actions[self.choose_action_idx(*self.codificar(state))]
+
+    def learn(self, state, action, reward, next_state):
+        self.learn_idx(*self.codificar(state), self.indice_acao[action], reward, *self.codificar(next_state))
+
+    def melhor_acao(self, state):
+        """Retorna (ação, valor Q) da política gulosa, ou None se o estado não foi aprendido."""
+        linha = self.q[self.codificar(state)]
+        melhor = int(linha.argmax())
+        if linha[melhor] == -np.inf:
+            return None
+        return self.actions[melhor], float(linha[melhor])
+
+    @property
+    def q_table(self):
+        """Cópia da tabela no formato antigo: {'Local_Período': {ação: Q}} (só o que foi aprendido)."""
+        tabela = defaultdict(lambda: defaultdict(float))
+        for l, p, a in zip(*np.nonzero(self.q != -np.inf)):
+            chave = f"{self.locations[l]}_{self.periods[p]}"
+            tabela[chave][self.actions[a]] = float(self.q[l, p, a])
+        return tabela
@@ -0,0 +1,77 @@
+from collections import namedtuple
+import numpy as np
+
+# AMOSTRADOR DE TRANSIÇÕES
+# Substitui o df.sample(1) por passo: sorteia de uma vez, com um Generator
+# do NumPy com semente, os índices de estado e de próximo estado de uma época
+# inteira e devolve tudo já codificado (códigos de local/período).
+#
+# Modos:
+#   'uniforme'      -> toda linha (check-in) tem a mesma chance
+#   'popularidade'  -> linha com peso proporcional à popularidade da sua categoria.
+#                      Como o sorteio uniforme de linhas já escolhe cada categoria
+#                      na proporção da sua contagem, aqui a categoria c sai com
+#                      probabilidade contagem(c)² / Σ contagem²: o peso é ao
+#                      quadrado de propósito (categorias populares ainda mais
+#                      frequentes); sortear a categoria pela contagem e depois
+#                      uma linha dela seria igual ao 'uniforme'
+#   'estratificado' -> primeiro sorteia o usuário (todos com a mesma chance),
+#                      depois um check-in desse usuário
+
+Transicoes = namedtuple('Transicoes', ['indice', 'loc', 'per', 'indice_prox', 'loc_prox', 'per_prox'])
+
+class AmostradorTransicoes:
+    MODOS = ('uniforme', 'popularidade', 'estratificado')
+
+    def __init__(self, loc_ids, per_ids, user_ids=None, modo='uniforme', semente=None):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de amostragem inválido: {modo!r} (use um de {self.MODOS})")
+        if modo == 'estratificado' and user_ids is None:
+            raise ValueError("O modo 'estratificado' precisa dos user_ids.")
+
+        self.loc_ids = np.asarray(loc_ids)
+        self.per_ids = np.asarray(per_ids)
+        self.modo = modo
+        self.rng = np.random.default_rng(semente)
+        self.n = len(self.loc_ids)
+
+        if modo == 'popularidade':
+            # Peso da linha = contagem da categoria -> categoria com prob. ∝ contagem²
+            contagens = np.bincount(self.loc_ids)
+            pesos = contagens[self.loc_ids].astype(np.float64)
+            self._cdf = np.cumsum(pesos)
+            self._cdf /= self._cdf[-1]
+        elif modo == 'estratificado':
+            # Linhas agrupadas por usuário (estilo CSR): ordem + início/tamanho de cada grupo
+            _, grupos = np.unique(np.asarray(user_ids), return_inverse=True)
+            self._ordem = np.argsort(grupos, kind='stable')
+            self._tamanhos = np.bincount(grupos)
+            self._inicios = np.concatenate([[0], np.cumsum(self._tamanhos)[:-1]])
+
+    def sortear_indices(self, n):
+        """Sorteia n índices de linha segundo o modo."""
+        if self.modo == 'uniforme':
+            return self.rng.integers(0, self.n, size=n)
+        if self.modo == 'popularidade':
+            return np.searchsorted(self._cdf, self.rng.random(n), side='right').clip(max=self.n - 1)
+        usuarios = self.rng.integers(0, len(self._tamanhos), size=n)
+        deslocamento = (self.rng.random(n) * self._tamanhos[usuarios]).astype(np.int64)
+        return self._ordem[self._inicios[usuarios] + deslocamento]
+
+    def sortear_epoca(self, n=None):
+        """Estados e próximos estados de uma época inteira (n transições; padrão = nº de linhas)."""
+        n = self.n if n is None else n
+        indice = self.sortear_indices(n)
+        indice_prox = self.sortear_indices(n)
+        return Transicoes(indice, self.loc_ids[indice], self.per_ids[indice],
+                          indice_prox, self.loc_ids[indice_prox], self.per_ids[indice_prox])
+
+    def lotes(self, n, tamanho_lote=65536):
+        """
+        Gerador de lotes de Transicoes para n transições no total. Os índices
+        são sorteados uma época (self.n transições) por vez.
+        """
+        for inicio_epoca in range(0, n, self.n):
+            epoca = self.sortear_epoca(min(self.n, n - inicio_epoca))
+            for inicio in range(0, len(epoca.indice), tamanho_lote):
+                yield Transicoes(*(campo[inicio:inicio + tamanho_lote] for campo in epoca))
@@ -0,0 +1,357 @@
+import io
+import os
+import time
+import argparse
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+import artigo2
+import checkpoint_q
+import hotspots_espaciais
+from agente_denso import QLearningAgentDenso
+from amostrador import AmostradorTransicoes
+from indice_trajetorias import IndiceTrajetorias, AmostradorTrajetorias
+from ingestao_streaming import ler_cabecalho, TAMANHO_FAIXA
+from treinador_lote import TreinadorLote
+
+# APRENDIZADO ONLINE (INCREMENTAL)
+# O log de check-ins cresce o dia todo; em vez de recarregar o CSV inteiro e
+# treinar do zero, este modo lê só o que foi acrescentado desde a última vez:
+#   - a fonte é um CSV (lido a partir da posição em bytes salva) ou uma pasta
+#     de blocos .csv (cada arquivo com a sua posição; arquivos novos começam do 0)
+#   - uma linha ainda sendo escrita (sem '\n' no fim) fica para a próxima leitura
+#   - as contagens por categoria e o conjunto de hotspots são atualizados no
+#     lugar; só as linhas da matriz de recompensa que mudaram são recalculadas
+#   - categorias novas entram no fim do vocabulário (a Tabela Q ganha linhas)
+#   - o Q-Learning roda só sobre as transições das linhas novas, em cima da
+#     tabela que já existe
+#
+# Tudo (tabela, vocabulários, contagens e posições) fica no mesmo checkpoint
+# .npcq, gravado de forma atômica a cada faixa lida: se o processo cair, a
+# tabela e as posições continuam coerentes entre si. O custo de cada rodada é
+# proporcional às linhas novas (mais o tamanho do vocabulário), não ao histórico.
+#
+# Hotspots: o modo (e raio/mínimo/bônus) vem do checkpoint. No 'espacial', o
+# estado online guarda, por local, o nº de check-ins e a soma das coordenadas;
+# as linhas novas só somam nesses acumuladores (locais novos entram no fim) e os
+# hotspots são recalculados sobre os pontos dos locais (posição média, peso =
+# check-ins), como no treino completo (artigo2.py): custo proporcional às linhas
+# novas mais o nº de locais, nunca ao histórico. Na adoção de um checkpoint do
+# treino completo os acumuladores são montados na contagem do histórico, então
+# os dois treinos puxam a tabela para a mesma recompensa. Um checkpoint online
+# antigo, sem os acumuladores, continua com o bônus congelado (com aviso).
+#
+# Obs: nos modos de amostragem 'trajetoria'/'episodico' só entram os pares
+# (check-in -> próximo check-in) que estão dentro da mesma leitura.
+#
+# Uso: python aprendizado_online.py dataset_TSMC2014_NYC.csv --checkpoint tabela_q.npcq
+#      python aprendizado_online.py pasta_de_blocos/ --seguir --intervalo 30
+
+INTERVALO_S = 10     # espera entre leituras no modo --seguir
+PASSADAS = 1         # transições treinadas por linha nova
+
+# 1. LEITURA DO QUE É NOVO
+def arquivos_da_fonte(fonte):
+    """Um CSV, ou os .csv de uma pasta em ordem de nome."""
+    if os.path.isdir(fonte):
+        return [os.path.join(fonte, nome) for nome in sorted(os.listdir(fonte)) if nome.endswith('.csv')]
+    return [fonte]
+
+def ler_novas_linhas(caminho, posicao, tamanho_faixa=TAMANHO_FAIXA):
+    """
+    Gera (df, posição depois do df) com as linhas completas a partir de
+    'posicao' (0 = início do arquivo, pulando o cabeçalho), em faixas de até
+    'tamanho_faixa' bytes.
+    """
+    tamanho = os.path.getsize(caminho)
+    if tamanho < posicao:
+        print(f"AVISO: '{caminho}' ficou menor que a posição salva (truncado/substituído): relendo do início.")
+        posicao = 0
+    if tamanho == posicao:
+        return
+    with open(caminho, 'rb') as f:
+        if posicao == 0:
+            if not f.readline().endswith(b'\n'):
+                return  # nem o cabeçalho está completo ainda
+            posicao = f.tell()
+        nomes = ler_cabecalho(caminho)
+        colunas = [c for c in artigo2.COLUNAS_CSV.values() if c in nomes]
+        while posicao < tamanho:
+            f.seek(posicao)
+            dados = f.read(min(tamanho_faixa, tamanho - posicao))
+            if not dados.endswith(b'\n'):
+                dados += f.readline()  # completa a linha cortada pela faixa
+            fim = dados.rfind(b'\n') + 1
+            if fim == 0:
+                return
+            posicao += fim
+            yield pd.read_csv(io.BytesIO(dados[:fim]), header=None, names=nomes, usecols=colunas), posicao
+
+# 2. ESTADO INCREMENTAL
+class AprendizOnline:
+    def __init__(self, caminho_checkpoint, agent=None, metadados=None):
+        self.caminho_checkpoint = caminho_checkpoint
+        self.agent = agent or QLearningAgentDenso(artigo2.ACOES, [], [])
+        self.metadados = dict(metadados or {})
+        online = self.metadados.get('online', {})
+        self.posicoes = dict(online.get('posicoes', {}))
+        self.contagens = np.zeros(len(self.agent.locations), dtype=np.int64)
+        self.contagens[:len(online.get('contagens', []))] = online.get('contagens', [])
+        self.total = int(self.contagens.sum())
+
+        # Modo e bônus por local do treino que gerou a tabela (ver artigo2.hotspots_do_checkpoint)
+        hotspots = self.metadados.get('hotspots', {})
+        configuracao = self.metadados.get('configuracao', {})
+        self.modo_hotspot = hotspots.get('modo', artigo2.MODO_HOTSPOT)
+        self.bonus_hotspot = configuracao.get('bonus_hotspot', artigo2.BONUS_HOTSPOT)
+        self.raio_hotspot_m = configuracao.get('raio_hotspot_m', artigo2.RAIO_HOTSPOT_M)
+        self.min_checkins_hotspot = configuracao.get('min_checkins_hotspot', artigo2.MIN_CHECKINS_HOTSPOT)
+        bonus = hotspots.get('bonus_locais', {})
+        self.venues_bonus = pd.Index(list(bonus), dtype=object)
+        self.bonus_locais = np.array(list(bonus.values()), dtype=np.float32) if bonus else None
+
+        # Acumuladores por local para recalcular os hotspots espaciais (ver _contar_locais)
+        locais = online.get('locais', {})
+        self.venues = pd.Index(locais.get('ids', []), dtype=object)
+        self.checkins_local = np.array(locais.get('checkins', []), dtype=np.int64)
+        self.soma_lat = np.array(locais.get('soma_lat', []), dtype=np.float64)
+        self.soma_lon = np.array(locais.get('soma_lon', []), dtype=np.float64)
+        self.hotspots_incrementais = self.modo_hotspot == 'espacial' and ('online' not in self.metadados
+                                                                         or 'locais' in online)
+        if self.modo_hotspot == 'espacial' and not self.hotspots_incrementais:
+            print("AVISO: checkpoint online sem os acumuladores por local: o bônus dos hotspots espaciais "
+                  "fica congelado (locais novos com bônus 0). Recrie o estado online para recalculá-lo.")
+        self.n_hotspots_espaciais = None
+        if self.hotspots_incrementais and len(self.venues):
+            self._detectar_hotspots()
+
+        self.hotspot = self.contagens / max(self.total, 1) > artigo2.LIMIAR_HOTSPOT
+        self.matriz_recompensa = np.empty((0, len(self.agent.actions)), dtype=np.float32)
+        self._atualizar_recompensas(np.arange(len(self.agent.locations)))
+
+    @classmethod
+    def carregar(cls, caminho_checkpoint):
+        """Retoma do checkpoint (se existir); senão começa com a tabela vazia."""
+        if not os.path.exists(caminho_checkpoint):
+            return cls(caminho_checkpoint)
+        agent, meta = checkpoint_q.carregar_agente(caminho_checkpoint)
+        return cls(caminho_checkpoint, agent, meta)
+
+    @property
+    def adotado(self):
+        """False para um checkpoint que veio do treino completo e ainda não tem o estado online."""
+        return 'online' in self.metadados or len(self.agent.locations) == 0
+
+    # --- Popularidade e hotspots ---
+    def _atualizar_recompensas(self, linhas):
+        """Recalcula só as linhas (categorias) dadas da matriz de recompensa."""
+        n_loc = len(self.agent.locations)
+        if len(self.matriz_recompensa) < n_loc:
+            nova = np.empty((n_loc, len(self.agent.actions)), dtype=np.float32)
+            nova[:len(self.matriz_recompensa)] = self.matriz_recompensa
+            self.matriz_recompensa = nova
+        popularidade = self.contagens / max(self.total, 1)
+        por_categoria = self.modo_hotspot == 'categoria'
+        for i in linhas:
+            local = self.agent.locations[i]
+            self.matriz_recompensa[i] = artigo2.linha_recompensa(
+                local, self.agent.actions, {local: popularidade[i]} if por_categoria else {})
+
+    def _contar(self, loc):
+        """Soma as linhas novas às contagens; retorna (hotspots que entraram, que sairam)."""
+        n_loc = len(self.agent.locations)
+        novas = n_loc - len(self.contagens)
+        self.contagens = np.concatenate([self.contagens, np.zeros(novas, dtype=np.int64)])
+        self.hotspot = np.concatenate([self.hotspot, np.zeros(novas, dtype=bool)])
+        self.contagens += np.bincount(loc, minlength=n_loc)
+        self.total = int(self.contagens.sum())
+
+        # O total mudou, então a popularidade de todas muda: só quem cruzou o limiar muda de recompensa
+        hotspot = self.contagens / max(self.total, 1) > artigo2.LIMIAR_HOTSPOT
+        mudaram = np.flatnonzero(hotspot != self.hotspot)
+        entraram = mudaram[hotspot[mudaram]]
+        sairam = mudaram[~hotspot[mudaram]]
+        self.hotspot = hotspot
+        self._atualizar_recompensas(np.union1d(mudaram, np.arange(n_loc - novas, n_loc)))
+        return entraram, sairam
+
+    def _contar_locais(self, df):
+        """Soma check-ins e coordenadas das linhas novas por local e recalcula os hotspots espaciais."""
+        if not self.hotspots_incrementais or not {'Venue_ID', 'Latitude', 'Longitude'} <= set(df.columns):
+            return
+        lat = df['Latitude'].to_numpy(dtype=np.float64)
+        lon = df['Longitude'].to_numpy(dtype=np.float64)
+        validas = np.isfinite(lat) & np.isfinite(lon)
+        if not validas.any():
+            return
+        ids = df['Venue_ID'].astype(str).to_numpy(dtype=object)[validas]
+        lat, lon = lat[validas], lon[validas]
+
+        novos = pd.unique(ids[self.venues.get_indexer(ids) < 0])
+        if len(novos):
+            self.venues = self.venues.append(pd.Index(novos, dtype=object))
+            extra = np.zeros(len(novos))
+            self.checkins_local = np.concatenate([self.checkins_local, extra.astype(np.int64)])
+            self.soma_lat = np.concatenate([self.soma_lat, extra])
+            self.soma_lon = np.concatenate([self.soma_lon, extra])
+        codigos = self.venues.get_indexer(ids)
+        n = len(self.venues)
+        self.checkins_local += np.bincount(codigos, minlength=n)
+        self.soma_lat += np.bincount(codigos, weights=lat, minlength=n)
+        self.soma_lon += np.bincount(codigos, weights=lon, minlength=n)
+        self._detectar_hotspots()
+
+    def _detectar_hotspots(self):
+        """Hotspots sobre os pontos dos locais (mesma conta do artigo2.detectar_por_local)."""
+        divisor = np.maximum(self.checkins_local, 1)
+        hotspots = hotspots_espaciais.detectar_hotspots(
+            self.soma_lat / divisor, self.soma_lon / divisor, self.checkins_local,
+            self.raio_hotspot_m, self.min_checkins_hotspot)
+        self.venues_bonus = self.venues
+        self.bonus_locais = (self.bonus_hotspot * hotspots.pontuacao).astype(np.float32)
+        self.n_hotspots_espaciais = hotspots.n_grupos
+
+    # --- Processamento de uma faixa de linhas novas ---
+    @staticmethod
+    def _codificar(valores, vocabulario):
+        return pd.Index(vocabulario).get_indexer(valores)   # -1 = fora do vocabulário
+
+    def processar(self, df_bruto, treinar=True):
+        """
+        Limpa as linhas novas, atualiza vocabulário/contagens/recompensas e
+        (se treinar) aplica o Q-Learning só nelas. Retorna um dict com o resumo.
+        """
+        df, invalidos = artigo2.limpar_bloco(df_bruto)
+        resumo = {'linhas': len(df), 'invalidos': invalidos, 'categorias_novas': 0,
+                  'hotspots_novos': [], 'hotspots_perdidos': [], 'transicoes': 0}
+        if len(df) == 0:
+            return resumo
+
+        categorias = df['Venue_Category'].to_numpy()
+        periodos = df['Time_OfDay'].to_numpy()
+        resumo['categorias_novas'], _ = self.agent.expandir(
+            pd.unique(categorias[self._codificar(categorias, self.agent.locations) < 0]),
+            pd.unique(periodos[self._codificar(periodos, self.agent.periods) < 0]))
+        loc = self._codificar(categorias, self.agent.locations)
+        per = self._codificar(periodos, self.agent.periods)
+
+        entraram, sairam = self._contar(loc)
+        self._contar_locais(df)
+        resumo['hotspots_novos'] = [self.agent.locations[i] for i in entraram]
+        resumo['hotspots_perdidos'] = [self.agent.locations[i] for i in sairam]
+        if treinar:
+            resumo['transicoes'] = self._treinar(loc, per, df['User_ID'].to_numpy(), df['Timestamp'].to_numpy(),
+                                                 self._bonus_linhas(df))
+        return resumo
+
+    def _bonus_linhas(self, df):
+        """Bônus de hotspot espacial de cada linha (None se não houver bônus por local)."""
+        if self.bonus_locais is None or 'Venue_ID' not in df:
+            return None
+        codigos = self.venues_bonus.get_indexer(df['Venue_ID'].astype(str))
+        return np.where(codigos >= 0, self.bonus_locais[np.maximum(codigos, 0)], 0).astype(np.float32)
+
+    def _treinar(self, loc, per, user_ids, timestamps, bonus=None):
+        # Semente ligada à posição no log: reprocessar o mesmo trecho dá o mesmo resultado
+        semente = (artigo2.SEMENTE, self.total)
+        modo = artigo2.MODO_AMOSTRAGEM
+        if modo in AmostradorTrajetorias.MODOS:
+            indice = IndiceTrajetorias(user_ids, timestamps, loc, per)
+            if indice.n_pares == 0:
+                return 0
+            amostrador = AmostradorTrajetorias(indice, modo, semente)
+            n = indice.n_pares * PASSADAS
+        else:
+            amostrador = AmostradorTransicoes(loc, per, user_ids, modo, semente)
+            n = len(loc) * PASSADAS
+        treinador = TreinadorLote(self.agent, self.matriz_recompensa, artigo2.MODO_TREINO, semente)
+        feitas = 0
+        for lote in amostrador.lotes(n, artigo2.TAMANHO_LOTE):
+            treinador.treinar(lote.loc, lote.per, lote.loc_prox, lote.per_prox,
+                              None if bonus is None else bonus[lote.indice])
+            feitas += len(lote.loc)
+        return feitas
+
+    # --- Rodada completa ---
+    def atualizar(self, fonte, treinar=True):
+        """Lê tudo que é novo na fonte, salvando o checkpoint a cada faixa. Retorna o resumo somado."""
+        total = {'linhas': 0, 'invalidos': 0, 'categorias_novas': 0, 'transicoes': 0}
+        hotspots_antes = set(np.flatnonzero(self.hotspot).tolist())
+        for caminho in arquivos_da_fonte(fonte):
+            chave = os.path.basename(caminho)
+            for df_bruto, posicao in ler_novas_linhas(caminho, self.posicoes.get(chave, 0)):
+                resumo = self.processar(df_bruto, treinar)
+                for campo in total:
+                    total[campo] += resumo[campo]
+                self.posicoes[chave] = posicao
+                self.salvar(fonte)
+        # Saldo da rodada (uma categoria pode entrar e sair entre duas faixas)
+        hotspots = set(np.flatnonzero(self.hotspot).tolist())
+        total['hotspots_novos'] = [self.agent.locations[i] for i in sorted(hotspots - hotspots_antes)]
+        total['hotspots_perdidos'] = [self.agent.locations[i] for i in sorted(hotspots_antes - hotspots)]
+        return total
+
+    def adotar(self, fonte):
+        """
+        Checkpoint do treino completo (artigo2.py), sem estado online: conta o
+        histórico atual da fonte uma vez, sem treinar, e marca tudo como já lido.
+        """
+        print(f"Checkpoint sem estado online: contando o histórico de '{fonte}' uma vez (sem treinar)...")
+        return self.atualizar(fonte, treinar=False)
+
+    def salvar(self, fonte):
+        self.metadados['online'] = {
+            'fonte': os.path.abspath(fonte), 'posicoes': self.posicoes,
+            'contagens': self.contagens.tolist(), 'linhas': self.total,
+            'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+        }
+        if self.hotspots_incrementais:
+            self.metadados['online']['locais'] = {
+                'ids': self.venues.tolist(), 'checkins': self.checkins_local.tolist(),
+                'soma_lat': self.soma_lat.tolist(), 'soma_lon': self.soma_lon.tolist(),
+            }
+        if self.bonus_locais is not None:
+            com_bonus = np.flatnonzero(self.bonus_locais)
+            self.metadados['hotspots'] = {'modo': self.modo_hotspot, 'bonus_locais': dict(zip(
+                map(str, self.venues_bonus[com_bonus]), self.bonus_locais[com_bonus].tolist()))}
+        checkpoint_q.salvar_agente(self.caminho_checkpoint, self.agent, self.metadados)
+
+# 3. EXECUÇÃO
+def imprimir_resumo(resumo, tempo, aprendiz):
+    if resumo['linhas'] == 0 and resumo['invalidos'] == 0:
+        print(f"[{datetime.now():%H:%M:%S}] Nada novo.")
+        return
+    print(f"[{datetime.now():%H:%M:%S}] {resumo['linhas']} linhas novas ({resumo['invalidos']} inválidas), "
+          f"{resumo['transicoes']} transições treinadas, {resumo['categorias_novas']} categorias novas "
+          f"em {tempo:.3f}s | total: {aprendiz.total} linhas, {len(aprendiz.agent.locations)} categorias"
+          + ('' if aprendiz.n_hotspots_espaciais is None else f", {aprendiz.n_hotspots_espaciais} hotspots espaciais"))
+    if resumo['hotspots_novos']:
+        print(f"   Novos hotspots: {', '.join(resumo['hotspots_novos'])}")
+    if resumo['hotspots_perdidos']:
+        print(f"   Deixaram de ser hotspot: {', '.join(resumo['hotspots_perdidos'])}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Atualiza a Tabela Q só com os check-ins novos.")
+    parser.add_argument('fonte', nargs='?', default=artigo2.NOME_DO_ARQUIVO_CSV, help="CSV ou pasta de blocos .csv")
+    parser.add_argument('--checkpoint', default=None,
+                        help="padrão: o do artigo2.py (ARQUIVO_CHECKPOINT na pasta da fonte)")
+    parser.add_argument('--seguir', action='store_true', help="continua lendo (como tail -f)")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_S, help="segundos entre leituras")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or artigo2.caminho_checkpoint(args.fonte) \
+        or os.path.join(os.path.dirname(os.path.abspath(args.fonte)), 'tabela_q.npcq')
+    aprendiz = AprendizOnline.carregar(checkpoint)
+    if not aprendiz.adotado:
+        inicio = time.perf_counter()
+        imprimir_resumo(aprendiz.adotar(args.fonte), time.perf_counter() - inicio, aprendiz)
+    try:
+        while True:
+            inicio = time.perf_counter()
+            imprimir_resumo(aprendiz.atualizar(args.fonte), time.perf_counter() - inicio, aprendiz)
+            if not args.seguir:
+                break
+            time.sleep(args.intervalo)
+    except KeyboardInterrupt:
+        print("\nInterrompido (o checkpoint já está salvo).")
@@ -4,6 +4,9 @@ import numpy as np
 from collections import defaultdict
 from datetime import datetime
 
+# Critério de parada compartilhado com o artigo2 (convergencia.py precisa estar na mesma pasta)
+from convergencia import CriterioConvergencia
+
 # arquivo do dataset. 
 NOME_DO_ARQUIVO_CSV = '/content/dataset_TSMC2014_NYC.csv' 
 
@@ -11,29 +14,34 @@ NOME_DO_ARQUIVO_CSV = '/content/dataset_TSMC2014_NYC.csv'
 COLUNAS_CSV = {
     'CATEGORIA': 'venueCategory',  # Nome da coluna de categoria no CSV
     'TEMPO': 'utcTimestamp',       # Nome da coluna de data/hora no CSV
-    'USUARIO': 'userId'            # Nome da coluna de ID do usuário
+    'USUARIO': 'userId',           # Nome da coluna de ID do usuário
+    'FUSO': 'timezoneOffset'       # Fuso em minutos (opcional; sem ela, usa UTC)
 }
 
 # 1. CARREGAMENTO E PROCESSAMENTO REAL DOS DADOS
-def processar_timestamp(data_string):
+# Formato do TSMC2014 (ex: 'Tue Apr 03 18:00:09 +0000 2012')
+FORMATO_TIMESTAMP = '%a %b %d %H:%M:%S %z %Y'
+
+# Horas que abrem cada período: [0,5) Noite, [5,12) Manhã, [12,18) Tarde, [18,24) Noite
+LIMITES_PERIODOS = [5, 12, 18]
+PERIODOS_POR_FAIXA = np.array(['Noite', 'Manhã', 'Tarde', 'Noite'], dtype=object)
+
+def processar_timestamps(serie_tempo, serie_fuso=None):
     """
-    Converte datas reais (ex: 'Tue Apr 03 18:00:09 +0000 2012') 
-    para 'Manhã', 'Tarde' ou 'Noite'.
+    Converte a coluna inteira de datas para 'Manhã', 'Tarde' ou 'Noite'
+    de uma só vez, no horário LOCAL (utcTimestamp + timezoneOffset em minutos).
+    Retorna (períodos, nº de linhas inválidas). Linhas que não puderem ser
+    convertidas ficam como NaN para serem descartadas pelo dropna.
     """
-    try:
-        # Tenta converter string para objeto de data. 
-        dt = pd.to_datetime(data_string)
-        hora = dt.hour
-        
-        if 5 <= hora < 12:
-            return 'Manhã'
-        elif 12 <= hora < 18:
-            return 'Tarde'
-        else:
-            return 'Noite'
-    except:
-        # Se falhar, retorna um aleatório para não quebrar o código
-        return random.choice(['Manhã', 'Tarde', 'Noite'])
+    dt = pd.to_datetime(serie_tempo, format=FORMATO_TIMESTAMP, errors='coerce', utc=True)
+    if serie_fuso is not None:
+        dt = dt + pd.to_timedelta(pd.to_numeric(serie_fuso, errors='coerce'), unit='m')
+
+    hora = dt.dt.hour
+    invalidos = hora.isna()
+    faixa = np.searchsorted(LIMITES_PERIODOS, hora.fillna(0).to_numpy(), side='right')
+    periodos = pd.Series(PERIODOS_POR_FAIXA[faixa], index=serie_tempo.index).where(~invalidos)
+    return periodos, int(invalidos.sum())
 
 def carregar_dados_reais(caminho_arquivo):
     print(f"--- 1. CARREGANDO ARQUIVO: {caminho_arquivo} ---")
@@ -49,8 +57,11 @@ def carregar_dados_reais(caminho_arquivo):
         df_limpo['Venue_Category'] = df[COLUNAS_CSV['CATEGORIA']]
         
         print("Processando horários (convertendo datas para Manhã/Tarde/Noite)...")
-        # Aplica a conversão de tempo na coluna original
-        df_limpo['Time_OfDay'] = df[COLUNAS_CSV['TEMPO']].apply(processar_timestamp)
+        # Converte a coluna original inteira de uma vez (horário local)
+        df_limpo['Time_OfDay'], invalidos = processar_timestamps(
+            df[COLUNAS_CSV['TEMPO']], df.get(COLUNAS_CSV['FUSO']))
+        if invalidos:
+            print(f"AVISO: {invalidos} linhas com data inválida serão descartadas.")
         
         # Remove linhas vazias (limpeza básica)
         df_limpo = df_limpo.dropna()
@@ -71,6 +82,47 @@ def carregar_dados_reais(caminho_arquivo):
         exit()
 
 # 2. O AMBIENTE BASEADO EM DADOS
+
+# --- REGRAS DE RECOMPENSA (TABELA) ---
+# Lógica Semântica (Simplificada para Categorias Comuns): MUITAS categorias => palavras-chave.
+# Cada regra: (palavras-chave da categoria, {ação: ajuste}). Vale a PRIMEIRA
+# regra com alguma palavra-chave contida na categoria (como no antigo if/elif).
+RECOMPENSA_BASE = -1
+BONUS_HOTSPOT = 2
+LIMIAR_HOTSPOT = 0.01   # Se tiver > 1% dos checkins totais
+
+REGRAS_RECOMPENSA = [
+    # 1. Cultura/História (Museum, Art, History, Monument)
+    (['museum', 'art', 'history', 'library', 'monument', 'park'],
+     {"Oferecer Tour Histórico": 10, "Oferecer Missão de Combate": -5}),
+    # 2. Esporte/Ação (Gym, Stadium, Field, Fitness)
+    (['gym', 'stadium', 'fitness', 'sport', 'soccer'],
+     {"Oferecer Missão de Combate": 10, "Oferecer Tour Histórico": -5}),
+    # 3. Comida/Descanso (Cafe, Restaurant, Coffee, Shop, Store)
+    (['cafe', 'coffee', 'food', 'restaurant', 'shop', 'store'],
+     {"Oferecer Item de Energia": 8}),
+]
+
+def linha_recompensa(location, actions, popularity):
+    """Recompensa de cada ação para uma categoria (regras + bônus de hotspot)."""
+    linha = np.full(len(actions), RECOMPENSA_BASE, dtype=np.float32)
+    loc_lower = str(location).lower()
+    for palavras, ajustes in REGRAS_RECOMPENSA:
+        if any(x in loc_lower for x in palavras):
+            for acao, ajuste in ajustes.items():
+                linha[actions.index(acao)] += ajuste
+            break
+    if popularity.get(location, 0) > LIMIAR_HOTSPOT:
+        linha += BONUS_HOTSPOT
+    return linha
+
+def compilar_matriz_recompensa(locations, actions, popularity):
+    """Matriz (categorias × ações) com a recompensa de cada par."""
+    matriz = np.empty((len(locations), len(actions)), dtype=np.float32)
+    for i, location in enumerate(locations):
+        matriz[i] = linha_recompensa(location, actions, popularity)
+    return matriz
+
 class DataDrivenEnvironment:
     def __init__(self, dataframe):
         self.df = dataframe
@@ -91,6 +143,10 @@ class DataDrivenEnvironment:
             print(f"   -> {loc}: {score*100:.2f}% dos check-ins")
         print("-------------------------------------------\n")
 
+        # Regras semânticas + hotspot compiladas uma vez: recompensa[categoria, ação]
+        self.indice_local = {loc: i for i, loc in enumerate(self.locations)}
+        self.matriz_recompensa = compilar_matriz_recompensa(self.locations, self.actions, self.popularity)
+
     def get_random_sample(self):
         sample = self.df.sample(1).iloc[0]
         return {
@@ -101,47 +157,23 @@ class DataDrivenEnvironment:
 
     def get_reward(self, state, action):
         location = state['Location']
-        reward = -1 
-
-        # --- Lógica Semântica (Simplificada para Categorias Comuns) ---
-        # MUITAS categorias => palavras-chave
-        loc_lower = str(location).lower()
-
-        # 1. Cultura/História (Museum, Art, History, Monument)
-        if any(x in loc_lower for x in ['museum', 'art', 'history', 'library', 'monument', 'park']):
-            if action == "Oferecer Tour Histórico":
-                reward += 10
-            elif action == "Oferecer Missão de Combate":
-                reward -= 5
-        
-        # 2. Esporte/Ação (Gym, Stadium, Field, Fitness)
-        elif any(x in loc_lower for x in ['gym', 'stadium', 'fitness', 'sport', 'soccer']):
-            if action == "Oferecer Missão de Combate":
-                reward += 10
-            elif action == "Oferecer Tour Histórico":
-                reward -= 5
-
-        # 3. Comida/Descanso (Cafe, Restaurant, Coffee, Shop, Store)
-        elif any(x in loc_lower for x in ['cafe', 'coffee', 'food', 'restaurant', 'shop', 'store']):
-            if action == "Oferecer Item de Energia":
-                reward += 8
-            else:
-                reward += 0
-
-        # Bônus de Hotspot
-        if self.popularity.get(location, 0) > 0.01: # Se tiver > 1% dos checkins totais
-            reward += 2
-
-        return reward
+        indice = self.indice_local.get(location)
+        if indice is None:  # categoria fora do vocabulário: aplica as regras na hora
+            return float(linha_recompensa(location, self.actions, self.popularity)[self.actions.index(action)])
+        return float(self.matriz_recompensa[indice, self.actions.index(action)])
+
+    def recompensas(self, loc_ids, action_ids):
+        """Recompensas de um lote inteiro (códigos de local e ação) com uma única indexação."""
+        return self.matriz_recompensa[loc_ids, action_ids]
 
 # 3. O AGENTE Q-LEARNING
 class QLearningAgent:
-    def __init__(self, actions):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.1):
         self.actions = actions
         self.q_table = defaultdict(lambda: defaultdict(float))
-        self.alpha = 0.1
-        self.gamma = 0.9
-        self.epsilon = 0.1
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
 
     def get_state_key(self, state):
         return f"{state['Location']}_{state['Time']}"
@@ -162,7 +194,28 @@ class QLearningAgent:
         new_q = current_q + self.alpha * (reward + self.gamma * max_next_q - current_q)
         self.q_table[state_key][action] = new_q
 
-# 4. EXECUÇÃO
+# 4. PARADA POR CONVERGÊNCIA
+# O treino para quando a Tabela Q estabiliza (ΔQ máximo/médio por bloco, relativos
+# à média de |Q|, e poucas trocas da ação gulosa) por BLOCOS_ESTAVEIS blocos
+# seguidos, ou quando o orçamento (épocas / SEGUNDOS_MAX) acaba. As tolerâncias
+# são as padrão do CriterioConvergencia (convergencia.py), as mesmas do artigo2.
+SEGUNDOS_MAX = None
+PASSOS_POR_BLOCO = 20000
+BLOCOS_ESTAVEIS = 5
+
+def tabela_em_array(q_table, locations, periods, actions):
+    """Tabela Q do dicionário como array (locais × períodos × ações); o que não foi aprendido fica -inf."""
+    q = np.full((len(locations), len(periods), len(actions)), -np.inf, dtype=np.float32)
+    for i, loc in enumerate(locations):
+        for j, per in enumerate(periods):
+            valores = q_table.get(f"{loc}_{per}")
+            if valores:
+                for k, acao in enumerate(actions):
+                    if acao in valores:
+                        q[i, j, k] = valores[acao]
+    return q
+
+# 5. EXECUÇÃO
 def run_real_data_simulation():
     # 1. Carregar dados REAIS
     df_foursquare = carregar_dados_reais(NOME_DO_ARQUIVO_CSV)
@@ -173,15 +226,20 @@ def run_real_data_simulation():
     
     print("--- 3. INICIANDO TREINAMENTO DO AGENTE ---")
     
-    # CSV muito grande, deixei só 2 epocas.
+    # CSV muito grande, deixei só 2 epocas. As épocas agora são só o orçamento:
+    # o treino para antes se a Tabela Q convergir
     if len(df_foursquare) > 50000:
         epochs = 2
     else:
         epochs = 30
         
     total_interations = len(df_foursquare) * epochs
-    print(f"Treinando por {epochs} épocas (Total de interações: {total_interations})")
+    print(f"Treinando até convergir (orçamento: {epochs} épocas = {total_interations} interações)")
     
+    periodos = list(dict.fromkeys(PERIODOS_POR_FAIXA))
+    criterio = CriterioConvergencia(blocos_estaveis=BLOCOS_ESTAVEIS, passos_max=total_interations,
+                                    segundos_max=SEGUNDOS_MAX)
+    criterio.iniciar(tabela_em_array(agent.q_table, env.locations, periodos, env.actions))
     # Loop de Treinamento com Barra de Progresso visual
     for i in range(total_interations):
         state = env.get_random_sample()
@@ -195,6 +253,13 @@ def run_real_data_simulation():
             progresso = (i / total_interations) * 100
             print(f"   Progresso: {progresso:.0f}% concluído... (Última recompensa: {reward})")
 
+        if (i + 1) % PASSOS_POR_BLOCO == 0:
+            if criterio.atualizar(tabela_em_array(agent.q_table, env.locations, periodos, env.actions), i + 1):
+                break
+
+    if criterio.motivo is None:   # último bloco (incompleto): fecha o orçamento de passos
+        criterio.atualizar(tabela_em_array(agent.q_table, env.locations, periodos, env.actions), total_interations)
+    print(f"{criterio.descrever()} ({criterio.passos / len(df_foursquare):.1f} épocas)")
     print("--- TREINAMENTO CONCLUÍDO ---\n")
     
     print("--- 4. RESULTADOS FINAIS: POLÍTICA APRENDIDA ---")
@@ -1,53 +1,224 @@
+import os
 import random
+import time
+import shutil
+import json
+import hashlib
+import tempfile
 import pandas as pd
 import numpy as np
 from collections import defaultdict
 from datetime import datetime
 
+import cache_colunar
+import ingestao_streaming
+from agente_denso import QLearningAgentDenso
+from amostrador import AmostradorTransicoes
+from indice_trajetorias import IndiceTrajetorias, AmostradorTrajetorias
+from treinador_lote import TreinadorLote
+from memoria_replay import MemoriaReplay
+import checkpoint_q
+import hotspots_espaciais
+from telemetria import Telemetria
+from convergencia import CriterioConvergencia
+
 NOME_DO_ARQUIVO_CSV = 'dataset_TSMC2014_NYC.csv' 
 
-# --- CONFIGURAÇÃO DE VELOCIDADE ---
-# True = Carrega só 10.000 linhas 
-# False = Carrega tudo 
-MODO_TESTE_RAPIDO = False 
+# --- MODO DE CARREGAMENTO ---
+# 'completo'  = Carrega tudo com pd.read_csv
+# 'streaming' = Lê em blocos, processa em paralelo e grava direto no cache (memória constante);
+#               com USAR_CACHE = False, numa pasta temporária apagada depois da carga
+# 'amostra'   = Teste rápido: amostra uniforme de TAMANHO_AMOSTRA linhas do arquivo inteiro
+MODO_CARREGAMENTO = 'completo'
+TAMANHO_AMOSTRA = 10000
+SEMENTE_AMOSTRA = 42
+
+# --- CACHE DOS DADOS PROCESSADOS ---
+# True = Salva a tabela limpa em .cache_npc/ e reaproveita enquanto o CSV não mudar
+USAR_CACHE = True
+# Mude este valor sempre que o processamento abaixo mudar (invalida caches antigos)
+VERSAO_PROCESSAMENTO = 'v3'
+
+# --- AMOSTRAGEM DAS TRANSIÇÕES NO TREINO ---
+# 'uniforme', 'popularidade' (categoria com prob. ∝ contagem², ver amostrador.py) ou
+# 'estratificado' (por usuário):
+#     o próximo estado é outro check-in sorteado
+# 'trajetoria' = pares reais (check-in -> próximo check-in do mesmo usuário)
+# 'episodico'  = cada usuário é um episódio; grupos de usuários andam em paralelo
+MODO_AMOSTRAGEM = 'uniforme'
+SEMENTE = 42
+TAMANHO_LOTE = 65536
+# 'sequencial' = idêntico ao laço passo a passo | 'sincrono' = minibatch síncrono (mais rápido)
+MODO_TREINO = 'sequencial'
+ALPHA, GAMMA, EPSILON = 0.1, 0.9, 0.1
+
+# --- MEMÓRIA DE REPLAY ---
+# None = cada transição é aprendida uma vez só | 'uniforme' | 'prioritario' (pelo erro TD)
+MODO_REPLAY = None
+CAPACIDADE_REPLAY = 200000
+TAMANHO_REPLAY = 8192       # transições por minibatch de replay
+REPLAYS_POR_LOTE = 2        # minibatches de replay depois de cada lote novo
+
+# --- PARADA DO TREINO ---
+# O treino para quando a Tabela Q converge (ver convergencia.py) ou quando o
+# orçamento acaba: EPOCAS_MAX passadas pelo dataset e/ou SEGUNDOS_MAX (None = sem limite).
+# PARAR_NA_CONVERGENCIA = False treina o orçamento inteiro.
+PARAR_NA_CONVERGENCIA = True
+EPOCAS_MAX = 50
+SEGUNDOS_MAX = None
+TOL_DELTA_MAX = 0.5        # maior |ΔQ| no bloco, relativo à média de |Q|
+TOL_DELTA_MEDIO = 0.02     # |ΔQ| médio no bloco, relativo à média de |Q|
+TOL_POLITICA = 0.15        # fração dos estados que pode trocar de ação gulosa no bloco
+BLOCOS_ESTAVEIS = 5        # blocos seguidos dentro das tolerâncias
+
+# --- CHECKPOINTS DA TABELA Q ---
+# None = não salva. Com um nome de arquivo (relativo à pasta do dataset), a
+# tabela é salva a cada CHECKPOINT_A_CADA interações e o treino retoma do
+# último checkpoint se ele for do mesmo dataset e da mesma configuração de
+# treino (ver configuracao_treino: modos, semente, alpha/gamma/epsilon,
+# tolerâncias e a recompensa compilada, com hotspots). Mudou qualquer uma
+# delas, o treino recomeça do zero. A memória de replay não entra no checkpoint.
+ARQUIVO_CHECKPOINT = 'tabela_q.npcq'
+CHECKPOINT_A_CADA = 200000
+
+# --- TELEMETRIA ---
+# None = desligada | 'jsonl' (uma linha JSON por janela) | 'prometheus' (arquivo texto)
+TELEMETRIA = None
+ARQUIVO_TELEMETRIA = 'telemetria_treino.jsonl'
+JANELA_TELEMETRIA = 100000   # transições por janela de métricas
+JANELA_PERFIL = None         # nº da janela que roda sob o cProfile (None = nenhuma)
 
 COLUNAS_CSV = {
     'CATEGORIA': 'venueCategory', 
     'TEMPO': 'utcTimestamp',     
-    'USUARIO': 'userId'         
+    'USUARIO': 'userId',
+    'FUSO': 'timezoneOffset',   # opcional: sem ela, os períodos ficam em UTC
+    'LOCAL': 'venueId',         # opcionais: sem local e coordenadas, só há hotspot por categoria
+    'LATITUDE': 'latitude',
+    'LONGITUDE': 'longitude',
 }
 
+# --- HOTSPOTS ---
+# 'espacial'  = lugares com muitos check-ins em volta (grade + densidade, ver hotspots_espaciais.py);
+#               o bônus é por local (venue) do check-in: BONUS_HOTSPOT * pontuação em [0, 1]
+# 'categoria' = regra antiga: toda categoria com > LIMIAR_HOTSPOT dos check-ins
+MODO_HOTSPOT = 'espacial'
+RAIO_HOTSPOT_M = 200          # lado da célula da grade (raio da vizinhança)
+MIN_CHECKINS_HOTSPOT = 500    # check-ins nas 3×3 células em volta para ser núcleo de hotspot
+
 # 1. CARREGAMENTO DOS DADOS 
-def processar_timestamp(data_string):
-    try:
-        dt = pd.to_datetime(data_string)
-        hora = dt.hour
-        if 5 <= hora < 12: return 'Manhã'
-        elif 12 <= hora < 18: return 'Tarde'
-        else: return 'Noite'
-    except:
-        return random.choice(['Manhã', 'Tarde', 'Noite'])
+# Formato do TSMC2014 (ex: 'Tue Apr 03 18:00:09 +0000 2012')
+FORMATO_TIMESTAMP = '%a %b %d %H:%M:%S %z %Y'
+
+# Horas que abrem cada período: [0,5) Noite, [5,12) Manhã, [12,18) Tarde, [18,24) Noite
+LIMITES_PERIODOS = [5, 12, 18]
+PERIODOS_POR_FAIXA = np.array(['Noite', 'Manhã', 'Tarde', 'Noite'], dtype=object)
+
+def processar_timestamps(serie_tempo, serie_fuso=None):
+    """
+    Converte a coluna inteira para Manhã/Tarde/Noite no horário local
+    (utcTimestamp + timezoneOffset em minutos). Retorna (períodos, segundos
+    desde 1970 em UTC, nº de linhas inválidas); as inválidas ficam NaN e saem no dropna.
+    """
+    dt = pd.to_datetime(serie_tempo, format=FORMATO_TIMESTAMP, errors='coerce', utc=True)
+    segundos = (dt - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+    if serie_fuso is not None:
+        dt = dt + pd.to_timedelta(pd.to_numeric(serie_fuso, errors='coerce'), unit='m')
+
+    hora = dt.dt.hour
+    invalidos = hora.isna()
+    faixa = np.searchsorted(LIMITES_PERIODOS, hora.fillna(0).to_numpy(), side='right')
+    periodos = pd.Series(PERIODOS_POR_FAIXA[faixa], index=serie_tempo.index).where(~invalidos)
+    return periodos, segundos, int(invalidos.sum())
+
+def limpar_bloco(df):
+    """
+    Seleciona/renomeia as colunas e converte os horários de um bloco do CSV.
+    Retorna (df_limpo, nº de linhas com data inválida).
+    """
+    df_limpo = pd.DataFrame()
+    df_limpo['User_ID'] = df[COLUNAS_CSV['USUARIO']]
+    df_limpo['Venue_Category'] = df[COLUNAS_CSV['CATEGORIA']]
+    df_limpo['Time_OfDay'], df_limpo['Timestamp'], invalidos = processar_timestamps(
+        df[COLUNAS_CSV['TEMPO']], df.get(COLUNAS_CSV['FUSO']))
+    obrigatorias = list(df_limpo.columns)
+    if all(COLUNAS_CSV[c] in df for c in ('LOCAL', 'LATITUDE', 'LONGITUDE')):
+        # Coordenadas inválidas ficam NaN (a linha continua; o local só não entra nos hotspots)
+        df_limpo['Venue_ID'] = df[COLUNAS_CSV['LOCAL']]
+        df_limpo['Latitude'] = pd.to_numeric(df[COLUNAS_CSV['LATITUDE']], errors='coerce').astype(np.float32)
+        df_limpo['Longitude'] = pd.to_numeric(df[COLUNAS_CSV['LONGITUDE']], errors='coerce').astype(np.float32)
+    df_limpo = df_limpo.dropna(subset=obrigatorias).reset_index(drop=True)
+    # Instante do check-in (UTC, em segundos): ordena a trajetória de cada usuário
+    df_limpo['Timestamp'] = df_limpo['Timestamp'].astype(np.int64)
+    return df_limpo, invalidos
 
 def carregar_dados_reais(caminho_arquivo):
     print(f"--- 1. CARREGANDO ARQUIVO: {caminho_arquivo} ---")
+    inicio = time.perf_counter()
     
     try:
-        if MODO_TESTE_RAPIDO:
-            print(">>> MODO RÁPIDO ATIVADO: Carregando apenas 10.000 linhas para teste <<<")
-            df = pd.read_csv(caminho_arquivo, nrows=10000) # LÊ SÓ O COMEÇO
+        # A amostra é aleatória e pequena, não passa pelo cache
+        if USAR_CACHE and MODO_CARREGAMENTO != 'amostra':
+            df_limpo, meta = cache_colunar.carregar_cache(caminho_arquivo, VERSAO_PROCESSAMENTO)
+            if df_limpo is not None:
+                tempo = time.perf_counter() - inicio
+                tempo_frio = meta['extras'].get('tempo_carga_s')
+                print(f">>> CACHE ENCONTRADO: {len(df_limpo)} linhas em {tempo:.3f}s <<<")
+                if tempo_frio:
+                    print(f"    (carga a frio levou {tempo_frio:.3f}s -> {tempo_frio / tempo:.1f}x mais rápido)")
+                return df_limpo
+
+        if MODO_CARREGAMENTO == 'streaming':
+            print(">>> MODO STREAMING: Lendo em blocos com processamento paralelo <<<")
+            # Sem cache, as colunas vão para uma pasta temporária, apagada depois de lidas
+            pasta_temporaria = None if USAR_CACHE else tempfile.mkdtemp(prefix='npc_streaming_')
+            try:
+                escritor = ingestao_streaming.ingerir_streaming(
+                    caminho_arquivo, limpar_bloco, VERSAO_PROCESSAMENTO, list(COLUNAS_CSV.values()),
+                    pasta_cache=pasta_temporaria)
+                if escritor.estatisticas['invalidos']:
+                    print(f"AVISO: {escritor.estatisticas['invalidos']} linhas com data inválida descartadas.")
+                df_limpo, meta = cache_colunar.carregar_cache(caminho_arquivo, VERSAO_PROCESSAMENTO,
+                                                              pasta_temporaria)
+                if pasta_temporaria:
+                    df_limpo = df_limpo.copy(deep=True)   # sai do mmap antes de apagar os arquivos
+            finally:
+                if pasta_temporaria:
+                    shutil.rmtree(pasta_temporaria, ignore_errors=True)
+            tempo = time.perf_counter() - inicio
+            print(f"Sucesso! {len(df_limpo)} linhas válidas. Carga a frio: {tempo:.3f}s")
+            return df_limpo
+
+        if MODO_CARREGAMENTO == 'amostra':
+            print(f">>> MODO AMOSTRA: {TAMANHO_AMOSTRA} linhas sorteadas do arquivo inteiro <<<")
+            df, total = ingestao_streaming.amostra_reservatorio(
+                caminho_arquivo, TAMANHO_AMOSTRA, SEMENTE_AMOSTRA, list(COLUNAS_CSV.values()))
+            print(f"Sucesso! Amostradas {len(df)} de {total} linhas.")
         else:
             print(">>> MODO COMPLETO: Carregando base inteira <<<")
-            df = pd.read_csv(caminho_arquivo)
-            
-        print(f"Sucesso! Carregado: {len(df)} linhas.")
-        
-        df_limpo = pd.DataFrame()
-        df_limpo['User_ID'] = df[COLUNAS_CSV['USUARIO']]
-        df_limpo['Venue_Category'] = df[COLUNAS_CSV['CATEGORIA']]
+            if caminho_arquivo.endswith('.parquet'):  # ex: gerado pelo gerador_sintetico.py
+                df = pd.read_parquet(caminho_arquivo, columns=list(COLUNAS_CSV.values()))
+            else:
+                df = pd.read_csv(caminho_arquivo)
+            print(f"Sucesso! Carregado: {len(df)} linhas.")
         
         print("Processando horários...")
-        df_limpo['Time_OfDay'] = df[COLUNAS_CSV['TEMPO']].apply(processar_timestamp)
-        df_limpo = df_limpo.dropna()
+        df_limpo, invalidos = limpar_bloco(df)
+        if invalidos:
+            print(f"AVISO: {invalidos} linhas com data inválida descartadas.")
+
+        # Colunas de texto como categorias (mesmo formato que volta do cache)
+        for coluna in ['Venue_Category', 'Time_OfDay', 'Venue_ID']:
+            if coluna in df_limpo:
+                df_limpo[coluna] = df_limpo[coluna].astype('category')
+
+        tempo = time.perf_counter() - inicio
+        print(f"Carga a frio: {tempo:.3f}s")
+        if USAR_CACHE and MODO_CARREGAMENTO != 'amostra':
+            pasta = cache_colunar.salvar_cache(df_limpo, caminho_arquivo, VERSAO_PROCESSAMENTO,
+                                               extras={'tempo_carga_s': tempo})
+            if pasta:
+                print(f"Cache salvo em: {pasta}")
         
         return df_limpo
 
@@ -57,73 +228,178 @@ def carregar_dados_reais(caminho_arquivo):
         print(f"ERRO DE COLUNA: {e}"); exit()
 
 # 2. O AMBIENTE (COM 5 AÇÕES AGORA)
+
+# --- REGRAS DE RECOMPENSA (TABELA) ---
+# Cada regra: (palavras-chave da categoria, {ação: ajuste}). Vale a PRIMEIRA
+# regra com alguma palavra-chave contida na categoria (como no antigo if/elif).
+# Para criar um grupo novo, basta acrescentar uma linha aqui.
+RECOMPENSA_BASE = -1
+BONUS_HOTSPOT = 2
+LIMIAR_HOTSPOT = 0.01   # hotspot = categoria com > 1% dos check-ins
+
+REGRAS_RECOMPENSA = [
+    # 1. CULTURA (Museu, Parque, Arte)
+    (['museum', 'art', 'history', 'monument', 'park', 'library'],
+     {"Oferecer Tour Histórico": 10, "Oferecer Missão de Combate": -5}),   # combate é inadequado
+    # 2. ESPORTE/AÇÃO (Academia, Estádio)
+    (['gym', 'stadium', 'fitness', 'sport', 'soccer'],
+     {"Oferecer Missão de Combate": 10, "Trocar Fofoca/Socializar": -2}),  # foco no treino
+    # 3. COMIDA/DESCANSO (Café, Restaurante)
+    (['cafe', 'coffee', 'food', 'restaurant', 'bakery'],
+     {"Oferecer Item de Energia": 10, "Trocar Fofoca/Socializar": 5}),     # também é bom socializar comendo
+    # 4. COMÉRCIO (Loja, Shopping, Mall)
+    (['shop', 'store', 'mall', 'market', 'plaza'],
+     {"Negociar Itens": 10, "Oferecer Item de Energia": 2}),
+    # 5. VIDA NOTURNA/SOCIAL (Bar, Club, Nightlife)
+    (['bar', 'club', 'pub', 'lounge', 'night'],
+     {"Trocar Fofoca/Socializar": 10, "Negociar Itens": -2}),              # chato vender coisa em balada
+]
+
+def linha_recompensa(location, actions, popularity):
+    """Recompensa de cada ação para uma categoria, aplicando REGRAS_RECOMPENSA e o bônus de hotspot."""
+    linha = np.full(len(actions), RECOMPENSA_BASE, dtype=np.float32)
+    loc_lower = str(location).lower()
+    for palavras, ajustes in REGRAS_RECOMPENSA:
+        if any(x in loc_lower for x in palavras):
+            for acao, ajuste in ajustes.items():
+                linha[actions.index(acao)] += ajuste
+            break
+    if popularity.get(location, 0) > LIMIAR_HOTSPOT:
+        linha += BONUS_HOTSPOT
+    return linha
+
+def compilar_matriz_recompensa(locations, actions, popularity):
+    """Matriz (categorias × ações) com a recompensa de cada par."""
+    matriz = np.empty((len(locations), len(actions)), dtype=np.float32)
+    for i, location in enumerate(locations):
+        matriz[i] = linha_recompensa(location, actions, popularity)
+    return matriz
+
+# --- NOVAS AÇÕES ADICIONADAS ---
+ACOES = [
+    "Oferecer Missão de Combate", # Ação 1: Esporte/Ação
+    "Oferecer Tour Histórico",    # Ação 2: Cultura
+    "Oferecer Item de Energia",   # Ação 3: Descanso/Comida
+    "Negociar Itens",             # Ação 4: Comércio 
+    "Trocar Fofoca/Socializar"    # Ação 5: Social/Bares 
+]
+
 class DataDrivenEnvironment:
     def __init__(self, dataframe):
         self.df = dataframe
-        self.locations = list(dataframe['Venue_Category'].unique())
+        # Vocabulários na ordem dos códigos das categorias (usados pelo agente denso)
+        categorias = dataframe['Venue_Category'].astype('category').cat
+        periodos = dataframe['Time_OfDay'].astype('category').cat
+        self.locations = list(categorias.categories)
+        self.periods = list(periodos.categories)
+
+        # Colunas já codificadas: o treino trabalha só com estes arrays
+        self.loc_ids = categorias.codes.to_numpy()
+        self.per_ids = periodos.codes.to_numpy()
+        self.user_ids = dataframe['User_ID'].to_numpy()
+        self.rng = np.random.default_rng()
+
+        # Trajetórias por usuário (ordenadas no tempo), montadas uma vez só
+        self.trajetorias = None
+        if 'Timestamp' in dataframe.columns:
+            self.trajetorias = IndiceTrajetorias(self.user_ids, dataframe['Timestamp'].to_numpy(),
+                                                 self.loc_ids, self.per_ids)
         
-        # --- NOVAS AÇÕES ADICIONADAS ---
-        self.actions = [
-            "Oferecer Missão de Combate", # Ação 1: Esporte/Ação
-            "Oferecer Tour Histórico",    # Ação 2: Cultura
-            "Oferecer Item de Energia",   # Ação 3: Descanso/Comida
-            "Negociar Itens",             # Ação 4: Comércio 
-            "Trocar Fofoca/Socializar"    # Ação 5: Social/Bares 
-        ]
+        self.actions = list(ACOES)
         
         counts = dataframe['Venue_Category'].value_counts(normalize=True)
         self.popularity = counts.to_dict()
 
+        # Hotspots espaciais: pontuação por local, já espalhada por linha (bônus = consulta num array)
+        self.modo_hotspot = MODO_HOTSPOT
+        self.hotspots = None
+        self.venues = self.venue_ids = self.bonus_locais = self.bonus_linhas = None
+        if MODO_HOTSPOT == 'espacial':
+            if {'Venue_ID', 'Latitude', 'Longitude'} <= set(dataframe.columns):
+                self._detectar_hotspots(dataframe)
+            else:
+                print("AVISO: sem colunas de local/coordenadas: usando hotspot por categoria.")
+                self.modo_hotspot = 'categoria'
+
+        # Regras semânticas (+ hotspot por categoria) compiladas uma vez: recompensa[categoria, ação]
+        self.indice_local = {loc: i for i, loc in enumerate(self.locations)}
+        self.matriz_recompensa = compilar_matriz_recompensa(
+            self.locations, self.actions, self.popularity if self.modo_hotspot == 'categoria' else {})
+
+    def _detectar_hotspots(self, dataframe):
+        locais = dataframe['Venue_ID'].astype('category').cat
+        self.venues = locais.categories
+        self.venue_ids = locais.codes.to_numpy()
+        lat = dataframe['Latitude'].to_numpy()
+        lon = dataframe['Longitude'].to_numpy()
+        validas = np.isfinite(lat) & np.isfinite(lon) & (self.venue_ids >= 0)
+        self.hotspots = hotspots_espaciais.detectar_por_local(
+            self.venue_ids[validas], lat[validas], lon[validas], RAIO_HOTSPOT_M, MIN_CHECKINS_HOTSPOT,
+            n_locais=len(self.venues))
+        self.bonus_locais = (BONUS_HOTSPOT * self.hotspots.pontuacao).astype(np.float32)
+        self.bonus_linhas = np.where(self.venue_ids >= 0, self.bonus_locais[self.venue_ids], 0).astype(np.float32)
+        print(self.hotspots.descrever())
+
+    def bonus_do_lote(self, lote):
+        """Bônus de hotspot espacial das transições de um lote (None no modo 'categoria')."""
+        return None if self.bonus_linhas is None else self.bonus_linhas[lote.indice]
+
     def get_random_sample(self):
-        sample = self.df.sample(1).iloc[0]
-        return {
-            'User_ID': sample['User_ID'],
-            'Location': sample['Venue_Category'],
-            'Time': sample['Time_OfDay']
+        i = self.rng.integers(len(self.loc_ids))
+        amostra = {
+            'User_ID': self.user_ids[i],
+            'Location': self.locations[self.loc_ids[i]],
+            'Time': self.periods[self.per_ids[i]]
         }
+        if self.venue_ids is not None and self.venue_ids[i] >= 0:
+            amostra['Venue_ID'] = self.venues[self.venue_ids[i]]
+        return amostra
+
+    def criar_amostrador(self, modo='uniforme', semente=None):
+        """Amostrador que sorteia as transições de uma época inteira de uma vez."""
+        if modo in AmostradorTrajetorias.MODOS:
+            if self.trajetorias is None:
+                raise ValueError(f"O modo {modo!r} precisa da coluna 'Timestamp'.")
+            return AmostradorTrajetorias(self.trajetorias, modo, semente)
+        return AmostradorTransicoes(self.loc_ids, self.per_ids, self.user_ids, modo, semente)
+
+    def get_trajectory(self, user_id):
+        """Check-ins de um usuário em ordem cronológica, como estados (dicts)."""
+        fatia = self.trajetorias.trajetoria(user_id)
+        return [{'User_ID': user_id, 'Location': self.locations[l], 'Time': self.periods[p]}
+                for l, p in zip(self.trajetorias.loc[fatia], self.trajetorias.per[fatia])]
 
     def get_reward(self, state, action):
         location = state['Location']
-        reward = -1 
-        loc_lower = str(location).lower()
+        indice = self.indice_local.get(location)
+        if indice is None:  # categoria fora do vocabulário: aplica as regras na hora
+            popularidade = self.popularity if self.modo_hotspot == 'categoria' else {}
+            recompensa = float(linha_recompensa(location, self.actions, popularidade)[self.actions.index(action)])
+        else:
+            recompensa = float(self.matriz_recompensa[indice, self.actions.index(action)])
+        return recompensa + self.bonus_local(state.get('Venue_ID'))
 
-        # 1. CULTURA (Museu, Parque, Arte)
-        if any(x in loc_lower for x in ['museum', 'art', 'history', 'monument', 'park', 'library']):
-            if action == "Oferecer Tour Histórico": reward += 10
-            elif action == "Oferecer Missão de Combate": reward -= 5 # Inadequado
-        
-        # 2. ESPORTE/AÇÃO (Academia, Estádio)
-        elif any(x in loc_lower for x in ['gym', 'stadium', 'fitness', 'sport', 'soccer']):
-            if action == "Oferecer Missão de Combate": reward += 10
-            elif action == "Trocar Fofoca/Socializar": reward -= 2 # Foco no treino
-            
-        # 3. COMIDA/DESCANSO (Café, Restaurante)
-        elif any(x in loc_lower for x in ['cafe', 'coffee', 'food', 'restaurant', 'bakery']):
-            if action == "Oferecer Item de Energia": reward += 10
-            elif action == "Trocar Fofoca/Socializar": reward += 5 # Também é bom socializar comendo
-            
-        # 4. COMÉRCIO (Loja, Shopping, Mall) -> REGRA NOVA
-        elif any(x in loc_lower for x in ['shop', 'store', 'mall', 'market', 'plaza']):
-            if action == "Negociar Itens": reward += 10
-            elif action == "Oferecer Item de Energia": reward += 2
-            
-        # 5. VIDA NOTURNA/SOCIAL (Bar, Club, Nightlife) -> REGRA NOVA
-        elif any(x in loc_lower for x in ['bar', 'club', 'pub', 'lounge', 'night']):
-            if action == "Trocar Fofoca/Socializar": reward += 10
-            elif action == "Negociar Itens": reward -= 2 # Chato vender coisa em balada
-
-        # Bônus de Hotspot
-        if self.popularity.get(location, 0) > 0.01: 
-            reward += 2
-
-        return reward
+    def bonus_local(self, venue_id):
+        """Bônus de hotspot espacial de um local (0 se não houver)."""
+        if self.bonus_locais is None or venue_id is None:
+            return 0.0
+        codigo = self.venues.get_indexer([venue_id])[0]
+        return float(self.bonus_locais[codigo]) if codigo >= 0 else 0.0
+
+    def get_reward_idx(self, location_id, action_id):
+        """Mesma recompensa, a partir dos códigos (consulta direta na matriz)."""
+        return float(self.matriz_recompensa[location_id, action_id])
+
+    def recompensas(self, loc_ids, action_ids):
+        """Recompensas de um lote inteiro com uma única indexação."""
+        return self.matriz_recompensa[loc_ids, action_ids]
 
 # 3. O AGENTE Q-LEARNING (MESMO CÓDIGO)
 class QLearningAgent:
-    def __init__(self, actions):
+    def __init__(self, actions, alpha=0.1, gamma=0.9, epsilon=0.1):
         self.actions = actions
         self.q_table = defaultdict(lambda: defaultdict(float))
-        self.alpha = 0.1; self.gamma = 0.9; self.epsilon = 0.1
+        self.alpha = alpha; self.gamma = gamma; self.epsilon = epsilon
 
     def get_state_key(self, state):
         return f"{state['Location']}_{state['Time']}"
@@ -143,41 +419,195 @@ class QLearningAgent:
         self.q_table[state_key][action] = new_q
 
 # 4. EXECUÇÃO
+def caminho_checkpoint(caminho_dataset=None):
+    """ARQUIVO_CHECKPOINT na pasta do dataset (None se os checkpoints estiverem desligados)."""
+    if not ARQUIVO_CHECKPOINT:
+        return None
+    pasta = os.path.dirname(os.path.abspath(caminho_dataset or NOME_DO_ARQUIVO_CSV))
+    return os.path.join(pasta, ARQUIVO_CHECKPOINT)
+
+def assinatura_recompensa(env):
+    """Hash da recompensa compilada (regras + hotspots): muda se qualquer regra ou bônus mudar."""
+    h = hashlib.blake2b(np.ascontiguousarray(env.matriz_recompensa).tobytes(), digest_size=8)
+    if env.bonus_locais is not None:
+        h.update(np.ascontiguousarray(env.bonus_locais).tobytes())
+    return h.hexdigest()
+
+def configuracao_treino(env):
+    """O que precisa ser igual para um checkpoint valer para este treino."""
+    return {
+        'modo_treino': MODO_TREINO, 'modo_amostragem': MODO_AMOSTRAGEM, 'semente': SEMENTE,
+        'alpha': ALPHA, 'gamma': GAMMA, 'epsilon': EPSILON, 'tamanho_lote': TAMANHO_LOTE,
+        'modo_replay': MODO_REPLAY and [MODO_REPLAY, CAPACIDADE_REPLAY, TAMANHO_REPLAY, REPLAYS_POR_LOTE],
+        'parada': [PARAR_NA_CONVERGENCIA, SEGUNDOS_MAX, TOL_DELTA_MAX, TOL_DELTA_MEDIO, TOL_POLITICA,
+                   BLOCOS_ESTAVEIS],
+        'modo_hotspot': env.modo_hotspot, 'bonus_hotspot': BONUS_HOTSPOT,
+        'raio_hotspot_m': RAIO_HOTSPOT_M, 'min_checkins_hotspot': MIN_CHECKINS_HOTSPOT,
+        'recompensa': assinatura_recompensa(env),
+    }
+
+def retomar_checkpoint(env, total_interations):
+    """
+    Carrega o último checkpoint se ele for compatível com este treino (mesmos
+    vocabulários, mesmo orçamento de interações e mesma configuracao_treino).
+    Retorna (agente, interações já feitas, motivo da parada se aquele treino
+    já terminou) ou (None, 0, None).
+    """
+    caminho = caminho_checkpoint()
+    if not caminho or not os.path.exists(caminho):
+        return None, 0, None
+    try:
+        agent, meta = checkpoint_q.carregar_agente(caminho)
+    except (ValueError, KeyError) as e:
+        print(f"Checkpoint ignorado ({e})")
+        return None, 0, None
+    if (agent.locations != env.locations or agent.periods != env.periods or agent.actions != env.actions
+            or meta.get('total_interacoes') != total_interations):
+        print("Checkpoint é de outro dataset/orçamento: treinando do zero.")
+        return None, 0, None
+    # JSON não tem tupla/float32: compara na forma em que a configuração volta do checkpoint
+    salva, atual = meta.get('configuracao', {}), json.loads(json.dumps(configuracao_treino(env)))
+    diferentes = [chave for chave in atual if salva.get(chave) != atual[chave]]
+    if diferentes:
+        print("Checkpoint é de outra configuração de treino ("
+              + ", ".join(f"{chave}: {salva.get(chave)!r} -> {atual[chave]!r}" for chave in diferentes)
+              + "): treinando do zero.")
+        return None, 0, None
+    return agent, meta.get('interacoes_feitas', 0), meta.get('motivo_parada')
+
+def hotspots_do_checkpoint(env):
+    """
+    Recompensa de hotspot que o aprendizado online precisa para seguir o mesmo
+    alvo: o modo e, no espacial, o bônus de cada local (só os diferentes de 0).
+    """
+    hotspots = {'modo': env.modo_hotspot}
+    if env.bonus_locais is not None:
+        com_bonus = np.flatnonzero(env.bonus_locais)
+        hotspots['bonus_locais'] = dict(zip(map(str, env.venues[com_bonus]),
+                                            env.bonus_locais[com_bonus].tolist()))
+    return hotspots
+
+def salvar_checkpoint(env, agent, feitas, total_interations, motivo=None):
+    checkpoint_q.salvar_agente(caminho_checkpoint(), agent, {
+        'dataset': os.path.basename(NOME_DO_ARQUIVO_CSV), 'interacoes_feitas': feitas,
+        'total_interacoes': total_interations, 'motivo_parada': motivo,
+        'configuracao': configuracao_treino(env), 'hotspots': hotspots_do_checkpoint(env),
+        'salvo_em': datetime.now().isoformat(timespec='seconds'),
+    })
+
 def run_real_data_simulation():
     df_foursquare = carregar_dados_reais(NOME_DO_ARQUIVO_CSV)
     env = DataDrivenEnvironment(df_foursquare)
-    agent = QLearningAgent(env.actions)
     
     print("\n--- 3. INICIANDO TREINAMENTO DO AGENTE ---")
     
-    # Se for modo rápido, mais épocas são treinadas sobre os poucos dados
-    # para garantir que ele aprenda algo
-    epochs = 10 if MODO_TESTE_RAPIDO else 2
-        
-    total_interations = len(df_foursquare) * epochs
-    print(f"Modo: {'RÁPIDO' if MODO_TESTE_RAPIDO else 'COMPLETO'}")
-    print(f"Total de interações: {total_interations}")
+    # Nº de épocas não é fixo: EPOCAS_MAX é só o orçamento, e o treino para
+    # antes se a Tabela Q convergir
+    total_interations = len(df_foursquare) * EPOCAS_MAX
+    print(f"Modo: {MODO_CARREGAMENTO.upper()}")
+    print(f"Orçamento: {total_interations} interações ({EPOCAS_MAX} épocas)"
+          + (f" ou {SEGUNDOS_MAX}s" if SEGUNDOS_MAX else ""))
+
+    agent, feitas, motivo_anterior = retomar_checkpoint(env, total_interations)
+    if agent is None:
+        agent = QLearningAgentDenso(env.actions, env.locations, env.periods, ALPHA, GAMMA, EPSILON)
+    else:
+        print(f"Retomando do checkpoint '{caminho_checkpoint()}': {feitas}/{total_interations} interações já feitas")
+    criterio = CriterioConvergencia(TOL_DELTA_MAX, TOL_DELTA_MEDIO, TOL_POLITICA,
+                                    BLOCOS_ESTAVEIS if PARAR_NA_CONVERGENCIA else None,
+                                    passos_max=total_interations, segundos_max=SEGUNDOS_MAX)
+    if motivo_anterior:
+        # Aquele treino (mesmos dados e mesma configuracao_treino) já tinha terminado:
+        # nada a fazer além de mostrar os resultados
+        print(f"O checkpoint já é de um treino concluído com esta mesma configuração ({motivo_anterior}).")
+        criterio.motivo, criterio.passos = motivo_anterior, feitas
+    restantes = 0 if motivo_anterior else total_interations - feitas
+    
+    # Todas as transições da época são sorteadas de uma vez, já codificadas,
+    # e cada lote é treinado com operações NumPy (escolha da ação inclusive).
+    # Ao retomar, as sementes incluem o ponto de parada (sorteios novos, não repetidos)
+    semente = SEMENTE if feitas == 0 else (SEMENTE, feitas)
+    amostrador = env.criar_amostrador(MODO_AMOSTRAGEM, semente)
+    telemetria = None
+    if TELEMETRIA:
+        telemetria = Telemetria(ARQUIVO_TELEMETRIA, TELEMETRIA, JANELA_TELEMETRIA, JANELA_PERFIL)
+        telemetria.acompanhar(agent)
+        print(f"Telemetria ({TELEMETRIA}) em '{ARQUIVO_TELEMETRIA}'")
+    treinador = TreinadorLote(agent, env.matriz_recompensa, MODO_TREINO, semente, telemetria=telemetria)
+    print(f"Amostragem: {MODO_AMOSTRAGEM} | Treino: {MODO_TREINO}")
+
+    memoria = None
+    if MODO_REPLAY:
+        memoria = MemoriaReplay(CAPACIDADE_REPLAY, MODO_REPLAY == 'prioritario', semente=semente)
+        print(memoria.descrever())
     
-    for i in range(total_interations):
-        state = env.get_random_sample()
-        action = agent.choose_action(state)
-        reward = env.get_reward(state, action)
-        next_state = env.get_random_sample()
-        agent.learn(state, action, reward, next_state)
+    inicio = time.perf_counter()
+    passo_aviso = max(1, total_interations // 10)
+    proximo_aviso = passo_aviso
+    while proximo_aviso <= feitas:
+        proximo_aviso += passo_aviso
+    proximo_checkpoint = feitas + CHECKPOINT_A_CADA
+    # A convergência é avaliada a cada bloco de pelo menos TAMANHO_LOTE
+    # transições (no modo episódico os lotes são bem menores)
+    if not motivo_anterior:
+        criterio.iniciar(agent.q, feitas)
+    proximo_bloco = feitas + TAMANHO_LOTE
+    lotes = amostrador.lotes(restantes, TAMANHO_LOTE)
+    if telemetria is not None:
+        lotes = telemetria.medir_lotes(lotes)
+    for lote in lotes:
+        acoes, recompensas, erros_td = treinador.treinar(lote.loc, lote.per, lote.loc_prox, lote.per_prox,
+                                                         env.bonus_do_lote(lote))
+        feitas += len(recompensas)
+        if telemetria is not None:
+            telemetria.registrar_lote(recompensas, erros_td)
+
+        # Reaproveita transições antigas (amostragem e recompensa já pagas)
+        if memoria is not None:
+            inicio_replay = time.perf_counter()
+            memoria.adicionar(lote.loc, lote.per, acoes, recompensas, lote.loc_prox, lote.per_prox, erros_td)
+            for _ in range(REPLAYS_POR_LOTE):
+                posicoes, t, pesos = memoria.amostrar(TAMANHO_REPLAY)
+                erros = treinador.aprender(t.loc, t.per, t.acao, t.recompensa, t.loc_prox, t.per_prox, pesos)
+                memoria.atualizar_prioridades(posicoes, erros)
+            if telemetria is not None:
+                telemetria.tempos['replay'] += time.perf_counter() - inicio_replay
         
-        if i > 0 and i % (total_interations // 10) == 0:
-            progresso = (i / total_interations) * 100
-            print(f"   Progresso: {progresso:.0f}%...")
+        if feitas >= proximo_aviso and feitas < total_interations:
+            progresso = (feitas / total_interations) * 100
+            print(f"   Progresso: {progresso:.0f}%... (recompensa média do lote: {recompensas.mean():.2f})")
+            while proximo_aviso <= feitas:
+                proximo_aviso += passo_aviso
+
+        if ARQUIVO_CHECKPOINT and feitas >= proximo_checkpoint:
+            salvar_checkpoint(env, agent, feitas, total_interations)
+            proximo_checkpoint = feitas + CHECKPOINT_A_CADA
+
+        if feitas >= proximo_bloco:
+            proximo_bloco = feitas + TAMANHO_LOTE
+            if criterio.atualizar(agent.q, feitas):
+                break
 
+    if criterio.motivo is None and feitas > criterio.passos:
+        criterio.atualizar(agent.q, feitas)   # último bloco (incompleto)
+    criterio.finalizar(feitas)
+    if ARQUIVO_CHECKPOINT:
+        salvar_checkpoint(env, agent, feitas, total_interations, criterio.motivo)
+        print(f"Tabela Q salva em '{caminho_checkpoint()}'")
+    print(criterio.descrever())
+    print(f"Tempo de treino: {time.perf_counter() - inicio:.2f}s")
+    if telemetria is not None:
+        telemetria.fechar()
+        print(f"Tempo por etapa: {telemetria.resumo()}")
     print("--- TREINAMENTO CONCLUÍDO ---\n")
     print("--- 4. RESULTADOS (AMOSTRA) ---")
     
     locais_teste = random.sample(env.locations, min(10, len(env.locations)))
     for loc in locais_teste:
         test_state = {'Location': loc, 'Time': 'Tarde'}
-        state_key = agent.get_state_key(test_state)
-        if agent.q_table[state_key]:
-            best_action = max(agent.q_table[state_key], key=agent.q_table[state_key].get)
+        resultado = agent.melhor_acao(test_state) if 'Tarde' in env.periods else None
+        if resultado:
+            best_action, _ = resultado
             print(f"Local: '{loc[:20]:<20}' -> {best_action}")
         else:
             print(f"Local: '{loc[:20]:<20}' -> (Sem dados)")
@@ -0,0 +1,249 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+
+import artigo2
+import cache_colunar
+import gerador_sintetico
+from agente_denso import QLearningAgentDenso
+from treinador_lote import TreinadorLote
+
+# BENCHMARK DO PIPELINE DE TREINO (artigo2.py)
+# Mede cada etapa isolada, com semente fixa, em vários tamanhos de dataset:
+# tempo (melhor de N repetições) e pico de memória (tracemalloc, numa execução
+# separada para não distorcer o tempo). Os dados são sintéticos, no formato do
+# TSMC2014, gerados localmente (gerador_sintetico.py): não precisa do download do Kaggle.
+#
+# Uso: python benchmark.py --saida bench_base.json              (10k, 100k e 1M linhas)
+#      python benchmark.py --tamanhos 10k,100k,1M,10M --saida bench_10M.json
+#      python benchmark.py --comparar bench_base.json bench_novo.json
+
+TAMANHOS_PADRAO = '10k,100k,1M'   # 10M só pedindo em --tamanhos (minutos e GBs de RAM)
+CHAMADAS = 100000        # chamadas nas etapas medidas por chamada (get_reward etc.)
+REPETICOES = 3
+TOLERANCIA = 0.10        # regressão = mais de 10% pior
+TEMPO_MINIMO_S = 0.005   # diferenças abaixo disso são ruído
+PASTA_DADOS = 'benchmark_dados'
+
+# 1. DADOS SINTÉTICOS (ver gerador_sintetico.py)
+ler_tamanho = gerador_sintetico.ler_tamanho
+
+def rotulo_tamanho(n):
+    for divisor, sufixo in ((10**6, 'M'), (10**3, 'k')):
+        if n >= divisor and n % divisor == 0:
+            return f"{n // divisor}{sufixo}"
+    return str(n)
+
+def preparar_dados(n, semente, pasta=PASTA_DADOS):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"checkins_{rotulo_tamanho(n)}_s{semente}.csv")
+    if not os.path.exists(caminho):
+        print(f"Gerando {caminho}...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            gerador_sintetico.gerar_arquivo(caminho, n, semente)
+    return caminho
+
+# 2. MEDIÇÃO
+def medir(funcao, preparar=None, repeticoes=REPETICOES, memoria=True):
+    """Retorna (melhor tempo em s, pico de memória em bytes ou None). A saída de print é descartada."""
+    tempos = []
+    for _ in range(repeticoes):
+        argumento = preparar() if preparar else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            funcao(argumento)
+            tempos.append(time.perf_counter() - inicio)
+    pico = None
+    if memoria:
+        argumento = preparar() if preparar else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            try:
+                funcao(argumento)
+                _, pico = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    return min(tempos), pico
+
+@contextlib.contextmanager
+def configuracao(**valores):
+    """Troca temporariamente as constantes de configuração do artigo2."""
+    antigos = {nome: getattr(artigo2, nome) for nome in valores}
+    for nome, valor in valores.items():
+        setattr(artigo2, nome, valor)
+    try:
+        yield
+    finally:
+        for nome, valor in antigos.items():
+            setattr(artigo2, nome, valor)
+
+# 3. ETAPAS
+def etapas(caminho, semente, chamadas):
+    """Lista de (nome, função, preparar, nº de chamadas medidas)."""
+    with configuracao(MODO_CARREGAMENTO='completo', USAR_CACHE=False), \
+            contextlib.redirect_stdout(io.StringIO()):
+        df = artigo2.carregar_dados_reais(caminho)
+    env = artigo2.DataDrivenEnvironment(df)
+    rng = np.random.default_rng(semente)
+    linhas = rng.integers(0, len(df), chamadas)
+    estados = [{'Location': env.locations[l], 'Time': env.periods[p]}
+               for l, p in zip(env.loc_ids[linhas], env.per_ids[linhas])]
+    acoes = [env.actions[a] for a in rng.integers(0, len(env.actions), chamadas)]
+    proximos = estados[1:] + estados[:1]
+
+    def sem_cache():
+        shutil.rmtree(cache_colunar.pasta_do_cache(caminho), ignore_errors=True)
+
+    def carregar(_):
+        # Frio ou com cache depende só do preparar (sem_cache apaga o cache antes)
+        with configuracao(MODO_CARREGAMENTO='completo', USAR_CACHE=True):
+            artigo2.carregar_dados_reais(caminho)
+
+    def get_random_sample(_):
+        env.rng = np.random.default_rng(semente)
+        for _ in range(chamadas):
+            env.get_random_sample()
+
+    def get_reward(_):
+        for estado, acao in zip(estados, acoes):
+            env.get_reward(estado, acao)
+
+    def agente_novo():
+        random.seed(semente)
+        return artigo2.QLearningAgent(env.actions)
+
+    def agente_treinado():
+        agent = agente_novo()
+        for estado, acao, proximo in zip(estados, acoes, proximos):
+            agent.learn(estado, acao, 1.0, proximo)
+        return agent
+
+    def choose_action(agent):
+        for estado in estados:
+            agent.choose_action(estado)
+
+    def learn(agent):
+        for estado, acao, proximo in zip(estados, acoes, proximos):
+            agent.learn(estado, acao, 1.0, proximo)
+
+    def treino_lote(_):
+        agent = QLearningAgentDenso(env.actions, env.locations, env.periods)
+        amostrador = env.criar_amostrador('uniforme', semente)
+        treinador = TreinadorLote(agent, env.matriz_recompensa, 'sequencial', semente)
+        for lote in amostrador.lotes(len(env.loc_ids)):
+            treinador.treinar(lote.loc, lote.per, lote.loc_prox, lote.per_prox, env.bonus_do_lote(lote))
+
+    def ponta_a_ponta(_):
+        random.seed(semente)
+        with configuracao(NOME_DO_ARQUIVO_CSV=caminho, MODO_CARREGAMENTO='completo', USAR_CACHE=True,
+                          ARQUIVO_CHECKPOINT=None, SEMENTE=semente, MODO_REPLAY=None,
+                          EPOCAS_MAX=2, PARAR_NA_CONVERGENCIA=False):  # trabalho fixo, comparável
+            artigo2.run_real_data_simulation()
+
+    return [
+        ('carregar_dados_reais (frio)', carregar, sem_cache, 1),
+        ('carregar_dados_reais (cache)', carregar, None, 1),
+        ('DataDrivenEnvironment.__init__', lambda _: artigo2.DataDrivenEnvironment(df), None, 1),
+        ('get_random_sample', get_random_sample, None, chamadas),
+        ('get_reward', get_reward, None, chamadas),
+        ('QLearningAgent.choose_action', choose_action, agente_treinado, chamadas),
+        ('QLearningAgent.learn', learn, agente_novo, chamadas),
+        ('treino em lote (1 época)', treino_lote, None, len(env.loc_ids)),
+        ('run_real_data_simulation', ponta_a_ponta, None, 1),
+    ]
+
+def executar(tamanhos, semente=0, repeticoes=REPETICOES, chamadas=CHAMADAS, memoria=True, pasta=PASTA_DADOS):
+    resultados = []
+    for n in tamanhos:
+        caminho = preparar_dados(n, semente, pasta)
+        print(f"\n--- {rotulo_tamanho(n)} linhas ---")
+        for nome, funcao, preparar, n_chamadas in etapas(caminho, semente, chamadas):
+            tempo, pico = medir(funcao, preparar, repeticoes, memoria)
+            resultado = {
+                'tamanho': n, 'etapa': nome, 'tempo_s': tempo, 'chamadas': n_chamadas,
+                'us_por_chamada': tempo / n_chamadas * 1e6,
+                'pico_memoria_mb': None if pico is None else pico / 2**20,
+            }
+            resultados.append(resultado)
+            memoria_txt = '' if pico is None else f" | pico {resultado['pico_memoria_mb']:.1f} MB"
+            print(f"   {nome:<32} {tempo:9.4f}s ({resultado['us_por_chamada']:.2f} µs/chamada){memoria_txt}")
+    return resultados
+
+def ambiente():
+    return {
+        'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+        'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+# 4. COMPARAÇÃO
+def comparar(arquivo_base, arquivo_novo, tolerancia=TOLERANCIA):
+    """Imprime a variação de cada etapa e retorna a lista de regressões."""
+    with open(arquivo_base, encoding='utf-8') as f:
+        base = {(r['tamanho'], r['etapa']): r for r in json.load(f)['resultados']}
+    with open(arquivo_novo, encoding='utf-8') as f:
+        novo = {(r['tamanho'], r['etapa']): r for r in json.load(f)['resultados']}
+
+    regressoes = []
+    print(f"{'tamanho':>8} {'etapa':<32} {'base (s)':>10} {'novo (s)':>10} {'tempo':>8} {'memória':>8}")
+    for chave in base:  # na ordem do arquivo base (ordem das etapas do pipeline)
+        if chave not in novo:
+            continue
+        b, n = base[chave], novo[chave]
+        razao_tempo = n['tempo_s'] / max(b['tempo_s'], 1e-12)
+        razao_memoria = None
+        if b.get('pico_memoria_mb') and n.get('pico_memoria_mb') is not None:
+            razao_memoria = n['pico_memoria_mb'] / b['pico_memoria_mb']
+
+        alertas = []
+        if razao_tempo > 1 + tolerancia and n['tempo_s'] - b['tempo_s'] > TEMPO_MINIMO_S:
+            alertas.append('tempo')
+        if razao_memoria is not None and razao_memoria > 1 + tolerancia:
+            alertas.append('memória')
+        if alertas:
+            regressoes.append((chave, alertas))
+
+        memoria_txt = '-' if razao_memoria is None else f"{razao_memoria:.2f}x"
+        marca = '  <-- REGRESSÃO (' + ', '.join(alertas) + ')' if alertas else ''
+        print(f"{rotulo_tamanho(chave[0]):>8} {chave[1]:<32} {b['tempo_s']:10.4f} {n['tempo_s']:10.4f} "
+              f"{razao_tempo:7.2f}x {memoria_txt:>8}{marca}")
+
+    faltando = base.keys() - novo.keys()
+    if faltando:
+        print(f"\nEtapas só na base (não comparadas): {len(faltando)}")
+    print(f"\n{len(regressoes)} regressão(ões) acima de {tolerancia * 100:.0f}%.")
+    return regressoes
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do treino do artigo2.")
+    parser.add_argument('--tamanhos', default=TAMANHOS_PADRAO, help=f"padrão: {TAMANHOS_PADRAO} (ex: 10k,100k,1M,10M)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=REPETICOES)
+    parser.add_argument('--chamadas', type=int, default=CHAMADAS)
+    parser.add_argument('--sem-memoria', action='store_true', help="não mede o pico de memória")
+    parser.add_argument('--pasta-dados', default=PASTA_DADOS)
+    parser.add_argument('--saida', default='benchmark.json')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NOVO'))
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(1 if comparar(*args.comparar, args.tolerancia) else 0)
+
+    tamanhos = [ler_tamanho(t) for t in args.tamanhos.split(',')]
+    resultados = executar(tamanhos, args.semente, args.repeticoes, args.chamadas,
+                          not args.sem_memoria, args.pasta_dados)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({'ambiente': dict(ambiente(), semente=args.semente, repeticoes=args.repeticoes),
+                   'resultados': resultados}, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em '{args.saida}'")
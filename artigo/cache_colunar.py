@@ -0,0 +1,235 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+# CACHE COLUNAR DA TABELA PROCESSADA
+# Guarda o resultado de carregar_dados_reais em disco para não precisar
+# reler o CSV e reconverter os horários a cada execução.
+#
+# Layout: <pasta do CSV>/.cache_npc/<nome do CSV>/
+#   meta.json   -> chave do CSV de origem + descrição das colunas (vocabulários)
+#   col<i>.npy  -> códigos inteiros (colunas categóricas) ou valores (numéricas)
+#
+# A chave é (tamanho, mtime, hash do conteúdo) do CSV. Na carga, tamanho e
+# mtime bastam (o cache não relê o CSV); o hash só é conferido com
+# VERIFICAR_HASH = True (ex: arquivos copiados preservando o mtime). O cache é escrito numa
+# pasta temporária ao lado e só troca de lugar com o antigo (os.replace) depois
+# do meta.json gravado: uma escrita interrompida não apaga um cache bom.
+
+VERSAO_CACHE = 1
+PASTA_CACHE = '.cache_npc'
+TAMANHO_BLOCO_HASH = 1 << 20  # 1 MB
+VERIFICAR_HASH = False        # True = confere o conteúdo inteiro do CSV a cada carga (lê o arquivo todo)
+
+def hash_arquivo(caminho_arquivo):
+    """Hash BLAKE2b do conteúdo do arquivo, lido em blocos."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def assinatura_arquivo(caminho_arquivo):
+    """Tamanho e mtime do arquivo (o hash só é calculado quando necessário)."""
+    info = os.stat(caminho_arquivo)
+    return {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+def pasta_do_cache(caminho_arquivo, pasta_cache=None):
+    if pasta_cache is None:
+        pasta_cache = os.path.join(os.path.dirname(os.path.abspath(caminho_arquivo)), PASTA_CACHE)
+    return os.path.join(pasta_cache, os.path.basename(caminho_arquivo))
+
+def _menor_tipo_inteiro(n_valores):
+    # Mesmo critério do pandas para os códigos de um Categorical, assim o
+    # from_codes usa o array mapeado sem copiar
+    for tipo in (np.int8, np.int16, np.int32):
+        if n_valores < np.iinfo(tipo).max:
+            return tipo
+    return np.int64
+
+def _ler_meta(pasta):
+    try:
+        with open(os.path.join(pasta, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def carregar_cache(caminho_arquivo, versao_processamento='', pasta_cache=None, verificar_hash=None):
+    """
+    Retorna (DataFrame, meta) se existir um cache válido para o CSV, senão (None, None).
+    verificar_hash (padrão: VERIFICAR_HASH) confere também o hash do conteúdo.
+    As colunas são abertas com mmap (np.load(mmap_mode='r')); colunas categóricas
+    voltam como pd.Categorical montado sobre os códigos.
+    """
+    pasta = pasta_do_cache(caminho_arquivo, pasta_cache)
+    meta = _ler_meta(pasta)
+    if meta is None or meta.get('versao') != VERSAO_CACHE:
+        return None, None
+    if meta.get('versao_processamento') != versao_processamento:
+        return None, None
+
+    # Tamanho/mtime (um stat); o hash, que lê o CSV inteiro, só no modo estrito
+    chave = meta['chave']
+    if assinatura_arquivo(caminho_arquivo) != {'tamanho': chave['tamanho'], 'mtime_ns': chave['mtime_ns']}:
+        return None, None
+    if VERIFICAR_HASH if verificar_hash is None else verificar_hash:
+        if hash_arquivo(caminho_arquivo) != chave['hash']:
+            return None, None
+
+    dados = {}
+    for coluna in meta['colunas']:
+        valores = np.load(os.path.join(pasta, coluna['arquivo']), mmap_mode='r')
+        if coluna['tipo'] == 'categorica':
+            dados[coluna['nome']] = pd.Categorical.from_codes(valores, coluna['vocabulario'], validate=False)
+        else:
+            dados[coluna['nome']] = valores
+    return pd.DataFrame(dados, copy=False), meta
+
+def codificar_bloco(df):
+    """
+    Converte um bloco do DataFrame para o formato do cache:
+    {coluna: ('categorica', valores_unicos, códigos) ou ('numerica', array)}.
+    """
+    bloco = {}
+    for nome in df.columns:
+        serie = df[nome]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object or pd.api.types.is_string_dtype(serie):
+            codigos, unicos = pd.factorize(serie)
+            bloco[nome] = ('categorica', list(unicos), codigos.astype(np.int32))
+        else:
+            bloco[nome] = ('numerica', serie.to_numpy())
+    return bloco
+
+class EscritorCache:
+    """
+    Escreve o cache em blocos: cada coluna vai sendo anexada a um arquivo
+    binário e os vocabulários/contagens crescem conforme aparecem valores
+    novos. A memória usada não depende do tamanho total da tabela.
+    """
+    def __init__(self, caminho_arquivo, versao_processamento='', pasta_cache=None):
+        self.caminho_arquivo = caminho_arquivo
+        self.versao_processamento = versao_processamento
+        self.destino = pasta_do_cache(caminho_arquivo, pasta_cache)
+        self.pasta = f"{self.destino}.tmp{os.getpid()}"   # só vira o cache no finalizar()
+        if os.path.isdir(self.pasta):
+            shutil.rmtree(self.pasta)
+        os.makedirs(self.pasta)
+
+        self.colunas = []        # descrição das colunas, na ordem do DataFrame
+        self.vocabularios = {}   # coluna categórica -> {valor: código}
+        self.contagens = {}      # coluna categórica -> np.ndarray de contagens por código
+        self.linhas = 0
+        self._arquivos = {}
+
+    def _abrir_colunas(self, bloco):
+        for i, (nome, dados) in enumerate(bloco.items()):
+            coluna = {'nome': nome, 'arquivo': f'col{i}.npy', 'tipo': dados[0]}
+            if dados[0] == 'categorica':
+                coluna['dtype_bruto'] = np.dtype(np.int32).str
+                self.vocabularios[nome] = {}
+                self.contagens[nome] = np.zeros(0, dtype=np.int64)
+            else:
+                coluna['dtype_bruto'] = dados[1].dtype.str
+            self.colunas.append(coluna)
+            self._arquivos[nome] = open(os.path.join(self.pasta, f'col{i}.bin'), 'wb')
+
+    def adicionar_codificado(self, bloco):
+        """Anexa um bloco já codificado por codificar_bloco."""
+        if not self.colunas:
+            self._abrir_colunas(bloco)
+
+        n = 0
+        for nome, dados in bloco.items():
+            if dados[0] == 'categorica':
+                _, unicos, codigos = dados
+                # Traduz os códigos locais do bloco para os códigos globais
+                mapa = self.vocabularios[nome]
+                globais = np.array([mapa.setdefault(v, len(mapa)) for v in unicos], dtype=np.int32)
+                codigos = np.where(codigos >= 0, globais[codigos], -1).astype(np.int32)
+
+                contagem = np.bincount(codigos[codigos >= 0], minlength=len(mapa))
+                anterior = self.contagens[nome]
+                contagem[:len(anterior)] += anterior
+                self.contagens[nome] = contagem
+            else:
+                codigos = dados[1]
+            self._arquivos[nome].write(np.ascontiguousarray(codigos).tobytes())
+            n = len(codigos)
+        self.linhas += n
+
+    def adicionar_bloco(self, df):
+        self.adicionar_codificado(codificar_bloco(df))
+
+    def finalizar(self, extras=None, tamanho_copia=1 << 20):
+        """Converte os binários em .npy (com o menor tipo possível) e grava o meta.json."""
+        for coluna in self.colunas:
+            self._arquivos[coluna['nome']].close()
+            bruto = os.path.join(self.pasta, coluna['arquivo'].replace('.npy', '.bin'))
+            dtype_bruto = np.dtype(coluna.pop('dtype_bruto'))
+            if coluna['tipo'] == 'categorica':
+                vocabulario = list(self.vocabularios[coluna['nome']])
+                coluna['vocabulario'] = vocabulario
+                coluna['contagens'] = self.contagens[coluna['nome']].tolist()
+                dtype_final = np.dtype(_menor_tipo_inteiro(len(vocabulario)))
+            else:
+                dtype_final = dtype_bruto
+
+            destino = np.lib.format.open_memmap(os.path.join(self.pasta, coluna['arquivo']),
+                                                mode='w+', dtype=dtype_final, shape=(self.linhas,))
+            origem = np.memmap(bruto, dtype=dtype_bruto, mode='r', shape=(self.linhas,)) if self.linhas else []
+            for inicio in range(0, self.linhas, tamanho_copia):
+                destino[inicio:inicio + tamanho_copia] = origem[inicio:inicio + tamanho_copia]
+            destino.flush()
+            del destino, origem
+            os.remove(bruto)
+
+        chave = assinatura_arquivo(self.caminho_arquivo)
+        chave['hash'] = hash_arquivo(self.caminho_arquivo)
+        meta = {
+            'versao': VERSAO_CACHE,
+            'versao_processamento': self.versao_processamento,
+            'chave': chave,
+            'linhas': self.linhas,
+            'colunas': self.colunas,
+            'extras': extras or {},
+        }
+        with open(os.path.join(self.pasta, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        # Troca a pasta antiga pela nova (os.replace não sobrescreve pasta com conteúdo)
+        antiga = f"{self.destino}.old{os.getpid()}"
+        if os.path.isdir(self.destino):
+            os.replace(self.destino, antiga)
+        os.replace(self.pasta, self.destino)
+        shutil.rmtree(antiga, ignore_errors=True)
+        self.pasta = self.destino
+        return self.destino
+
+    def descartar(self):
+        """Apaga a pasta temporária (escrita que falhou no meio); o cache antigo fica."""
+        for arquivo in self._arquivos.values():
+            arquivo.close()
+        if self.pasta != self.destino:
+            shutil.rmtree(self.pasta, ignore_errors=True)
+
+def salvar_cache(df, caminho_arquivo, versao_processamento='', pasta_cache=None, extras=None):
+    """
+    Salva o DataFrame inteiro de uma vez. Colunas de texto/categóricas viram
+    códigos inteiros + vocabulário; colunas numéricas são salvas como estão.
+    'extras' é guardado no meta.json (ex: tempo da carga a frio). Se a pasta
+    não puder ser escrita (ex: dataset num diretório somente leitura), avisa e
+    retorna None: o DataFrame já carregado continua valendo.
+    """
+    escritor = None
+    try:
+        escritor = EscritorCache(caminho_arquivo, versao_processamento, pasta_cache)
+        escritor.adicionar_bloco(df)
+        return escritor.finalizar(extras)
+    except OSError as e:
+        print(f"AVISO: cache não salvo ({e})")
+        if escritor is not None:
+            escritor.descartar()
+        return None
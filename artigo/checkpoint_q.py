@@ -0,0 +1,123 @@
+import os
+import json
+import struct
+import numpy as np
+
+from agente_denso import QLearningAgentDenso
+
+# CHECKPOINT DA TABELA Q
+# Formato binário compacto, num arquivo só:
+#   8 bytes  -> assinatura b'NPCQ' + versão (uint32)
+#   8 bytes  -> tamanho do cabeçalho (uint64)
+#   cabeçalho JSON -> eixos (nome + vocabulário), ações, forma, posição dos
+#                     arrays no arquivo e metadados do treino
+#   arrays   -> Tabela Q (float32) e visitas (int32), alinhados em 64 bytes
+#
+# Como os arrays ficam "crus" no arquivo, quem só consulta a política pode
+# abrir a tabela com np.memmap somente leitura: vários processos (servidores
+# de NPC) compartilham a mesma cópia no cache de páginas do sistema.
+
+ASSINATURA = b'NPCQ'
+VERSAO_FORMATO = 1
+ALINHAMENTO = 64
+
+class CheckpointQ:
+    """Checkpoint aberto: q/visitas são memmaps (ou arrays) e o resto vem do cabeçalho."""
+    def __init__(self, caminho, cabecalho, q, visitas):
+        self.caminho = caminho
+        self.eixos = [(eixo['nome'], eixo['vocabulario']) for eixo in cabecalho['eixos']]
+        self.acoes = cabecalho['acoes']
+        self.metadados = cabecalho['metadados']
+        self.q = q
+        self.visitas = visitas
+
+    def vocabulario(self, nome):
+        return dict(self.eixos)[nome]
+
+def _alinhar(posicao):
+    return (posicao + ALINHAMENTO - 1) // ALINHAMENTO * ALINHAMENTO
+
+def salvar_checkpoint(caminho, q, eixos, acoes, visitas=None, metadados=None):
+    """
+    Grava a tabela (com forma = tamanhos dos eixos + nº de ações). 'eixos' é uma
+    lista [(nome, vocabulário), ...]. A escrita é atômica (arquivo temporário +
+    os.replace), então um processo lendo nunca vê um checkpoint pela metade.
+    """
+    q = np.ascontiguousarray(q, dtype=np.float32)
+    forma_esperada = tuple(len(vocab) for _, vocab in eixos) + (len(acoes),)
+    if q.shape != forma_esperada:
+        raise ValueError(f"Forma da tabela {q.shape} não bate com os eixos/ações {forma_esperada}.")
+    arrays = [('q', q)]
+    if visitas is not None:
+        arrays.append(('visitas', np.ascontiguousarray(visitas, dtype=np.int32)))
+
+    cabecalho = {
+        'eixos': [{'nome': nome, 'vocabulario': list(vocab)} for nome, vocab in eixos],
+        'acoes': list(acoes),
+        'forma': list(q.shape),
+        'arrays': {},
+        'metadados': metadados or {},
+    }
+    # As posições dos arrays dependem do tamanho do próprio cabeçalho: calcula com
+    # posições zeradas e deixa folga para os dígitos das posições verdadeiras
+    cabecalho['arrays'] = {nome: {'dtype': a.dtype.str, 'posicao': 0} for nome, a in arrays}
+    texto = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+    posicao = _alinhar(16 + len(texto) + 20 * len(arrays))
+    for nome, array in arrays:
+        cabecalho['arrays'][nome]['posicao'] = posicao
+        posicao = _alinhar(posicao + array.nbytes)
+    texto = json.dumps(cabecalho, ensure_ascii=False).encode('utf-8')
+    posicoes = {nome: info['posicao'] for nome, info in cabecalho['arrays'].items()}
+
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, 'wb') as f:
+        f.write(ASSINATURA + struct.pack('<I', VERSAO_FORMATO))
+        f.write(struct.pack('<Q', len(texto)))
+        f.write(texto)
+        for nome, array in arrays:
+            f.write(b'\0' * (posicoes[nome] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(temporario, caminho)
+
+def ler_cabecalho(caminho):
+    with open(caminho, 'rb') as f:
+        inicio = f.read(16)
+        if len(inicio) < 16 or inicio[:4] != ASSINATURA:
+            raise ValueError(f"'{caminho}' não é um checkpoint de Tabela Q.")
+        versao, = struct.unpack('<I', inicio[4:8])
+        if versao != VERSAO_FORMATO:
+            raise ValueError(f"Versão de checkpoint não suportada: {versao}")
+        tamanho, = struct.unpack('<Q', inicio[8:16])
+        return json.loads(f.read(tamanho).decode('utf-8'))
+
+def abrir_checkpoint(caminho, modo='r'):
+    """
+    Abre o checkpoint com os arrays mapeados em memória. modo='r' é somente
+    leitura (compartilhado entre processos); modo='c' permite alterar a cópia
+    local sem mexer no arquivo (usado para retomar o treino).
+    """
+    cabecalho = ler_cabecalho(caminho)
+    forma = tuple(cabecalho['forma'])
+    arrays = {}
+    for nome, info in cabecalho['arrays'].items():
+        arrays[nome] = np.memmap(caminho, dtype=np.dtype(info['dtype']), mode=modo,
+                                 offset=info['posicao'], shape=forma)
+    return CheckpointQ(caminho, cabecalho, arrays['q'], arrays.get('visitas'))
+
+# --- Atalhos para o QLearningAgentDenso (eixos local × período) ---
+def salvar_agente(caminho, agent, metadados=None):
+    metadados = dict(metadados or {}, alpha=agent.alpha, gamma=agent.gamma, epsilon=agent.epsilon)
+    salvar_checkpoint(caminho, agent.q, [('local', agent.locations), ('periodo', agent.periods)],
+                      agent.actions, agent.visitas, metadados)
+
+def carregar_agente(caminho):
+    """Cria um QLearningAgentDenso com a tabela do checkpoint (cópia em memória, para continuar treinando)."""
+    checkpoint = abrir_checkpoint(caminho)
+    meta = checkpoint.metadados
+    agent = QLearningAgentDenso(checkpoint.acoes, checkpoint.vocabulario('local'), checkpoint.vocabulario('periodo'),
+                                alpha=meta.get('alpha', 0.1), gamma=meta.get('gamma', 0.9),
+                                epsilon=meta.get('epsilon', 0.1))
+    agent.q[...] = checkpoint.q
+    if checkpoint.visitas is not None:
+        agent.visitas[...] = checkpoint.visitas
+    return agent, meta
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+
+# PARADA POR CONVERGÊNCIA
+# Em vez de um nº fixo de épocas, o treino é acompanhado bloco a bloco
+# (um bloco = um lote de transições) e para assim que a Tabela Q estabiliza:
+#   - variação máxima e média de Q no bloco (|Q_novo - Q_antigo|), relativas
+#     à escala da tabela (média de |Q| nas células aprendidas), pois os
+#     valores crescem até ~ recompensa / (1 - gamma)
+#   - política gulosa estável nos últimos K blocos: poucos estados (uma fração
+#     dos já aprendidos) trocaram a ação gulosa por uma que seja melhor por mais
+#     que uma margem (ações com valores praticamente empatados trocam de
+#     posição o tempo todo)
+#
+# Com alpha constante a Tabela Q nunca fica parada: cada bloco ainda mexe um
+# pouco nos valores (ruído da amostragem). Por isso as tolerâncias padrão ficam
+# um pouco acima desse patamar de ruído, e não em zero.
+# Também há orçamento máximo em passos e/ou segundos (blocos_estaveis=None
+# desliga a parada antecipada e só os orçamentos valem). O motivo da parada e
+# os passos usados ficam registrados.
+
+MOTIVOS = {
+    'convergiu': 'Tabela Q e política estáveis',
+    'orcamento_passos': 'orçamento de passos esgotado',
+    'orcamento_tempo': 'orçamento de tempo esgotado',
+    'fim_dos_dados': 'fim das transições disponíveis',
+}
+
+class CriterioConvergencia:
+    def __init__(self, tol_max=0.5, tol_media=0.02, tol_politica=0.15, blocos_estaveis=5,
+                 margem_politica=0.05, passos_min=0, passos_max=None, segundos_max=None):
+        self.tol_max = tol_max
+        self.tol_media = tol_media
+        self.tol_politica = tol_politica
+        self.blocos_estaveis = blocos_estaveis
+        self.margem_politica = margem_politica
+        self.passos_min = passos_min
+        self.passos_max = passos_max
+        self.segundos_max = segundos_max
+
+        self.historico = []
+        self.estaveis = 0      # blocos seguidos dentro das tolerâncias
+        self.motivo = None
+        self.passos = 0
+        self._anterior = None
+        self._inicio = None
+
+    def iniciar(self, q, passos=0):
+        """Guarda a tabela inicial (ex: a retomada de um checkpoint)."""
+        self._anterior = np.where(np.isfinite(q), q, 0).astype(np.float32)
+        self._inicio = time.perf_counter()
+        self.passos = passos
+
+    def atualizar(self, q, passos):
+        """
+        Avalia o bloco que terminou em 'passos'. Retorna o motivo da parada
+        (uma chave de MOTIVOS) ou None para continuar.
+        """
+        if self._anterior is None:
+            self.iniciar(q)
+        self.passos = passos
+        atual = np.where(np.isfinite(q), q, 0).astype(np.float32)
+        anterior = self._anterior
+        escala = max(1.0, float(np.abs(atual).mean()))
+
+        delta = np.abs(atual - anterior)
+        delta_max = float(delta.max()) / escala
+        delta_medio = float(delta.mean()) / escala
+
+        # Troca de política "de verdade": a ação gulosa antiga ficou pior que a
+        # nova por mais que a margem (na tabela atual)
+        plana = atual.reshape(-1, atual.shape[-1])
+        gulosas_antes = anterior.reshape(plana.shape).argmax(axis=1)
+        linhas = np.arange(len(plana))
+        perda = plana.max(axis=1) - plana[linhas, gulosas_antes]
+        mudancas = int((perda > self.margem_politica * escala).sum())
+        aprendidos = max(1, int((plana != 0).any(axis=1).sum()))
+        fracao_mudancas = mudancas / aprendidos
+
+        dentro = (delta_max <= self.tol_max and delta_medio <= self.tol_media
+                  and fracao_mudancas <= self.tol_politica)
+        self.estaveis = self.estaveis + 1 if dentro else 0
+        self._anterior = atual
+        self.historico.append({'passos': passos, 'delta_max': delta_max, 'delta_medio': delta_medio,
+                               'mudancas_politica': mudancas, 'fracao_mudancas': fracao_mudancas,
+                               'escala_q': escala})
+
+        if (self.blocos_estaveis is not None and self.estaveis >= self.blocos_estaveis
+                and passos >= self.passos_min):
+            self.motivo = 'convergiu'
+        elif self.passos_max is not None and passos >= self.passos_max:
+            self.motivo = 'orcamento_passos'
+        elif self.segundos_max is not None and time.perf_counter() - self._inicio >= self.segundos_max:
+            self.motivo = 'orcamento_tempo'
+        return self.motivo
+
+    def finalizar(self, passos):
+        """Fim do laço sem parada antecipada (ex: o gerador de lotes acabou)."""
+        if self.motivo is None:
+            self.passos = passos
+            self.motivo = 'fim_dos_dados'
+        return self.motivo
+
+    def descrever(self):
+        texto = f"Parada: {MOTIVOS.get(self.motivo, self.motivo)} após {self.passos:,} passos"
+        if self.historico:
+            ultimo = self.historico[-1]
+            texto += (f" (último bloco: ΔQ máx {ultimo['delta_max']:.4f}, ΔQ médio {ultimo['delta_medio']:.5f}, "
+                      f"{ultimo['mudancas_politica']} trocas de política, {ultimo['fracao_mudancas']:.1%} dos estados)")
+        return texto
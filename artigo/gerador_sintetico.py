@@ -0,0 +1,279 @@
+import io
+import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# GERADOR SINTÉTICO DE CHECK-INS (ESQUEMA DO TSMC2014)
+# Gera arquivos no mesmo formato do dataset do Foursquare, para testar em
+# qualquer máquina e em escalas bem maiores que o original:
+#   userId, venueId, venueCategoryId, venueCategory, latitude, longitude,
+#   timezoneOffset, utcTimestamp
+#
+# O "mundo" (categorias, locais, usuários) sai só da semente:
+#   - popularidade das categorias segue uma lei de Zipf
+#   - os locais (venues) ficam agrupados em torno de hotspots da cidade
+#   - cada usuário tem um ritmo diário (picos de manhã, almoço e noite com
+#     pesos e horários próprios), uma região de origem e um nível de atividade
+#   - a categoria escolhida depende do período do dia (café de manhã, bar à noite)
+#
+# As linhas são geradas em blocos, cada um com a sua semente (semente, 1, nº do bloco),
+# em paralelo; os blocos são escritos na ordem e com no máximo 2 por processo
+# em memória. O arquivo é idêntico byte a byte para a mesma semente (e o mesmo
+# tamanho de bloco), com qualquer nº de processos.
+#
+# Uso: python gerador_sintetico.py saida.csv --linhas 10M --processos 8
+#      python gerador_sintetico.py saida.parquet --linhas 1M   (precisa do pyarrow)
+
+LINHAS_POR_BLOCO = 500_000
+MAX_LOCAIS = 500_000
+EXPOENTE_ZIPF = 1.1
+INICIO_PERIODO = '2012-04-03'
+DIAS = 320
+CENTRO = (40.7484, -73.9857)      # Manhattan
+RAIO_CIDADE_GRAUS = (0.12, 0.15)  # meia altura/largura da área (lat, lon)
+
+CATEGORIAS_REAIS = [
+    # (nome, afinidade por período: madrugada, manhã, tarde, noite)
+    ('Bar', (1.5, 0.1, 0.5, 3.0)), ('Home (private)', (2.0, 1.0, 0.5, 1.5)),
+    ('Office', (0.1, 2.5, 2.0, 0.3)), ('Subway', (0.3, 2.5, 1.0, 1.5)),
+    ('Coffee Shop', (0.1, 3.0, 1.0, 0.3)), ('Gym / Fitness Center', (0.2, 2.0, 0.8, 1.5)),
+    ('Food & Drink Shop', (0.2, 0.8, 1.5, 1.0)), ('Train Station', (0.3, 2.0, 1.0, 1.5)),
+    ('Park', (0.1, 1.0, 2.0, 0.7)), ('Restaurant', (0.2, 0.3, 2.0, 2.0)),
+    ('Museum', (0.0, 1.0, 2.5, 0.3)), ('Mall', (0.0, 0.5, 2.5, 1.0)),
+    ('Nightlife Spot', (2.5, 0.0, 0.2, 2.5)), ('Stadium', (0.2, 0.2, 1.5, 2.0)),
+    ('Art Gallery', (0.0, 0.8, 2.0, 1.0)), ('Bakery', (0.2, 2.5, 1.0, 0.3)),
+    ('Plaza', (0.3, 1.0, 1.5, 1.2)), ('Library', (0.0, 1.5, 2.0, 0.5)),
+]
+
+# Horas que separam madrugada/manhã/tarde/noite (mesmos cortes do artigo2)
+LIMITES_PERIODOS = [5, 12, 18]
+
+# 1. O MUNDO (DEPENDE SÓ DA SEMENTE)
+def _ids_hex(rng, n):
+    """Identificadores de 24 dígitos hexadecimais, como os do Foursquare."""
+    partes = rng.integers(0, 2**32, (n, 3), dtype=np.uint64)
+    return np.array([f'{a:08x}{b:08x}{c:08x}' for a, b, c in partes.tolist()], dtype=object)
+
+class Mundo:
+    def __init__(self, semente=0, n_usuarios=1000, n_categorias=400, n_locais=None, n_hotspots=60):
+        rng = np.random.default_rng((semente, 0))
+        n_locais = n_locais or int(np.clip(n_usuarios * 20, 200, MAX_LOCAIS))
+
+        # Categorias: as reais primeiro (mais populares), depois genéricas
+        nomes = [nome for nome, _ in CATEGORIAS_REAIS]
+        afinidade = [a for _, a in CATEGORIAS_REAIS]
+        for i in range(max(0, n_categorias - len(nomes))):
+            nomes.append(f'Categoria {i}')
+            afinidade.append(tuple(rng.gamma(2.0, 0.5, 4)))
+        self.categorias = np.array(nomes[:n_categorias], dtype=object)
+        n_categorias = len(self.categorias)
+        # Toda categoria precisa de ao menos um local (senão não há onde sortear o check-in)
+        n_locais = max(n_locais, n_categorias)
+        self.ids_categoria = _ids_hex(rng, n_categorias)
+        zipf = 1.0 / np.arange(1, n_categorias + 1) ** EXPOENTE_ZIPF
+        # Peso de cada categoria em cada período (linhas = períodos): Zipf × afinidade
+        pesos = np.array(afinidade[:n_categorias], dtype=np.float64).T * zipf
+        self.cdf_categoria = np.cumsum(pesos, axis=1)
+        self.cdf_categoria /= self.cdf_categoria[:, -1:]
+
+        # Hotspots e locais: a maioria dos locais fica perto de algum hotspot
+        raio = np.array(RAIO_CIDADE_GRAUS)
+        self.hotspots = CENTRO + rng.uniform(-1, 1, (n_hotspots, 2)) * raio
+        espalhamento = rng.uniform(0.002, 0.01, n_hotspots)
+        hotspot = rng.integers(0, n_hotspots, n_locais)
+        perto = rng.random(n_locais) < 0.8
+        self.coordenadas = np.where(perto[:, None],
+                                    self.hotspots[hotspot] + rng.normal(0, 1, (n_locais, 2)) * espalhamento[hotspot, None],
+                                    CENTRO + rng.uniform(-1, 1, (n_locais, 2)) * raio)
+        self.hotspot_do_local = np.where(perto, hotspot, -1)
+        self.ids_local = _ids_hex(rng, n_locais)
+
+        # Cada local tem uma categoria (Zipf geral); locais agrupados por categoria (estilo CSR)
+        cdf_geral = np.cumsum(zipf) / zipf.sum()
+        categoria_do_local = np.searchsorted(cdf_geral, rng.random(n_locais), side='right').clip(max=n_categorias - 1)
+        # Garante ao menos um local por categoria
+        categoria_do_local[:n_categorias] = np.arange(n_categorias)
+        self.locais_por_categoria = np.argsort(categoria_do_local, kind='stable')
+        contagem = np.bincount(categoria_do_local, minlength=n_categorias)
+        self.inicio_categoria = np.concatenate([[0], np.cumsum(contagem)])
+        self.categoria_do_local = categoria_do_local
+
+        # Usuários: atividade (log-normal), hotspot de origem e ritmo diário
+        atividade = rng.lognormal(0, 1.0, n_usuarios)
+        self.cdf_usuario = np.cumsum(atividade) / atividade.sum()
+        self.origem = rng.integers(0, n_hotspots, n_usuarios)
+        self.picos = np.stack([rng.normal(8, 1.0, n_usuarios),      # manhã
+                               rng.normal(12.5, 0.7, n_usuarios),   # almoço
+                               rng.normal(19.5, 1.5, n_usuarios)],  # noite
+                              axis=1)
+        peso_picos = rng.dirichlet([2, 1.5, 2.5], n_usuarios)
+        self.cdf_picos = np.cumsum(peso_picos, axis=1)
+        self.noturno = rng.random(n_usuarios) < 0.15  # desloca o ritmo para mais tarde
+        self.n_usuarios = n_usuarios
+
+# 2. UM BLOCO DE LINHAS
+def _sortear_cdf(cdf, u):
+    """Sorteio por linha com CDFs diferentes (uma linha de cdf por sorteio)."""
+    return (u[:, None] > cdf).sum(axis=1)
+
+def gerar_bloco(mundo, semente, bloco, n):
+    """DataFrame com n check-ins do bloco dado (determinístico para (semente, bloco))."""
+    rng = np.random.default_rng((semente, 1, bloco))
+    usuario = np.searchsorted(mundo.cdf_usuario, rng.random(n), side='right').clip(max=mundo.n_usuarios - 1)
+
+    # Hora local: um dos picos do usuário + ruído (noturnos, 3h mais tarde)
+    pico = _sortear_cdf(mundo.cdf_picos[usuario][:, :-1], rng.random(n))
+    hora = mundo.picos[usuario, pico] + rng.normal(0, 1.3, n) + 3.0 * mundo.noturno[usuario]
+    segundo_do_dia = (np.mod(hora, 24) * 3600).astype(np.int64)
+    dia = rng.integers(0, DIAS, n)
+
+    # Categoria pelo período do dia, local da categoria (preferindo a região de origem)
+    periodo = np.searchsorted(LIMITES_PERIODOS, segundo_do_dia // 3600, side='right')
+    u = rng.random(n)
+    categoria = np.empty(n, dtype=np.int64)
+    for p in range(4):
+        linhas = periodo == p
+        categoria[linhas] = np.searchsorted(mundo.cdf_categoria[p], u[linhas], side='right')
+    categoria = categoria.clip(max=len(mundo.categorias) - 1)
+    inicio, fim = mundo.inicio_categoria[categoria], mundo.inicio_categoria[categoria + 1]
+    candidato = mundo.locais_por_categoria[inicio[:, None] + (rng.random((n, 3)) * (fim - inicio)[:, None]).astype(np.int64)]
+    # Entre 3 locais sorteados, fica o da região de origem do usuário (se houver)
+    da_origem = mundo.hotspot_do_local[candidato] == mundo.origem[usuario][:, None]
+    local = candidato[np.arange(n), da_origem.argmax(axis=1)]
+
+    # Fuso de Nova York: -240 (horário de verão) até 04/11/2012, depois -300
+    data_local = pd.Timestamp(INICIO_PERIODO) + pd.to_timedelta(dia, unit='D')
+    fuso = np.where(data_local < pd.Timestamp('2012-11-04'), -240, -300)
+    instante_local = data_local.to_numpy() + (segundo_do_dia * 10**9).astype('timedelta64[ns]')
+    utc = pd.DatetimeIndex(instante_local - (fuso * 60 * 10**9).astype('timedelta64[ns]'))
+
+    coordenadas = mundo.coordenadas[local] + rng.normal(0, 2e-5, (n, 2))  # ruído do GPS
+    return pd.DataFrame({
+        'userId': usuario + 1,
+        'venueId': mundo.ids_local[local],
+        'venueCategoryId': mundo.ids_categoria[mundo.categoria_do_local[local]],
+        'venueCategory': mundo.categorias[mundo.categoria_do_local[local]],
+        'latitude': coordenadas[:, 0],
+        'longitude': coordenadas[:, 1],
+        'timezoneOffset': fuso,
+        'utcTimestamp': formatar_timestamps(utc),
+    })
+
+_TEXTO_HORAS = None
+
+def formatar_timestamps(utc):
+    """'Tue Apr 03 18:00:09 +0000 2012' montado por consulta (strftime linha a linha é lento)."""
+    global _TEXTO_HORAS
+    if _TEXTO_HORAS is None:
+        s = np.arange(86400)
+        _TEXTO_HORAS = np.array([f"{h:02d}:{m:02d}:{x:02d}" for h, m, x in zip(s // 3600, s // 60 % 60, s % 60)],
+                                dtype=object)
+    dias = utc.normalize()
+    unicos, inverso = np.unique(dias.to_numpy(), return_inverse=True)
+    unicos = pd.DatetimeIndex(unicos)
+    prefixos = np.array(unicos.strftime('%a %b %d '), dtype=object)
+    sufixos = np.array(unicos.strftime(' +0000 %Y'), dtype=object)
+    segundos = ((utc - dias).total_seconds()).to_numpy().astype(np.int64)
+    return prefixos[inverso] + _TEXTO_HORAS[segundos] + sufixos[inverso]
+
+def _texto_csv(df, cabecalho):
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=cabecalho, float_format='%.6f', lineterminator='\n')
+    return buffer.getvalue().encode('utf-8')
+
+# 3. GERAÇÃO PARALELA
+_MUNDO = {}
+
+def _iniciar_processo(semente, parametros_mundo):
+    _MUNDO['mundo'] = Mundo(semente, **parametros_mundo)
+
+def _gerar_bloco_csv(semente, bloco, n):
+    return _texto_csv(gerar_bloco(_MUNDO['mundo'], semente, bloco, n), cabecalho=(bloco == 0))
+
+def _gerar_bloco_df(semente, bloco, n):
+    return gerar_bloco(_MUNDO['mundo'], semente, bloco, n)
+
+def gerar_arquivo(caminho, n_linhas, semente=0, n_usuarios=None, n_categorias=400, n_processos=None,
+                  linhas_por_bloco=LINHAS_POR_BLOCO, formato=None):
+    """
+    Gera o arquivo (CSV, ou Parquet se a extensão for .parquet). A memória
+    usada depende só do tamanho do bloco, não do nº de linhas.
+    """
+    formato = formato or ('parquet' if caminho.endswith('.parquet') else 'csv')
+    n_processos = n_processos or os.cpu_count() or 1
+    parametros_mundo = {'n_usuarios': n_usuarios or max(10, min(n_linhas // 200, 2_000_000)),
+                        'n_categorias': n_categorias}
+    blocos = [(b, min(linhas_por_bloco, n_linhas - inicio))
+              for b, inicio in enumerate(range(0, n_linhas, linhas_por_bloco))]
+
+    escritor_parquet = None
+    if formato == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("O formato Parquet precisa do pacote 'pyarrow' (pip install pyarrow).")
+    tarefa_bloco = _gerar_bloco_csv if formato == 'csv' else _gerar_bloco_df
+
+    inicio = time.perf_counter()
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    pendentes = deque()
+    feitas = 0
+
+    def escrever(tarefa, n):
+        nonlocal escritor_parquet, feitas
+        resultado = tarefa.result()
+        if formato == 'csv':
+            saida.write(resultado)
+        else:
+            tabela = pa.Table.from_pandas(resultado, preserve_index=False)
+            if escritor_parquet is None:
+                escritor_parquet = pq.ParquetWriter(temporario, tabela.schema)
+            escritor_parquet.write_table(tabela)
+        feitas += n
+        print(f"   {feitas:,}/{n_linhas:,} linhas ({feitas / (time.perf_counter() - inicio):,.0f} linhas/s)")
+
+    saida = open(temporario, 'wb') if formato == 'csv' else None
+    try:
+        with ProcessPoolExecutor(n_processos, initializer=_iniciar_processo,
+                                 initargs=(semente, parametros_mundo)) as pool:
+            for bloco, n in blocos:
+                pendentes.append((pool.submit(tarefa_bloco, semente, bloco, n), n))
+                if len(pendentes) >= 2 * n_processos:
+                    escrever(*pendentes.popleft())
+            while pendentes:
+                escrever(*pendentes.popleft())
+    finally:
+        if saida is not None:
+            saida.close()
+        if escritor_parquet is not None:
+            escritor_parquet.close()
+    os.replace(temporario, caminho)
+    return time.perf_counter() - inicio
+
+def ler_tamanho(texto):
+    """'10k' -> 10000, '1M' -> 1000000, '2B' -> 2000000000."""
+    multiplicadores = {'k': 10**3, 'm': 10**6, 'b': 10**9}
+    texto = texto.strip().lower()
+    if texto[-1] in multiplicadores:
+        return int(float(texto[:-1]) * multiplicadores[texto[-1]])
+    return int(texto)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera check-ins sintéticos no esquema do TSMC2014.")
+    parser.add_argument('saida', help="arquivo .csv ou .parquet")
+    parser.add_argument('--linhas', default='1M', help="ex: 100k, 10M, 300M")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--usuarios', type=int, default=None, help="padrão: linhas / 200")
+    parser.add_argument('--categorias', type=int, default=400)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO)
+    args = parser.parse_args()
+
+    tempo = gerar_arquivo(args.saida, ler_tamanho(args.linhas), args.semente, args.usuarios, args.categorias,
+                          args.processos, args.linhas_por_bloco)
+    print(f"Arquivo '{args.saida}' gerado em {tempo:.1f}s")
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+
+# ÍNDICE ESPACIAL EM GRADE UNIFORME
+# As coordenadas (graus) são projetadas em metros num plano local
+# (equiretangular em torno da latitude de referência; o erro é desprezível na
+# escala de uma cidade) e cada ponto cai numa célula quadrada de lado fixo.
+# Os pontos são ordenados por célula e guardados no estilo CSR:
+#
+#   pontos da célula c = ordem[inicios[c]:inicios[c] + contagens[c]]
+#
+# Só as células não vazias existem (chaves int64 ordenadas); achar uma célula
+# é um searchsorted. Assim as consultas de vizinhança olham só as células em
+# volta, sem nenhuma distância par a par entre todos os pontos.
+#
+# Consultas por posição (no_raio, mais_proximo) aceitam um ponto ou arrays com
+# milhares de posições: as células candidatas de todas as consultas saem de um
+# único searchsorted e são expandidas nos seus pontos com np.repeat. Para um
+# ponto só, o custo fixo do NumPy domina; ponto_mais_proximo faz a mesma busca
+# em Python puro sobre um dicionário célula -> pontos (microssegundos).
+
+RAIO_TERRA_M = 6_371_000.0
+_DESLOCAMENTO = 1 << 30   # índices de célula negativos viram positivos na chave
+
+class GradeEspacial:
+    def __init__(self, lat, lon, tamanho_celula_m, lat_referencia=None):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.n = len(lat)
+        self.tamanho_celula = float(tamanho_celula_m)
+        if lat_referencia is None:
+            lat_referencia = float(np.median(lat)) if self.n else 0.0
+        self.lat_referencia = lat_referencia
+        self.m_por_grau_lat = RAIO_TERRA_M * np.pi / 180
+        self.m_por_grau_lon = self.m_por_grau_lat * np.cos(np.radians(self.lat_referencia))
+
+        x, y = self.projetar(lat, lon)
+        chave = self._chave(*self._indices(x, y))
+        self.ordem = np.argsort(chave, kind='stable')
+        self.chaves, self.inicios, self.contagens = np.unique(chave[self.ordem], return_index=True,
+                                                              return_counts=True)
+        # Coordenadas na ordem das células (memória contígua nas consultas)
+        self.x = np.ascontiguousarray(x[self.ordem])
+        self.y = np.ascontiguousarray(y[self.ordem])
+        # Célula (posição em self.chaves) de cada ponto, na ordem original
+        self.celula_do_ponto = np.empty(self.n, dtype=np.int64)
+        self.celula_do_ponto[self.ordem] = np.repeat(np.arange(len(self.chaves)), self.contagens)
+        self._escalares = None
+
+    @property
+    def n_celulas(self):
+        return len(self.chaves)
+
+    def projetar(self, lat, lon):
+        """(lat, lon) em graus -> (x, y) em metros no plano local da grade."""
+        return (np.asarray(lon, dtype=np.float64) * self.m_por_grau_lon,
+                np.asarray(lat, dtype=np.float64) * self.m_por_grau_lat)
+
+    def _indices(self, x, y):
+        return (np.floor(x / self.tamanho_celula).astype(np.int64),
+                np.floor(y / self.tamanho_celula).astype(np.int64))
+
+    @staticmethod
+    def _chave(ix, iy):
+        return (ix + _DESLOCAMENTO) * (1 << 31) + (iy + _DESLOCAMENTO)
+
+    def _indices_das_celulas(self):
+        iy = self.chaves % (1 << 31) - _DESLOCAMENTO
+        ix = self.chaves // (1 << 31) - _DESLOCAMENTO
+        return ix, iy
+
+    def localizar(self, ix, iy):
+        """Posição das células (ix, iy) em self.chaves, ou -1 se estiverem vazias."""
+        chave = self._chave(np.asarray(ix), np.asarray(iy))
+        if len(self.chaves) == 0:
+            return np.full(chave.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.chaves, chave), len(self.chaves) - 1)
+        return np.where(self.chaves[pos] == chave, pos, -1)
+
+    def vizinhas(self, alcance=1):
+        """
+        Para cada deslocamento (dx, dy) com |dx|, |dy| <= alcance, a posição da
+        célula vizinha de cada célula (ou -1). Lista de arrays de n_celulas.
+        """
+        ix, iy = self._indices_das_celulas()
+        return [self.localizar(ix + dx, iy + dy)
+                for dx in range(-alcance, alcance + 1) for dy in range(-alcance, alcance + 1)]
+
+    def somar_vizinhanca(self, valores, alcance=1, vizinhas=None):
+        """Soma de um valor por célula sobre a vizinhança (2*alcance+1)² de cada célula."""
+        valores = np.asarray(valores)
+        soma = np.zeros(len(self.chaves), dtype=np.result_type(valores.dtype, np.int64))
+        for vizinha in vizinhas if vizinhas is not None else self.vizinhas(alcance):
+            existe = vizinha >= 0
+            soma[existe] += valores[vizinha[existe]]
+        return soma
+
+    def _candidatos(self, qx, qy, alcance):
+        """Pares (consulta, posição do ponto na ordem da grade) nas (2*alcance+1)² células em volta."""
+        ix, iy = self._indices(qx, qy)
+        d = np.arange(-alcance, alcance + 1)
+        dx, dy = np.repeat(d, len(d)), np.tile(d, len(d))
+        celulas = self.localizar((ix[:, None] + dx).ravel(), (iy[:, None] + dy).ravel())
+        consulta = np.repeat(np.arange(len(qx)), len(dx))
+        existe = celulas >= 0
+        celulas, consulta = celulas[existe], consulta[existe]
+        # Cada célula vira os seus pontos: início da célula + 0..contagem-1
+        contagens = self.contagens[celulas]
+        inicio_do_par = np.repeat(np.cumsum(contagens) - contagens, contagens)
+        posicoes = np.repeat(self.inicios[celulas], contagens) + (np.arange(len(inicio_do_par)) - inicio_do_par)
+        return np.repeat(consulta, contagens), posicoes
+
+    def no_raio(self, lat, lon, raio_m):
+        """
+        Pontos a até raio_m de cada posição consultada (escalares ou arrays).
+        Retorna (consulta, ponto, distancia_m), um par por linha: índice da
+        consulta, índice original do ponto e distância em metros.
+        """
+        qx, qy = self.projetar(np.atleast_1d(lat), np.atleast_1d(lon))
+        consulta, posicoes = self._candidatos(qx, qy, int(np.ceil(raio_m / self.tamanho_celula)))
+        distancia = np.hypot(self.x[posicoes] - qx[consulta], self.y[posicoes] - qy[consulta])
+        perto = distancia <= raio_m
+        return consulta[perto], self.ordem[posicoes[perto]], distancia[perto]
+
+    def mais_proximo(self, lat, lon, raio_max_m):
+        """Ponto mais próximo de cada posição, até raio_max_m: (índice ou -1, distância ou inf)."""
+        consulta, ponto, distancia = self.no_raio(lat, lon, raio_max_m)
+        return menor_distancia(len(np.atleast_1d(lat)), consulta, ponto, distancia)
+
+    def _tabelas_escalares(self):
+        # Montadas só na primeira consulta escalar (listas Python são mais rápidas
+        # que indexar arrays elemento a elemento)
+        if self._escalares is None:
+            self._escalares = (dict(zip(self.chaves.tolist(), zip(self.inicios.tolist(), self.contagens.tolist()))),
+                               self.x.tolist(), self.y.tolist(), self.ordem.tolist())
+        return self._escalares
+
+    def ponto_mais_proximo(self, lat, lon, raio_max_m, raios=None):
+        """
+        Versão escalar de mais_proximo: (índice ou -1, distância ou inf). Com
+        'raios' (sequência por ponto), o ponto só conta se distância <= raios[i].
+        """
+        celulas, xs, ys, ordem = self._tabelas_escalares()
+        qx, qy = lon * self.m_por_grau_lon, lat * self.m_por_grau_lat
+        ix, iy = math.floor(qx / self.tamanho_celula), math.floor(qy / self.tamanho_celula)
+        alcance = math.ceil(raio_max_m / self.tamanho_celula)
+        melhor, menor = -1, math.inf
+        for cx in range(ix - alcance, ix + alcance + 1):
+            for cy in range(iy - alcance, iy + alcance + 1):
+                celula = celulas.get((cx + _DESLOCAMENTO) * (1 << 31) + (cy + _DESLOCAMENTO))
+                if celula is None:
+                    continue
+                inicio, contagem = celula
+                for pos in range(inicio, inicio + contagem):
+                    d = math.hypot(xs[pos] - qx, ys[pos] - qy)
+                    if d < menor and d <= raio_max_m and (raios is None or d <= raios[ordem[pos]]):
+                        melhor, menor = ordem[pos], d
+        return melhor, menor
+
+def menor_distancia(n_consultas, consulta, ponto, distancia):
+    """Reduz pares (consulta, ponto, distância) ao ponto mais próximo de cada consulta."""
+    ordem = np.lexsort((distancia, consulta))
+    consulta = consulta[ordem]
+    primeiro = np.ones(len(consulta), dtype=bool)
+    primeiro[1:] = consulta[1:] != consulta[:-1]
+    indice = np.full(n_consultas, -1, dtype=np.int64)
+    menor = np.full(n_consultas, np.inf)
+    indice[consulta[primeiro]] = ponto[ordem][primeiro]
+    menor[consulta[primeiro]] = distancia[ordem][primeiro]
+    return indice, menor
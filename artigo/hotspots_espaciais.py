@@ -0,0 +1,116 @@
+import numpy as np
+
+from grade_espacial import GradeEspacial
+
+# HOTSPOTS ESPACIAIS (DENSIDADE NA GRADE, ESTILO DBSCAN)
+# Hotspot por categoria (> 1% dos check-ins) faz de todo café da cidade um
+# hotspot. Aqui hotspot é um LUGAR com muitos check-ins em volta:
+#   1. os check-ins são somados por local (venue), na posição média do local
+#   2. os locais caem numa GradeEspacial com células de lado = raio
+#   3. densidade de uma célula = check-ins nas 3×3 células em volta (aproxima
+#      o "vizinhos a até raio metros" do DBSCAN)
+#   4. células com densidade >= min_checkins são núcleos; núcleos vizinhos
+#      formam um mesmo grupo (componentes conexos na grade); células não
+#      núcleo encostadas num núcleo são borda do grupo; o resto é ruído
+#   5. pontuação de cada local em [0, 1] = densidade da sua célula / maior
+#      densidade (0 para ruído)
+#
+# Tudo é O(n log n) (ordenação das chaves das células) + O(nº de células):
+# não há distâncias par a par entre pontos.
+
+RAIO_PADRAO_M = 200
+MIN_CHECKINS_PADRAO = 500
+
+class HotspotsEspaciais:
+    """Resultado da detecção: grupo e pontuação de cada ponto, e um resumo por grupo."""
+    def __init__(self, grade, grupo, pontuacao, pesos, lat, lon):
+        self.grade = grade
+        self.grupo = grupo            # -1 = ruído; grupos numerados do maior para o menor
+        self.pontuacao = pontuacao    # float32 em [0, 1]
+        self.n_grupos = int(grupo.max(initial=-1)) + 1
+        # Resumo por grupo: check-ins, nº de pontos e centro (média ponderada)
+        membros = grupo >= 0
+        g = grupo[membros]
+        self.checkins = np.bincount(g, weights=pesos[membros], minlength=self.n_grupos)
+        self.pontos = np.bincount(g, minlength=self.n_grupos)
+        peso_total = np.maximum(self.checkins, 1e-12)
+        self.centro_lat = np.bincount(g, weights=(pesos * lat)[membros], minlength=self.n_grupos) / peso_total
+        self.centro_lon = np.bincount(g, weights=(pesos * lon)[membros], minlength=self.n_grupos) / peso_total
+
+    def descrever(self, top=5):
+        linhas = [f"{self.n_grupos} hotspots espaciais ({(self.grupo >= 0).mean() * 100:.1f}% dos pontos)"]
+        for k in range(min(top, self.n_grupos)):
+            linhas.append(f"   -> #{k}: {self.checkins[k]:.0f} check-ins em {self.pontos[k]} locais, "
+                          f"centro ({self.centro_lat[k]:.5f}, {self.centro_lon[k]:.5f})")
+        return '\n'.join(linhas)
+
+def _componentes(nucleo, vizinhas):
+    """Rótulo de componente (menor índice de célula) de cada célula núcleo; -1 nas outras."""
+    rotulo = np.where(nucleo, np.arange(len(nucleo)), -1)
+    arestas = []
+    for vizinha in vizinhas:
+        a = np.flatnonzero(nucleo & (vizinha >= 0))
+        b = vizinha[a]
+        manter = nucleo[b] & (b != a)
+        arestas.append((a[manter], b[manter]))
+    if not arestas:
+        return rotulo
+    a = np.concatenate([par[0] for par in arestas])
+    b = np.concatenate([par[1] for par in arestas])
+    # Propagação do menor rótulo + salto de ponteiros (rotulo[rotulo]) até estabilizar
+    while True:
+        novo = rotulo.copy()
+        np.minimum.at(novo, a, rotulo[b])
+        novo[nucleo] = novo[novo[nucleo]]
+        if np.array_equal(novo, rotulo):
+            return rotulo
+        rotulo = novo
+
+def detectar_hotspots(lat, lon, pesos=None, raio_m=RAIO_PADRAO_M, min_checkins=MIN_CHECKINS_PADRAO):
+    """Agrupa pontos (lat, lon) com pesos (nº de check-ins de cada ponto; padrão 1)."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    pesos = np.ones(len(lat)) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    com_peso = pesos > 0
+    grade = GradeEspacial(lat, lon, raio_m, float(np.median(lat[com_peso])) if com_peso.any() else None)
+
+    por_celula = np.bincount(grade.celula_do_ponto, weights=pesos, minlength=grade.n_celulas)
+    vizinhas = grade.vizinhas(1)
+    densidade = grade.somar_vizinhanca(por_celula, vizinhas=vizinhas)
+    nucleo = densidade >= min_checkins
+    rotulo = _componentes(nucleo, vizinhas)
+
+    # Borda: célula não núcleo com um núcleo em volta entra no grupo dele
+    for vizinha in vizinhas:
+        livre = (rotulo < 0) & (vizinha >= 0)
+        livre[livre] = nucleo[vizinha[livre]]
+        rotulo[livre] = rotulo[vizinha[livre]]
+
+    # Renumera os grupos do maior (mais check-ins) para o menor
+    raizes, grupo_celula = np.unique(rotulo, return_inverse=True)
+    tem_ruido = raizes[0] < 0 if len(raizes) else False
+    grupo_celula = grupo_celula - tem_ruido
+    tamanhos = np.bincount(grupo_celula[grupo_celula >= 0], weights=por_celula[grupo_celula >= 0])
+    nova_ordem = np.empty(len(tamanhos), dtype=np.int64)
+    nova_ordem[np.argsort(-tamanhos, kind='stable')] = np.arange(len(tamanhos))
+    if len(tamanhos):   # sem nenhum núcleo, todas as células já são ruído (-1)
+        grupo_celula = np.where(grupo_celula >= 0, nova_ordem[np.maximum(grupo_celula, 0)], -1)
+
+    maximo = densidade[grupo_celula >= 0].max(initial=0)
+    pontuacao_celula = np.where(grupo_celula >= 0, densidade / max(maximo, 1e-12), 0).astype(np.float32)
+    return HotspotsEspaciais(grade, grupo_celula[grade.celula_do_ponto],
+                             pontuacao_celula[grade.celula_do_ponto], pesos, lat, lon)
+
+def detectar_por_local(codigos_local, lat, lon, raio_m=RAIO_PADRAO_M, min_checkins=MIN_CHECKINS_PADRAO,
+                       n_locais=0):
+    """
+    Hotspots a partir dos check-ins: cada local (código 0..n-1) vira um ponto
+    na sua posição média, com peso = nº de check-ins. O resultado é por local
+    (resultado.pontuacao[codigo]); locais sem check-in válido ficam como ruído.
+    """
+    codigos = np.asarray(codigos_local)
+    checkins = np.bincount(codigos, minlength=n_locais)
+    divisor = np.maximum(checkins, 1)
+    lat_media = np.bincount(codigos, weights=np.asarray(lat, dtype=np.float64), minlength=n_locais) / divisor
+    lon_media = np.bincount(codigos, weights=np.asarray(lon, dtype=np.float64), minlength=n_locais) / divisor
+    return detectar_hotspots(lat_media, lon_media, checkins, raio_m, min_checkins)
@@ -0,0 +1,116 @@
+import numpy as np
+
+from amostrador import Transicoes
+
+# ÍNDICE DE TRAJETÓRIAS POR USUÁRIO
+# Construído uma vez na carga: as linhas são ordenadas por (User_ID, instante)
+# e os códigos de local/período são copiados nessa ordem, em arrays contíguos.
+# Offsets no estilo CSR dizem onde começa a trajetória de cada usuário:
+#
+#   trajetória do usuário u = posições [inicios[u], inicios[u + 1])
+#
+# Assim a transição real (s, s') de um check-in para o seguinte do mesmo
+# usuário é só (posição p, posição p + 1), lida de memória contígua.
+#
+# Modos de amostragem que usam o índice:
+#   'trajetoria' -> pares consecutivos reais; a cada época a ordem dos usuários
+#                   é embaralhada, mas cada trajetória é percorrida em sequência
+#   'episodico'  -> episódios = trajetórias; um grupo de usuários anda em
+#                   paralelo, um check-in por vez (cada lote = 1 passo de cada usuário)
+
+class IndiceTrajetorias:
+    def __init__(self, user_ids, timestamps, loc_ids, per_ids):
+        usuarios, grupos = np.unique(np.asarray(user_ids), return_inverse=True)
+        # Ordem estável por (usuário, instante): empates mantêm a ordem do arquivo
+        self.ordem = np.lexsort((np.asarray(timestamps), grupos))
+        self.usuarios = usuarios
+        self.tamanhos = np.bincount(grupos, minlength=len(usuarios))
+        self.inicios = np.concatenate([[0], np.cumsum(self.tamanhos)]).astype(np.int64)
+
+        self.loc = np.ascontiguousarray(np.asarray(loc_ids)[self.ordem])
+        self.per = np.ascontiguousarray(np.asarray(per_ids)[self.ordem])
+        self.timestamps = np.asarray(timestamps)[self.ordem]
+        self.n = len(self.ordem)
+
+        # Posições p que têm próximo check-in do mesmo usuário (p + 1 < fim da trajetória)
+        tem_proximo = np.ones(self.n, dtype=bool)
+        tem_proximo[self.inicios[1:] - 1] = False
+        self.posicoes_pares = np.flatnonzero(tem_proximo)
+
+    @property
+    def n_usuarios(self):
+        return len(self.usuarios)
+
+    @property
+    def n_pares(self):
+        return len(self.posicoes_pares)
+
+    def trajetoria(self, user_id):
+        """Fatia (posições) da trajetória de um usuário; vazia se ele não existir."""
+        u = np.searchsorted(self.usuarios, user_id)
+        if u == len(self.usuarios) or self.usuarios[u] != user_id:
+            return slice(0, 0)
+        return slice(self.inicios[u], self.inicios[u + 1])
+
+    def transicoes(self, posicoes):
+        """Transicoes (s na posição p, s' na posição p + 1) com os índices das linhas originais."""
+        proximas = posicoes + 1
+        return Transicoes(self.ordem[posicoes], self.loc[posicoes], self.per[posicoes],
+                          self.ordem[proximas], self.loc[proximas], self.per[proximas])
+
+    def pares_usuarios(self, usuarios):
+        """Posições dos pares dos usuários dados, trajetória por trajetória (na ordem dada)."""
+        inicios = self.inicios[usuarios]
+        quantidades = np.maximum(self.tamanhos[usuarios] - 1, 0)
+        total = int(quantidades.sum())
+        # Deslocamento dentro de cada trajetória: arange global menos o início do seu bloco
+        blocos = np.repeat(np.cumsum(quantidades) - quantidades, quantidades)
+        return np.repeat(inicios, quantidades) + (np.arange(total) - blocos)
+
+class AmostradorTrajetorias:
+    """Mesma interface de AmostradorTransicoes.lotes, mas com transições reais."""
+    MODOS = ('trajetoria', 'episodico')
+
+    def __init__(self, indice, modo='trajetoria', semente=None, usuarios_por_grupo=4096):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo inválido: {modo!r} (use um de {self.MODOS})")
+        if indice.n_pares == 0:
+            raise ValueError("Nenhum usuário tem dois check-ins: não há transições reais.")
+        self.indice = indice
+        self.modo = modo
+        self.usuarios_por_grupo = usuarios_por_grupo
+        self.rng = np.random.default_rng(semente)
+
+    def lotes(self, n, tamanho_lote=65536):
+        """Gerador de lotes de Transicoes até somar n transições (várias épocas se preciso)."""
+        feitas = 0
+        while feitas < n:
+            gerador = self._epoca_trajetoria(tamanho_lote) if self.modo == 'trajetoria' else self._epoca_episodica()
+            for lote in gerador:
+                if feitas + len(lote.indice) > n:
+                    lote = Transicoes(*(campo[:n - feitas] for campo in lote))
+                feitas += len(lote.indice)
+                yield lote
+                if feitas >= n:
+                    return
+
+    def _epoca_trajetoria(self, tamanho_lote):
+        usuarios = self.rng.permutation(self.indice.n_usuarios)
+        posicoes = self.indice.pares_usuarios(usuarios)
+        for inicio in range(0, len(posicoes), tamanho_lote):
+            yield self.indice.transicoes(posicoes[inicio:inicio + tamanho_lote])
+
+    def _epoca_episodica(self):
+        indice = self.indice
+        usuarios = self.rng.permutation(indice.n_usuarios)
+        for g in range(0, len(usuarios), self.usuarios_por_grupo):
+            grupo = usuarios[g:g + self.usuarios_por_grupo]
+            # Do mais longo para o mais curto: no passo t, os ativos são um prefixo do grupo
+            pares = indice.tamanhos[grupo] - 1
+            ordem = np.argsort(-pares, kind='stable')
+            grupo, pares = grupo[ordem], pares[ordem]
+            inicios = indice.inicios[grupo]
+            # ativos[t] = nº de usuários do grupo com mais de t pares
+            ativos = np.searchsorted(-pares, -np.arange(max(int(pares.max(initial=0)), 0)), side='left')
+            for t, k in enumerate(ativos):
+                yield indice.transicoes(inicios[:k] + t)
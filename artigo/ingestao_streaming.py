@@ -0,0 +1,142 @@
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import cache_colunar
+
+# INGESTÃO EM BLOCOS (STREAMING)
+# Para arquivos que não cabem confortavelmente na memória (Tóquio + NYC + logs
+# internos). O CSV é dividido em faixas de bytes que terminam em fim de linha;
+# cada processo do pool lê e limpa a sua faixa, e o processo principal só junta
+# os códigos já prontos no cache colunar. Como o número de faixas "em voo" é
+# limitado, o pico de memória não depende do tamanho do arquivo.
+#
+# A função de limpeza é recebida como parâmetro (precisa ser uma função de
+# módulo, para o pool conseguir serializá-la) e deve devolver (df_limpo, nº inválidos).
+#
+# Obs: supõe que nenhum campo tem quebra de linha dentro de aspas (caso do TSMC2014).
+
+TAMANHO_FAIXA = 16 << 20  # 16 MB por tarefa
+
+def ler_cabecalho(caminho_arquivo):
+    return pd.read_csv(caminho_arquivo, nrows=0).columns.tolist()
+
+def faixas_de_bytes(caminho_arquivo, tamanho_faixa=TAMANHO_FAIXA):
+    """Gera (início, fim) de faixas do arquivo, pulando o cabeçalho e cortando em fim de linha."""
+    total = os.path.getsize(caminho_arquivo)
+    with open(caminho_arquivo, 'rb') as f:
+        f.readline()
+        inicio = f.tell()
+        while inicio < total:
+            f.seek(min(inicio + tamanho_faixa, total))
+            f.readline()
+            fim = f.tell()
+            yield inicio, fim
+            inicio = fim
+
+def _processar_faixa(caminho_arquivo, inicio, fim, nomes, colunas_usadas, limpar_bloco):
+    with open(caminho_arquivo, 'rb') as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    df = pd.read_csv(io.BytesIO(dados), header=None, names=nomes, usecols=colunas_usadas)
+    df_limpo, invalidos = limpar_bloco(df)
+    return cache_colunar.codificar_bloco(df_limpo), invalidos, len(df)
+
+def ingerir_streaming(caminho_arquivo, limpar_bloco, versao_processamento='', colunas_usadas=None,
+                      n_processos=None, tamanho_faixa=TAMANHO_FAIXA, pasta_cache=None):
+    """
+    Lê o CSV em faixas processadas em paralelo e grava o resultado direto no
+    cache colunar (que depois é aberto com mmap). Retorna o EscritorCache,
+    com as contagens por categoria já calculadas.
+    """
+    inicio_carga = time.perf_counter()
+    n_processos = n_processos or os.cpu_count() or 1
+    nomes = ler_cabecalho(caminho_arquivo)
+    if colunas_usadas is not None:
+        colunas_usadas = [c for c in colunas_usadas if c in nomes]
+    total = os.path.getsize(caminho_arquivo)
+
+    escritor = cache_colunar.EscritorCache(caminho_arquivo, versao_processamento, pasta_cache)
+    estatisticas = {'linhas_lidas': 0, 'invalidos': 0}
+    proximo_aviso = [0.1]
+
+    def consumir(tarefa, fim):
+        bloco, invalidos, lidas = tarefa.result()
+        escritor.adicionar_codificado(bloco)
+        estatisticas['linhas_lidas'] += lidas
+        estatisticas['invalidos'] += invalidos
+        if fim / total >= proximo_aviso[0]:
+            print(f"   Ingestão: {fim / total * 100:.0f}% ({escritor.linhas} linhas válidas)")
+            proximo_aviso[0] = fim / total + 0.1
+
+    # No máximo 2 faixas por processo em voo: memória limitada
+    pendentes = deque()
+    try:
+        with ProcessPoolExecutor(n_processos) as pool:
+            for inicio, fim in faixas_de_bytes(caminho_arquivo, tamanho_faixa):
+                tarefa = pool.submit(_processar_faixa, caminho_arquivo, inicio, fim,
+                                     nomes, colunas_usadas, limpar_bloco)
+                pendentes.append((tarefa, fim))
+                if len(pendentes) >= 2 * n_processos:
+                    consumir(*pendentes.popleft())
+            while pendentes:
+                consumir(*pendentes.popleft())
+
+        estatisticas['tempo_carga_s'] = time.perf_counter() - inicio_carga
+        escritor.finalizar(extras=estatisticas)
+    except BaseException:
+        escritor.descartar()   # o cache anterior (se houver) continua no lugar
+        raise
+    escritor.estatisticas = estatisticas
+    return escritor
+
+def amostra_reservatorio(caminho_arquivo, k, semente=None, colunas_usadas=None, tamanho_bloco=100_000):
+    """
+    Amostra uniforme de k linhas do arquivo inteiro numa única passada
+    (amostragem por reservatório, Algoritmo R), lendo em blocos. Diferente
+    de nrows=k, representa o arquivo todo e não só o começo.
+    """
+    rng = np.random.default_rng(semente)
+    nomes = ler_cabecalho(caminho_arquivo)
+    if colunas_usadas is not None:
+        colunas_usadas = [c for c in colunas_usadas if c in nomes]
+
+    reservatorio = None
+    vistos = 0
+    for bloco in pd.read_csv(caminho_arquivo, usecols=colunas_usadas, chunksize=tamanho_bloco):
+        n = len(bloco)
+        colunas = {c: bloco[c].to_numpy() for c in bloco.columns}
+
+        # Fase de preenchimento: as k primeiras linhas entram direto
+        if reservatorio is None or len(next(iter(reservatorio.values()))) < k:
+            faltam = k if reservatorio is None else k - len(next(iter(reservatorio.values())))
+            entra = {c: v[:faltam].copy() for c, v in colunas.items()}
+            if reservatorio is None:
+                reservatorio = entra
+            else:
+                reservatorio = {c: np.concatenate([reservatorio[c], entra[c]]) for c in reservatorio}
+            usadas = min(faltam, n)
+        else:
+            usadas = 0
+
+        # Linha t (0-based) substitui a posição j ~ U[0, t] se j < k
+        if usadas < n:
+            t = vistos + np.arange(usadas, n)
+            j = rng.integers(0, t + 1)
+            troca = j < k
+            posicoes = j[troca]
+            linhas = np.flatnonzero(troca) + usadas
+            # Se duas linhas do bloco caírem na mesma posição, vale a última
+            posicoes, ultima = np.unique(posicoes[::-1], return_index=True)
+            linhas = linhas[::-1][ultima]
+            for c in reservatorio:
+                reservatorio[c][posicoes] = colunas[c][linhas]
+        vistos += n
+
+    if reservatorio is None:
+        return pd.DataFrame(columns=colunas_usadas or nomes), 0
+    return pd.DataFrame(reservatorio), vistos
@@ -0,0 +1,35 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+# ARRAYS EM MEMÓRIA COMPARTILHADA
+# O processo principal copia os arrays do dataset codificado para blocos
+# SharedMemory uma única vez; os processos do pool só "anexam" os blocos
+# (sem copiar nem reler o CSV). Usado pela varredura e pelo treino distribuído.
+
+def compartilhar(arrays):
+    """Copia cada array para um bloco SharedMemory. Retorna (blocos, descrições)."""
+    blocos, descricoes = [], {}
+    for nome, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        bloco = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=bloco.buf)[...] = array
+        blocos.append(bloco)
+        descricoes[nome] = (bloco.name, array.shape, array.dtype.str)
+    return blocos, descricoes
+
+def anexar(descricoes, destino):
+    """
+    Abre os blocos descritos e coloca os arrays em 'destino' (um dict global do
+    processo). Os blocos também ficam em destino['blocos'] para o buffer não ser liberado.
+    """
+    destino['blocos'] = []
+    for nome, (nome_bloco, forma, dtype) in descricoes.items():
+        bloco = shared_memory.SharedMemory(name=nome_bloco)
+        destino['blocos'].append(bloco)
+        destino[nome] = np.ndarray(forma, np.dtype(dtype), buffer=bloco.buf)
+
+def liberar(blocos):
+    """Fecha e remove os blocos criados por compartilhar (só no processo principal)."""
+    for bloco in blocos:
+        bloco.close()
+        bloco.unlink()
@@ -0,0 +1,123 @@
+from collections import namedtuple
+import numpy as np
+
+# MEMÓRIA DE REPLAY (EXPERIENCE REPLAY)
+# Buffer circular de capacidade fixa com as transições (s, a, r, s') já
+# codificadas, guardadas em arrays NumPy pré-alocados (nada de listas de
+# dicionários): o consumo de memória é conhecido desde o início.
+#
+# O estado é um par de códigos (ex: local/período no artigo2, local/histórico
+# no seminário). A amostragem pode ser uniforme ou prioritária pelo erro TD
+# (Prioritized Experience Replay), com uma árvore de somas (sum-tree) para
+# sortear e atualizar em O(log n), tudo vetorizado por lote.
+
+TransicoesReplay = namedtuple('TransicoesReplay', ['loc', 'per', 'acao', 'recompensa', 'loc_prox', 'per_prox'])
+
+CAMPOS = [
+    ('loc', np.int32), ('per', np.int8), ('acao', np.int8),
+    ('recompensa', np.float32), ('loc_prox', np.int32), ('per_prox', np.int8),
+]
+
+class MemoriaReplay:
+    def __init__(self, capacidade, prioritaria=False, alpha_prioridade=0.6, epsilon_prioridade=1e-3, semente=None):
+        self.capacidade = capacidade
+        self.prioritaria = prioritaria
+        self.alpha_prioridade = alpha_prioridade
+        self.epsilon_prioridade = epsilon_prioridade
+        self.rng = np.random.default_rng(semente)
+
+        self.dados = {nome: np.zeros(capacidade, dtype=tipo) for nome, tipo in CAMPOS}
+        self.posicao = 0   # próxima posição a escrever
+        self.tamanho = 0
+
+        if prioritaria:
+            # Folhas em [folhas, 2*folhas); o nó i tem filhos 2i e 2i+1; a raiz é o nó 1
+            self.folhas = 1 << max(0, int(np.ceil(np.log2(capacidade))))
+            self.arvore = np.zeros(2 * self.folhas, dtype=np.float64)
+            self.max_prioridade = 1.0
+
+    @property
+    def nbytes(self):
+        total = sum(array.nbytes for array in self.dados.values())
+        if self.prioritaria:
+            total += self.arvore.nbytes
+        return total
+
+    def descrever(self):
+        tipo = 'prioritária (sum-tree)' if self.prioritaria else 'uniforme'
+        return f"Memória de replay {tipo}: {self.capacidade:,} transições = {self.nbytes / 2**20:.1f} MB"
+
+    def __len__(self):
+        return self.tamanho
+
+    def adicionar(self, loc, per, acao, recompensa, loc_prox, per_prox, erros_td=None):
+        """
+        Adiciona um lote de transições (arrays ou escalares), sobrescrevendo as
+        mais antigas quando cheio. Sem erros_td, entram com a maior prioridade já vista.
+        """
+        valores = [np.atleast_1d(v) for v in (loc, per, acao, recompensa, loc_prox, per_prox)]
+        n = max(len(v) for v in valores)
+        valores = [np.broadcast_to(v, n) for v in valores]  # escalares valem para o lote todo
+        inicio = max(0, n - self.capacidade)  # lote maior que o buffer: só as últimas
+        posicoes = (self.posicao + np.arange(n - inicio)) % self.capacidade
+        for (nome, _), v in zip(CAMPOS, valores):
+            self.dados[nome][posicoes] = v[inicio:]
+        self.posicao = int((self.posicao + n - inicio) % self.capacidade)
+        self.tamanho = min(self.capacidade, self.tamanho + n - inicio)
+
+        if self.prioritaria:
+            if erros_td is None:
+                self._definir_prioridades(posicoes, np.full(len(posicoes), self.max_prioridade))
+            else:
+                self.atualizar_prioridades(posicoes, np.broadcast_to(np.atleast_1d(erros_td), n)[inicio:])
+        return posicoes
+
+    def amostrar(self, n, beta=0.4):
+        """
+        Sorteia n transições. Retorna (posições, TransicoesReplay, pesos de
+        importância). Na amostragem uniforme os pesos são todos 1.
+        """
+        if self.tamanho == 0:
+            raise ValueError("Memória de replay vazia.")
+        if not self.prioritaria:
+            posicoes = self.rng.integers(0, self.tamanho, size=n)
+            pesos = np.ones(n, dtype=np.float32)
+        else:
+            # Amostragem estratificada: um valor em cada fatia de [0, soma total)
+            total = self.arvore[1]
+            alvos = (np.arange(n) + self.rng.random(n)) * (total / n)
+            no = np.ones(n, dtype=np.int64)
+            while no[0] < self.folhas:
+                esquerda = 2 * no
+                valor_esquerda = self.arvore[esquerda]
+                direita = alvos >= valor_esquerda
+                alvos = np.where(direita, alvos - valor_esquerda, alvos)
+                no = esquerda + direita
+            posicoes = np.minimum(no - self.folhas, self.tamanho - 1)
+
+            probabilidades = self.arvore[posicoes + self.folhas] / total
+            pesos = (self.tamanho * np.maximum(probabilidades, 1e-12)) ** (-beta)
+            pesos = (pesos / pesos.max()).astype(np.float32)
+
+        return posicoes, TransicoesReplay(*(self.dados[nome][posicoes] for nome, _ in CAMPOS)), pesos
+
+    def atualizar_prioridades(self, posicoes, erros_td):
+        """Prioridade = (|erro TD| + epsilon) ^ alpha."""
+        if not self.prioritaria:
+            return
+        prioridades = (np.abs(erros_td).astype(np.float64) + self.epsilon_prioridade) ** self.alpha_prioridade
+        self.max_prioridade = max(self.max_prioridade, float(prioridades.max(initial=0)))
+        self._definir_prioridades(posicoes, prioridades)
+
+    def _definir_prioridades(self, posicoes, prioridades):
+        if len(posicoes) == 0:
+            return
+        nos = np.asarray(posicoes, dtype=np.int64) + self.folhas
+        self.arvore[nos] = prioridades  # posição repetida: vale a última
+        # Recalcula os pais nível a nível, só nos caminhos alterados
+        nos = np.unique(nos // 2)
+        while nos[0] >= 1:
+            self.arvore[nos] = self.arvore[2 * nos] + self.arvore[2 * nos + 1]
+            if nos[0] == 1:
+                break
+            nos = np.unique(nos // 2)
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import cProfile
+import numpy as np
+
+# TELEMETRIA DO TREINO
+# Contadores e cronômetros nas etapas do caminho quente (amostragem, escolha
+# da ação, recompensa, atualização da Tabela Q, replay) e métricas por janela
+# de N transições:
+#   - recompensa média e |erro TD| médio
+#   - fração dos estados (local, período) já visitados
+#   - nº de estados cuja ação gulosa mudou desde a janela anterior
+#
+# Cada janela vira uma linha JSON (formato 'jsonl') ou atualiza um arquivo de
+# texto no formato do Prometheus ('prometheus', para o textfile collector do
+# node_exporter). Opcionalmente, uma janela inteira roda sob o cProfile.
+#
+# Custo: os cronômetros são acumulados por segmento/lote (não por transição) e
+# as métricas que olham a tabela inteira só rodam no fim de cada janela.
+# Sem telemetria, o TreinadorLote não executa nenhuma dessas linhas.
+
+ETAPAS = ('amostragem', 'selecao', 'recompensa', 'atualizacao', 'replay')
+FORMATOS = ('jsonl', 'prometheus')
+
+class Telemetria:
+    def __init__(self, caminho, formato='jsonl', janela=100000, janela_perfil=None, caminho_perfil=None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de telemetria inválido: {formato!r} (use um de {FORMATOS})")
+        self.caminho = caminho
+        self.formato = formato
+        self.janela = janela
+        self.janela_perfil = janela_perfil
+        self.caminho_perfil = caminho_perfil or f"perfil_janela{janela_perfil}.prof"
+
+        self.tempos = dict.fromkeys(ETAPAS, 0.0)      # segundos na janela atual
+        self.tempos_totais = dict.fromkeys(ETAPAS, 0.0)
+        self.contadores = {'lotes': 0, 'transicoes': 0, 'segmentos': 0}
+        self.agent = None
+        self.n_janela = 0
+        self._zerar_janela()
+        self._arquivo = open(caminho, 'w', encoding='utf-8') if formato == 'jsonl' else None
+        self._perfil = None
+        self._inicio = time.perf_counter()
+
+    def _zerar_janela(self):
+        self._soma_recompensa = 0.0
+        self._soma_td = 0.0
+        self._transicoes_janela = 0
+        self._inicio_janela = time.perf_counter()
+        for etapa in self.tempos:
+            self.tempos[etapa] = 0.0
+
+    def acompanhar(self, agent):
+        """Agente cuja tabela é usada nas métricas de visitas e de mudança da política."""
+        self.agent = agent
+        self._politica_anterior = self._politica()
+        self._talvez_perfilar()
+
+    def _politica(self):
+        q = self.agent.q.reshape(-1, self.agent.q.shape[-1])
+        gulosas = q.argmax(axis=1)
+        return np.where(q[np.arange(len(gulosas)), gulosas] == -np.inf, -1, gulosas)
+
+    # --- Caminho quente ---
+    def medir_lotes(self, lotes):
+        """Envolve o gerador de lotes e mede o tempo de amostragem de cada um."""
+        relogio = time.perf_counter
+        iterador = iter(lotes)
+        while True:
+            inicio = relogio()
+            try:
+                lote = next(iterador)
+            except StopIteration:
+                return
+            self.tempos['amostragem'] += relogio() - inicio
+            yield lote
+
+    def registrar_lote(self, recompensas, erros_td):
+        n = len(recompensas)
+        self.contadores['lotes'] += 1
+        self.contadores['transicoes'] += n
+        self._transicoes_janela += n
+        self._soma_recompensa += float(recompensas.sum(dtype=np.float64))
+        self._soma_td += float(np.abs(erros_td).sum(dtype=np.float64))
+        if self._transicoes_janela >= self.janela:
+            self._fechar_janela()
+
+    # --- Fim de janela ---
+    def _fechar_janela(self):
+        if self._transicoes_janela == 0:
+            return
+        if self._perfil is not None:
+            self._perfil.disable()
+            self._perfil.dump_stats(self.caminho_perfil)
+            self._perfil = None
+            print(f"   [telemetria] perfil da janela {self.n_janela} salvo em '{self.caminho_perfil}'")
+
+        duracao = time.perf_counter() - self._inicio_janela
+        registro = {
+            'janela': self.n_janela,
+            'transicoes': self.contadores['transicoes'],
+            'lotes': self.contadores['lotes'],
+            'segmentos': self.contadores['segmentos'],
+            'tempo_s': time.perf_counter() - self._inicio,
+            'transicoes_por_s': self._transicoes_janela / max(duracao, 1e-12),
+            'tempos_s': dict(self.tempos),
+            'recompensa_media': self._soma_recompensa / self._transicoes_janela,
+            'td_abs_medio': self._soma_td / self._transicoes_janela,
+        }
+        if self.agent is not None:
+            visitados = self.agent.visitas.reshape(-1, self.agent.visitas.shape[-1]).any(axis=1)
+            politica = self._politica()
+            registro['fracao_estados_visitados'] = float(visitados.mean())
+            registro['mudancas_politica'] = int((politica != self._politica_anterior).sum())
+            self._politica_anterior = politica
+
+        for etapa, tempo in self.tempos.items():
+            self.tempos_totais[etapa] += tempo
+        self._emitir(registro)
+        self.n_janela += 1
+        self._zerar_janela()
+        self._talvez_perfilar()
+
+    def _talvez_perfilar(self):
+        if self.janela_perfil is not None and self.n_janela == self.janela_perfil:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+
+    def _emitir(self, registro):
+        if self.formato == 'jsonl':
+            self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            self._arquivo.flush()
+            return
+        linhas = [
+            '# TYPE npc_transicoes_total counter', f"npc_transicoes_total {registro['transicoes']}",
+            '# TYPE npc_lotes_total counter', f"npc_lotes_total {registro['lotes']}",
+            '# TYPE npc_transicoes_por_segundo gauge', f"npc_transicoes_por_segundo {registro['transicoes_por_s']}",
+            '# TYPE npc_recompensa_media gauge', f"npc_recompensa_media {registro['recompensa_media']}",
+            '# TYPE npc_td_abs_medio gauge', f"npc_td_abs_medio {registro['td_abs_medio']}",
+            '# TYPE npc_etapa_segundos_total counter',
+        ]
+        linhas += [f'npc_etapa_segundos_total{{etapa="{etapa}"}} {self.tempos_totais[etapa]}' for etapa in ETAPAS]
+        if 'fracao_estados_visitados' in registro:
+            linhas += ['# TYPE npc_fracao_estados_visitados gauge',
+                       f"npc_fracao_estados_visitados {registro['fracao_estados_visitados']}",
+                       '# TYPE npc_mudancas_politica gauge', f"npc_mudancas_politica {registro['mudancas_politica']}"]
+        # Troca atômica: o coletor nunca lê o arquivo pela metade
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(linhas) + '\n')
+        os.replace(temporario, self.caminho)
+
+    def fechar(self):
+        """Emite a última janela (mesmo incompleta) e fecha o arquivo."""
+        self._fechar_janela()
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def resumo(self):
+        total = sum(self.tempos_totais.values()) or 1.0
+        return ' | '.join(f"{etapa}: {tempo:.2f}s ({tempo / total * 100:.0f}%)"
+                          for etapa, tempo in self.tempos_totais.items())
@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+
+from agente_denso import QLearningAgentDenso
+from artigo2 import QLearningAgent
+
+ACOES = ['Oferecer_Missão', 'Vender_Item', 'Dar_Dica']
+LOCAIS = ['Bar', 'Parque', 'Museu', 'Café']
+PERIODOS = ['Manhã', 'Tarde', 'Noite']
+
+def _transicoes(n, semente=0):
+    rng = random.Random(semente)
+    return [({'Location': rng.choice(LOCAIS), 'Time': rng.choice(PERIODOS)}, rng.choice(ACOES),
+             rng.uniform(-5, 10), {'Location': rng.choice(LOCAIS), 'Time': rng.choice(PERIODOS)})
+            for _ in range(n)]
+
+def test_mesma_tabela_que_o_agente_de_dicionario():
+    denso = QLearningAgentDenso(ACOES, LOCAIS, PERIODOS)
+    dicionario = QLearningAgent(ACOES)
+    for state, action, reward, next_state in _transicoes(2000):
+        denso.learn(state, action, reward, next_state)
+        dicionario.learn(state, action, reward, next_state)
+
+    esperado = {k: dict(v) for k, v in dicionario.q_table.items() if v}
+    obtido = {k: dict(v) for k, v in denso.q_table.items()}
+    assert obtido.keys() == esperado.keys()
+    for chave, acoes in esperado.items():
+        assert obtido[chave].keys() == acoes.keys()
+        for acao, valor in acoes.items():
+            assert abs(obtido[chave][acao] - valor) < 1e-3
+    assert denso.visitas.sum() == 2000
+
+def test_estado_sem_nada_aprendido():
+    denso = QLearningAgentDenso(ACOES, LOCAIS, PERIODOS, epsilon=0.0)
+    assert denso.melhor_acao({'Location': 'Bar', 'Time': 'Noite'}) is None
+    # Sem ações aprendidas, max(Q(s')) vale 0: a primeira atualização é alpha * r
+    denso.learn({'Location': 'Bar', 'Time': 'Noite'}, 'Dar_Dica', 10.0, {'Location': 'Café', 'Time': 'Manhã'})
+    assert denso.melhor_acao({'Location': 'Bar', 'Time': 'Noite'}) == ('Dar_Dica', 1.0)
+    assert denso.choose_action({'Location': 'Bar', 'Time': 'Noite'}) == 'Dar_Dica'
+
+def test_expandir_preserva_codigos_e_valores():
+    denso = QLearningAgentDenso(ACOES, LOCAIS, PERIODOS)
+    for state, action, reward, next_state in _transicoes(500, semente=1):
+        denso.learn(state, action, reward, next_state)
+    q, visitas = denso.q.copy(), denso.visitas.copy()
+
+    assert denso.expandir(['Bar', 'Estádio', 'Estádio'], ['Madrugada']) == (1, 1)
+    assert denso.expandir(['Estádio'], ['Noite']) == (0, 0)
+    assert denso.q.shape == (5, 4, 3)
+    assert denso.indice_local['Estádio'] == 4 and denso.indice_periodo['Madrugada'] == 3
+    np.testing.assert_array_equal(denso.q[:4, :3], q)
+    np.testing.assert_array_equal(denso.visitas[:4, :3], visitas)
+    assert np.isneginf(denso.q[4]).all() and np.isneginf(denso.q[:, 3]).all()
@@ -0,0 +1,83 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import artigo2
+import gerador_sintetico
+from aprendizado_online import AprendizOnline, ler_novas_linhas
+
+@pytest.fixture
+def log_csv(tmp_path):
+    caminho = tmp_path / 'completo.csv'
+    with contextlib.redirect_stdout(io.StringIO()):
+        gerador_sintetico.gerar_arquivo(str(caminho), 3000, semente=5, n_processos=1)
+    return caminho.read_bytes()
+
+@pytest.fixture(autouse=True)
+def configuracao(monkeypatch):
+    monkeypatch.setattr(artigo2, 'MODO_HOTSPOT', 'espacial')
+    monkeypatch.setattr(artigo2, 'MIN_CHECKINS_HOTSPOT', 20)
+    monkeypatch.setattr(artigo2, 'MODO_AMOSTRAGEM', 'uniforme')
+
+def _cortar(texto, fracao):
+    """Posição do fim de uma linha perto da fração dada do arquivo."""
+    return texto.index(b'\n', int(len(texto) * fracao)) + 1
+
+def test_linha_incompleta_fica_para_depois(tmp_path, log_csv):
+    caminho = tmp_path / 'log.csv'
+    corte = _cortar(log_csv, 0.5)
+    caminho.write_bytes(log_csv[:corte + 10])   # meia linha no fim
+    lidos = list(ler_novas_linhas(str(caminho), 0, tamanho_faixa=4096))
+    assert lidos[-1][1] == corte
+    assert sum(len(df) for df, _ in lidos) == log_csv[:corte].count(b'\n') - 1   # sem o cabeçalho
+    assert list(ler_novas_linhas(str(caminho), corte)) == []
+
+def _rodar(caminho, checkpoint):
+    aprendiz = AprendizOnline.carregar(str(checkpoint))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return aprendiz, aprendiz.atualizar(str(caminho))
+
+def test_retoma_da_posicao_salva(tmp_path, log_csv):
+    caminho, checkpoint = tmp_path / 'log.csv', tmp_path / 'tabela.npcq'
+    corte = _cortar(log_csv, 0.6)
+    caminho.write_bytes(log_csv[:corte + 25])          # primeira leitura termina no meio de uma linha
+    primeira, resumo1 = _rodar(caminho, checkpoint)
+    assert primeira.posicoes['log.csv'] == corte
+
+    caminho.write_bytes(log_csv)                       # o log cresceu
+    retomado, resumo2 = _rodar(caminho, checkpoint)    # novo processo, só com o checkpoint
+    assert resumo1['linhas'] + resumo1['invalidos'] + resumo2['linhas'] + resumo2['invalidos'] \
+        == log_csv.count(b'\n') - 1
+    assert retomado.posicoes['log.csv'] == len(log_csv)
+    assert _rodar(caminho, checkpoint)[1]['linhas'] == 0   # nada novo
+
+    # Contagens e acumuladores por local iguais aos de uma leitura única do log inteiro
+    unica, _ = _rodar(caminho, tmp_path / 'unica.npcq')
+    assert retomado.agent.locations == unica.agent.locations
+    np.testing.assert_array_equal(retomado.contagens, unica.contagens)
+    assert retomado.venues.tolist() == unica.venues.tolist()
+    np.testing.assert_array_equal(retomado.checkins_local, unica.checkins_local)
+    np.testing.assert_allclose(retomado.soma_lat, unica.soma_lat)
+    np.testing.assert_array_equal(retomado.bonus_locais, unica.bonus_locais)
+    assert retomado.n_hotspots_espaciais > 0
+
+def test_hotspot_espacial_recalculado_com_as_linhas_novas(tmp_path, log_csv):
+    caminho, checkpoint = tmp_path / 'log.csv', tmp_path / 'tabela.npcq'
+    caminho.write_bytes(log_csv)
+    aprendiz, _ = _rodar(caminho, checkpoint)
+    bonus_antes = aprendiz.bonus_locais.copy()
+
+    # Um local novo, isolado, recebe check-ins suficientes para virar núcleo de hotspot
+    cabecalho = log_csv.split(b'\n', 1)[0].decode().split(',')
+    linha = {'userId': '1', 'venueId': 'local_novo', 'venueCategoryId': 'x', 'venueCategory': 'Bar',
+             'latitude': '41.5', 'longitude': '-72.5', 'timezoneOffset': '-240',
+             'utcTimestamp': 'Wed Jan 23 08:32:06 +0000 2013'}
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write((','.join(linha[c] for c in cabecalho) + '\n') * 25)
+    retomado, resumo = _rodar(caminho, checkpoint)
+    assert resumo['linhas'] == 25
+    novo = retomado.venues.get_loc('local_novo')
+    assert retomado.bonus_locais[novo] > 0
+    assert len(retomado.bonus_locais) == len(bonus_antes) + 1
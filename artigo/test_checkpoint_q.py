@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from agente_denso import QLearningAgentDenso
+from checkpoint_q import ALINHAMENTO, abrir_checkpoint, carregar_agente, salvar_agente, salvar_checkpoint
+
+def _agente_treinado():
+    agent = QLearningAgentDenso(['Negociar Itens', 'Trocar Fofoca/Socializar'], ['Café', 'Museu', 'Bar'],
+                                ['Manhã', 'Noite'], alpha=0.2, gamma=0.8, epsilon=0.05)
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        agent.learn_idx(*rng.integers(0, 3, 1), *rng.integers(0, 2, 1), *rng.integers(0, 2, 1),
+                        float(rng.normal()), *rng.integers(0, 3, 1), *rng.integers(0, 2, 1))
+    return agent
+
+def test_ida_e_volta_do_agente(tmp_path):
+    agent = _agente_treinado()
+    assert np.isneginf(agent.q).any()   # sobra estado sem nada aprendido
+    caminho = tmp_path / 'tabela.npcq'
+    salvar_agente(caminho, agent, {'passos': 5, 'fonte': 'ação.csv'})
+
+    copia, meta = carregar_agente(caminho)
+    np.testing.assert_array_equal(copia.q, agent.q)
+    np.testing.assert_array_equal(copia.visitas, agent.visitas)
+    assert (copia.actions, copia.locations, copia.periods) == (agent.actions, agent.locations, agent.periods)
+    assert (copia.alpha, copia.gamma, copia.epsilon) == (0.2, 0.8, 0.05)
+    assert meta['passos'] == 5 and meta['fonte'] == 'ação.csv'
+    # A cópia é independente do arquivo
+    copia.q[0, 0, 0] = 123.0
+    assert abrir_checkpoint(caminho).q[0, 0, 0] == agent.q[0, 0, 0]
+
+def test_memmap_alinhado_e_somente_leitura(tmp_path):
+    agent = _agente_treinado()
+    caminho = tmp_path / 'tabela.npcq'
+    salvar_agente(caminho, agent)
+    checkpoint = abrir_checkpoint(caminho)
+    assert checkpoint.q.offset % ALINHAMENTO == 0 and checkpoint.visitas.offset % ALINHAMENTO == 0
+    assert checkpoint.vocabulario('local') == agent.locations
+    with pytest.raises(ValueError):
+        checkpoint.q[0, 0, 0] = 1.0
+
+    # modo 'c' (cópia na escrita): altera só a memória do processo
+    local = abrir_checkpoint(caminho, modo='c')
+    local.q[0, 0, 0] = 42.0
+    assert abrir_checkpoint(caminho).q[0, 0, 0] == agent.q[0, 0, 0]
+
+def test_eixos_genericos_sem_visitas(tmp_path):
+    q = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    caminho = tmp_path / 'politica.npcq'
+    salvar_checkpoint(caminho, q, [('local', ['a', 'b']), ('nivel', [1, 2, 3])], list('wxyz'))
+    checkpoint = abrir_checkpoint(caminho)
+    np.testing.assert_array_equal(checkpoint.q, q)
+    assert checkpoint.visitas is None and checkpoint.metadados == {}
+    assert [nome for nome, _ in checkpoint.eixos] == ['local', 'nivel']
+
+def test_erros(tmp_path):
+    with pytest.raises(ValueError, match='Forma'):
+        salvar_checkpoint(tmp_path / 'x.npcq', np.zeros((2, 2), np.float32), [('local', ['a'])], ['x', 'y'])
+    (tmp_path / 'outro.bin').write_bytes(b'nada disso')
+    with pytest.raises(ValueError, match='não é um checkpoint'):
+        abrir_checkpoint(tmp_path / 'outro.bin')
+    assert not list(tmp_path.glob('*.tmp*'))
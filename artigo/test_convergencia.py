@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from artigo import tabela_em_array
+from convergencia import MOTIVOS, CriterioConvergencia
+
+def _tabela(semente=0):
+    return np.random.default_rng(semente).normal(10, 1, (4, 3, 2)).astype(np.float32)
+
+def test_convergiu_depois_de_k_blocos_estaveis():
+    q = _tabela()
+    criterio = CriterioConvergencia(blocos_estaveis=3, passos_max=10**6)
+    criterio.iniciar(q)
+    assert [criterio.atualizar(q, p) for p in (100, 200, 300)] == [None, None, 'convergiu']
+    assert criterio.passos == 300 and criterio.historico[-1]['delta_max'] == 0.0
+    assert 'estáveis' in criterio.descrever()
+
+def test_bloco_instavel_zera_a_contagem():
+    criterio = CriterioConvergencia(blocos_estaveis=2)
+    criterio.iniciar(_tabela(0))
+    assert criterio.atualizar(_tabela(0), 1) is None
+    assert criterio.atualizar(_tabela(1), 2) is None    # tabela mudou muito
+    assert criterio.estaveis == 0
+    assert criterio.atualizar(_tabela(1), 3) is None
+    assert criterio.atualizar(_tabela(1), 4) == 'convergiu'
+
+def test_troca_de_politica_acima_da_margem():
+    q = np.zeros((1, 10, 2), dtype=np.float32)
+    q[..., 0] = 1.0
+    trocada = q.copy()
+    trocada[0, :5, 1] = 1.0 + 0.01    # empate prático: não conta
+    trocada[0, 5:, 1] = 3.0           # troca de verdade em metade dos estados
+    criterio = CriterioConvergencia(tol_max=10, tol_media=10, tol_politica=0.15, margem_politica=0.05)
+    criterio.iniciar(q)
+    criterio.atualizar(trocada, 1)
+    assert criterio.historico[-1]['mudancas_politica'] == 5
+    assert criterio.estaveis == 0
+
+def test_passos_min_adia_a_convergencia():
+    q = _tabela()
+    criterio = CriterioConvergencia(blocos_estaveis=1, passos_min=500)
+    criterio.iniciar(q)
+    assert criterio.atualizar(q, 100) is None
+    assert criterio.atualizar(q, 500) == 'convergiu'
+
+def test_orcamentos_e_fim_dos_dados():
+    q = _tabela()
+    passos = CriterioConvergencia(blocos_estaveis=None, passos_max=200)
+    passos.iniciar(q)
+    assert passos.atualizar(q, 100) is None and passos.atualizar(q, 200) == 'orcamento_passos'
+
+    tempo = CriterioConvergencia(blocos_estaveis=None, segundos_max=0)
+    tempo.iniciar(q)
+    assert tempo.atualizar(q, 100) == 'orcamento_tempo'
+
+    fim = CriterioConvergencia(blocos_estaveis=None)
+    fim.iniciar(q)
+    assert fim.atualizar(q, 100) is None
+    assert fim.finalizar(150) == 'fim_dos_dados' and fim.passos == 150
+    assert {passos.motivo, tempo.motivo, fim.motivo, 'convergiu'} == set(MOTIVOS)
+
+def test_tabela_de_dicionario_em_array():
+    q_table = defaultdict(lambda: defaultdict(float))
+    q_table['Bar_Noite']['b'] = 2.5
+    q_table['Bar_Manhã']   # entrada vazia (choose_action cria) = nada aprendido
+    q = tabela_em_array(q_table, ['Café', 'Bar'], ['Manhã', 'Noite'], ['a', 'b'])
+    assert q.shape == (2, 2, 2) and q[1, 1, 1] == 2.5
+    assert np.isneginf(q).sum() == 7
@@ -0,0 +1,62 @@
+import numpy as np
+
+from grade_espacial import GradeEspacial
+from hotspots_espaciais import detectar_hotspots, detectar_por_local
+
+M_POR_GRAU = 6_371_000.0 * np.pi / 180
+LAT0, LON0 = 40.7, -74.0
+
+def _deslocar(dx_m, dy_m):
+    """(lat, lon) a dx_m metros a leste e dy_m ao norte de (LAT0, LON0)."""
+    return (LAT0 + np.asarray(dy_m) / M_POR_GRAU,
+            LON0 + np.asarray(dx_m) / (M_POR_GRAU * np.cos(np.radians(LAT0))))
+
+def test_sem_nucleo_tudo_e_ruido():
+    rng = np.random.default_rng(0)
+    lat, lon = _deslocar(rng.uniform(0, 5000, 50), rng.uniform(0, 5000, 50))
+    hotspots = detectar_hotspots(lat, lon, np.full(50, 3), raio_m=200, min_checkins=500)
+    assert hotspots.n_grupos == 0
+    assert (hotspots.grupo == -1).all() and (hotspots.pontuacao == 0).all()
+    assert hotspots.descrever().startswith('0 hotspots espaciais')
+
+def test_grupos_ordenados_com_borda_e_ruido():
+    # Grupo grande em (0, 0), grupo menor a 5 km, um ponto isolado a 20 km
+    dx = np.array([50, 60, 70, 290, 5050, 5060, 20000])
+    dy = np.array([50, 60, 70, 50, 50, 60, 20000])
+    pesos = np.array([300, 300, 300, 1, 200, 150, 40])
+    lat, lon = _deslocar(dx, dy)
+    hotspots = detectar_hotspots(lat, lon, pesos, raio_m=200, min_checkins=300)
+    assert hotspots.n_grupos == 2
+    np.testing.assert_array_equal(hotspots.grupo, [0, 0, 0, 0, 1, 1, -1])   # o ponto em 290 m é borda
+    np.testing.assert_array_equal(hotspots.checkins, [901, 350])
+    assert hotspots.pontuacao.max() == 1.0 and hotspots.pontuacao[-1] == 0
+    assert 0 < hotspots.pontuacao[4] < 1
+
+def test_por_local_usa_a_posicao_media_e_os_checkins():
+    lat, lon = _deslocar(np.array([0, 10, 3000, 3010]), np.array([0, 10, 0, 0]))
+    codigos = np.array([0, 0, 1, 1])
+    hotspots = detectar_por_local(codigos, lat, lon, raio_m=200, min_checkins=2, n_locais=3)
+    assert len(hotspots.pontuacao) == 3
+    assert hotspots.n_grupos == 2 and hotspots.grupo[2] == -1   # local 2 sem check-in
+    np.testing.assert_allclose(hotspots.centro_lat, [lat[:2].mean(), lat[2:].mean()])
+
+def test_grade_igual_a_forca_bruta():
+    rng = np.random.default_rng(1)
+    lat, lon = _deslocar(rng.uniform(-3000, 3000, 400), rng.uniform(-3000, 3000, 400))
+    grade = GradeEspacial(lat, lon, 250)
+    q_lat, q_lon = _deslocar(rng.uniform(-3500, 3500, 60), rng.uniform(-3500, 3500, 60))
+    x, y = grade.projetar(lat, lon)
+    qx, qy = grade.projetar(q_lat, q_lon)
+    distancias = np.hypot(x[None, :] - qx[:, None], y[None, :] - qy[:, None])
+
+    consulta, ponto, distancia = grade.no_raio(q_lat, q_lon, 400)
+    esperado = np.argwhere(distancias <= 400)
+    assert sorted(zip(consulta.tolist(), ponto.tolist())) == sorted(map(tuple, esperado.tolist()))
+    np.testing.assert_allclose(distancia, distancias[consulta, ponto])
+
+    indice, menor = grade.mais_proximo(q_lat, q_lon, 400)
+    perto = distancias.min(axis=1) <= 400
+    np.testing.assert_array_equal(indice[perto], distancias.argmin(axis=1)[perto])
+    assert (indice[~perto] == -1).all() and np.isinf(menor[~perto]).all()
+    for i in range(len(q_lat)):
+        assert grade.ponto_mais_proximo(q_lat[i], q_lon[i], 400)[0] == indice[i]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from indice_trajetorias import AmostradorTrajetorias, IndiceTrajetorias
+
+# Check-ins fora de ordem; o usuário 7 tem um empate no instante 5 e o 9 só um check-in
+USUARIOS = np.array([7, 3, 7, 3, 9, 7, 3, 7])
+INSTANTES = np.array([5, 2, 1, 9, 4, 5, 0, 8])
+LOCAIS = np.arange(8) * 10
+PERIODOS = np.arange(8) % 3
+
+def _indice():
+    return IndiceTrajetorias(USUARIOS, INSTANTES, LOCAIS, PERIODOS)
+
+def test_ordem_csr_por_usuario_e_instante():
+    indice = _indice()
+    np.testing.assert_array_equal(indice.usuarios, [3, 7, 9])
+    np.testing.assert_array_equal(indice.inicios, [0, 3, 7, 8])
+    # Usuário 3: linhas 6, 1, 3 | usuário 7: 2, então o empate (0 antes de 5, ordem do arquivo), 7 | usuário 9: 4
+    np.testing.assert_array_equal(indice.ordem, [6, 1, 3, 2, 0, 5, 7, 4])
+    np.testing.assert_array_equal(indice.loc, LOCAIS[indice.ordem])
+    np.testing.assert_array_equal(indice.timestamps[indice.trajetoria(7)], [1, 5, 5, 8])
+    assert indice.trajetoria(42) == slice(0, 0)
+
+def test_pares_so_dentro_da_trajetoria():
+    indice = _indice()
+    assert indice.n_pares == 5   # 2 do usuário 3, 3 do 7, nenhum do 9
+    t = indice.transicoes(indice.posicoes_pares)
+    np.testing.assert_array_equal(USUARIOS[t.indice], USUARIOS[t.indice_prox])
+    assert (INSTANTES[t.indice] <= INSTANTES[t.indice_prox]).all()
+    np.testing.assert_array_equal(t.loc_prox, LOCAIS[t.indice_prox])
+    np.testing.assert_array_equal(t.indice, [6, 1, 2, 0, 5])
+    np.testing.assert_array_equal(indice.pares_usuarios(np.array([1, 2, 0])), [3, 4, 5, 0, 1])
+
+def test_epoca_percorre_cada_par_uma_vez():
+    rng = np.random.default_rng(0)
+    n = 3000
+    usuarios = rng.integers(0, 200, n)
+    indice = IndiceTrajetorias(usuarios, rng.integers(0, 10**6, n),
+                               rng.integers(0, 50, n), rng.integers(0, 4, n))
+    for modo in AmostradorTrajetorias.MODOS:
+        amostrador = AmostradorTrajetorias(indice, modo, semente=1, usuarios_por_grupo=64)
+        lotes = list(amostrador.lotes(indice.n_pares, tamanho_lote=500))
+        linhas = np.concatenate([lote.indice for lote in lotes])
+        esperadas = indice.ordem[indice.posicoes_pares]
+        assert sorted(linhas.tolist()) == sorted(esperadas.tolist())
+        if modo == 'episodico':
+            # Cada lote é um passo: no máximo um check-in por usuário
+            for lote in lotes:
+                assert len(np.unique(usuarios[lote.indice])) == len(lote.indice)
+
+def test_sem_transicoes_reais():
+    indice = IndiceTrajetorias(np.arange(4), np.zeros(4), np.zeros(4), np.zeros(4))
+    with pytest.raises(ValueError):
+        AmostradorTrajetorias(indice)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from memoria_replay import MemoriaReplay
+
+def test_sorteio_proporcional_as_prioridades():
+    memoria = MemoriaReplay(10, prioritaria=True, alpha_prioridade=1.0, epsilon_prioridade=0.0, semente=0)
+    erros = np.array([1.0, 2.0, 3.0, 4.0, 0.0, 10.0, 5.0])
+    memoria.adicionar(np.arange(7), 0, 0, 0.0, 0, 0, erros_td=erros)
+    assert memoria.arvore[1] == pytest.approx(erros.sum())
+
+    n = 200000
+    posicoes, transicoes, pesos = memoria.amostrar(n, beta=1.0)
+    contagens = np.bincount(posicoes, minlength=7)
+    assert contagens[4] == 0 and posicoes.max() < 7
+    esperado = n * erros / erros.sum()
+    validos = esperado > 0
+    qui2 = ((contagens[validos] - esperado[validos]) ** 2 / esperado[validos]).sum()
+    graus = validos.sum() - 1
+    assert qui2 < graus + 5 * np.sqrt(2 * graus)
+    np.testing.assert_array_equal(transicoes.loc, posicoes)
+
+    # Pesos de importância (beta=1): inversamente proporcionais à prioridade, máximo 1
+    np.testing.assert_allclose(pesos, erros[validos].min() / erros[posicoes], rtol=1e-5)
+
+def test_atualizar_prioridades_muda_o_sorteio():
+    memoria = MemoriaReplay(4, prioritaria=True, alpha_prioridade=1.0, epsilon_prioridade=0.0, semente=1)
+    memoria.adicionar(np.arange(4), 0, 0, 0.0, 0, 0)   # todas com a prioridade máxima (1)
+    memoria.atualizar_prioridades(np.array([0, 1, 2]), np.zeros(3))
+    posicoes, _, _ = memoria.amostrar(1000)
+    assert (posicoes == 3).all()
+
+def test_buffer_circular_sobrescreve_as_mais_antigas():
+    memoria = MemoriaReplay(5, semente=0)
+    memoria.adicionar(np.arange(3), 0, 0, 0.0, 0, 0)
+    posicoes = memoria.adicionar(np.arange(3, 7), 0, 0, 0.0, 0, 0)
+    assert len(memoria) == 5 and memoria.posicao == 2
+    np.testing.assert_array_equal(posicoes, [3, 4, 0, 1])
+    np.testing.assert_array_equal(memoria.dados['loc'], [5, 6, 2, 3, 4])
+    # Lote maior que o buffer: ficam só as últimas
+    memoria.adicionar(np.arange(100, 112), 0, 0, 0.0, 0, 0)
+    assert sorted(memoria.dados['loc'].tolist()) == list(range(107, 112))
+
+def test_memoria_vazia():
+    with pytest.raises(ValueError):
+        MemoriaReplay(8).amostrar(4)
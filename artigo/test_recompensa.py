@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+import artigo2
+from artigo2 import ACOES, DataDrivenEnvironment, compilar_matriz_recompensa
+
+CATEGORIAS = ['Art Museum', 'Gym / Fitness Center', 'Coffee Shop', 'Shopping Mall', 'Bar',
+              'Park', 'Sports Bar', 'Food Court', 'Nightclub', 'Office', 'Subway', 'Plaza']
+
+def recompensa_por_regras(location, action, popularity):
+    """As regras originais (cadeia de if/elif), como referência."""
+    reward = -1
+    loc_lower = str(location).lower()
+    if any(x in loc_lower for x in ['museum', 'art', 'history', 'monument', 'park', 'library']):
+        if action == "Oferecer Tour Histórico": reward += 10
+        elif action == "Oferecer Missão de Combate": reward -= 5
+    elif any(x in loc_lower for x in ['gym', 'stadium', 'fitness', 'sport', 'soccer']):
+        if action == "Oferecer Missão de Combate": reward += 10
+        elif action == "Trocar Fofoca/Socializar": reward -= 2
+    elif any(x in loc_lower for x in ['cafe', 'coffee', 'food', 'restaurant', 'bakery']):
+        if action == "Oferecer Item de Energia": reward += 10
+        elif action == "Trocar Fofoca/Socializar": reward += 5
+    elif any(x in loc_lower for x in ['shop', 'store', 'mall', 'market', 'plaza']):
+        if action == "Negociar Itens": reward += 10
+        elif action == "Oferecer Item de Energia": reward += 2
+    elif any(x in loc_lower for x in ['bar', 'club', 'pub', 'lounge', 'night']):
+        if action == "Trocar Fofoca/Socializar": reward += 10
+        elif action == "Negociar Itens": reward -= 2
+    if popularity.get(location, 0) > 0.01:
+        reward += 2
+    return reward
+
+def test_matriz_igual_as_regras():
+    popularity = {c: (0.2 if i % 3 == 0 else 0.001) for i, c in enumerate(CATEGORIAS)}
+    matriz = compilar_matriz_recompensa(CATEGORIAS, ACOES, popularity)
+    esperado = [[recompensa_por_regras(c, a, popularity) for a in ACOES] for c in CATEGORIAS]
+    np.testing.assert_array_equal(matriz, np.array(esperado, dtype=np.float32))
+
+def test_ambiente_consulta_a_matriz(monkeypatch):
+    monkeypatch.setattr(artigo2, 'MODO_HOTSPOT', 'categoria')
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'User_ID': rng.integers(0, 20, 500),
+                       'Venue_Category': rng.choice(CATEGORIAS, 500),
+                       'Time_OfDay': rng.choice(['Manhã', 'Tarde', 'Noite'], 500)})
+    env = DataDrivenEnvironment(df)
+
+    loc_ids = rng.integers(0, len(env.locations), 200)
+    action_ids = rng.integers(0, len(ACOES), 200)
+    esperado = [recompensa_por_regras(env.locations[l], ACOES[a], env.popularity) for l, a in zip(loc_ids, action_ids)]
+    np.testing.assert_array_equal(env.recompensas(loc_ids, action_ids), esperado)
+    assert [env.get_reward_idx(l, a) for l, a in zip(loc_ids, action_ids)] == esperado
+
+    # Categoria fora do vocabulário: regras aplicadas na hora
+    for acao in ACOES:
+        assert env.get_reward({'Location': 'Rock Club'}, acao) == recompensa_por_regras('Rock Club', acao, {})
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from agente_denso import QLearningAgentDenso
+from telemetria import ETAPAS, Telemetria
+from treinador_lote import TreinadorLote
+
+def _treinar(telemetria=None, n=5000, tamanho_lote=1000):
+    rng = np.random.default_rng(0)
+    agent = QLearningAgentDenso(range(3), range(6), range(2))
+    matriz = rng.normal(size=(6, 3)).astype(np.float32)
+    treinador = TreinadorLote(agent, matriz, 'sequencial', semente=1, telemetria=telemetria)
+    if telemetria is not None:
+        telemetria.acompanhar(agent)
+    for _ in range(n // tamanho_lote):
+        loc, per = rng.integers(0, 6, tamanho_lote), rng.integers(0, 2, tamanho_lote)
+        _, recompensas, td = treinador.treinar(loc, per, np.roll(loc, -1), np.roll(per, -1))
+        if telemetria is not None:
+            telemetria.registrar_lote(recompensas, td)
+    return agent
+
+def test_janelas_jsonl(tmp_path):
+    caminho = tmp_path / 'telemetria.jsonl'
+    telemetria = Telemetria(caminho, janela=2000)
+    agent = _treinar(telemetria)
+    telemetria.fechar()
+
+    registros = [json.loads(linha) for linha in caminho.read_text(encoding='utf-8').splitlines()]
+    # 5 lotes de 1000 em janelas de 2000: duas cheias e a última, incompleta, no fechar
+    assert [r['janela'] for r in registros] == [0, 1, 2]
+    assert [r['transicoes'] for r in registros] == [2000, 4000, 5000]
+    assert registros[-1]['lotes'] == 5 and registros[-1]['segmentos'] > 0
+    assert set(registros[0]['tempos_s']) == set(ETAPAS)
+    assert registros[-1]['fracao_estados_visitados'] == pytest.approx(agent.visitas.any(axis=2).mean())
+    assert all(r['mudancas_politica'] >= 0 for r in registros)
+    assert sum(telemetria.tempos_totais.values()) > 0
+
+def test_telemetria_nao_muda_o_treino(tmp_path):
+    sem = _treinar()
+    com = _treinar(Telemetria(tmp_path / 't.jsonl'))
+    np.testing.assert_array_equal(sem.q, com.q)
+
+def test_arquivo_prometheus(tmp_path):
+    caminho = tmp_path / 'npc.prom'
+    telemetria = Telemetria(caminho, formato='prometheus', janela=1000)
+    _treinar(telemetria)
+    telemetria.fechar()
+    texto = caminho.read_text(encoding='utf-8')
+    assert 'npc_transicoes_total 5000' in texto
+    assert 'npc_etapa_segundos_total{etapa="atualizacao"}' in texto
+    assert not list(tmp_path.glob('*.tmp'))
+
+def test_formato_invalido(tmp_path):
+    with pytest.raises(ValueError):
+        Telemetria(tmp_path / 'x', formato='csv')
@@ -0,0 +1,48 @@
+import numpy as np
+
+from agente_denso import QLearningAgentDenso
+from treinador_lote import TreinadorLote, segmentos_sem_conflito
+
+def _segmentos_passo_a_passo(estados, estados_prox):
+    """Referência: corta o segmento quando um passo lê uma linha já escrita nele."""
+    inicios, escritas = [0], set()
+    for t, (s, s2) in enumerate(zip(estados.tolist(), estados_prox.tolist())):
+        if s in escritas or s2 in escritas:
+            inicios.append(t)
+            escritas = set()
+        escritas.add(s)
+    return inicios
+
+def test_segmentos_iguais_a_referencia():
+    rng = np.random.default_rng(0)
+    for n_estados in (1, 3, 40, 5000, 100000):
+        for n in (0, 1, 2, 17, 5000):
+            estados = rng.integers(0, n_estados, n)
+            estados_prox = rng.integers(0, n_estados, n)
+            assert segmentos_sem_conflito(estados, estados_prox) == _segmentos_passo_a_passo(estados, estados_prox)
+
+def test_sequencial_igual_ao_laco_com_learn_idx():
+    n_loc, n_per, n_acoes, n, semente = 12, 4, 5, 20000, 7
+    rng = np.random.default_rng(1)
+    matriz = rng.normal(0, 5, (n_loc, n_acoes)).astype(np.float32)
+    loc, loc_prox = rng.integers(0, n_loc, n), rng.integers(0, n_loc, n)
+    per, per_prox = rng.integers(0, n_per, n), rng.integers(0, n_per, n)
+
+    lote = QLearningAgentDenso(range(n_acoes), range(n_loc), range(n_per))
+    acoes, recompensas, _ = TreinadorLote(lote, matriz, 'sequencial', semente).treinar(loc, per, loc_prox, per_prox)
+
+    # Laço passo a passo com os mesmos sorteios do treinador (mesma semente, mesma ordem)
+    laco = QLearningAgentDenso(range(n_acoes), range(n_loc), range(n_per))
+    sorteios = np.random.default_rng(semente)
+    sorteio, aleatorias = sorteios.random(n), sorteios.integers(0, n_acoes, size=n)
+    for t in range(n):
+        linha = laco.q[loc[t], per[t]]
+        acao = int(linha.argmax())
+        if sorteio[t] < laco.epsilon or linha[acao] == -np.inf:
+            acao = int(aleatorias[t])
+        assert acoes[t] == acao
+        assert recompensas[t] == matriz[loc[t], acao]
+        laco.learn_idx(loc[t], per[t], acao, matriz[loc[t], acao], loc_prox[t], per_prox[t])
+
+    np.testing.assert_array_equal(lote.q, laco.q)
+    np.testing.assert_array_equal(lote.visitas, laco.visitas)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from treino_distribuido import chaves_de_divisao, fundir_tabelas, particionar
+
+def test_fusao_ponderada_pelas_visitas():
+    inf = -np.inf
+    q_global = np.array([[1.0, 5.0, inf]], dtype=np.float32)
+    tabelas = [np.array([[2.0, 7.0, inf]], dtype=np.float32),
+               np.array([[4.0, 9.0, 3.0]], dtype=np.float32)]
+    visitas = [np.array([[3, 0, 0]], dtype=np.int32),
+               np.array([[1, 0, 2]], dtype=np.int32)]
+    fundida = fundir_tabelas(q_global, tabelas, visitas)
+    # (3*2 + 1*4) / 4; célula sem visitas fica com o valor global; -inf de quem não visitou não contamina
+    np.testing.assert_array_equal(fundida, np.array([[2.5, 5.0, 3.0]], dtype=np.float32))
+    assert fundida.dtype == np.float32
+
+def test_fusao_sem_visitas_mantem_nao_aprendido():
+    q_global = np.full((2, 3), -np.inf, dtype=np.float32)
+    tabelas = [np.full((2, 3), -np.inf, dtype=np.float32)] * 2
+    visitas = [np.zeros((2, 3), dtype=np.int32)] * 2
+    assert np.isneginf(fundir_tabelas(q_global, tabelas, visitas)).all()
+
+def test_particionar_mantem_grupos_inteiros_e_equilibra():
+    rng = np.random.default_rng(0)
+    chaves = rng.zipf(1.5, 5000) % 300
+    ordem, inicios = particionar(chaves, 4)
+    assert sorted(ordem.tolist()) == list(range(len(chaves)))
+    fragmentos = [set(chaves[ordem[a:b]].tolist()) for a, b in zip(inicios[:-1], inicios[1:])]
+    for i in range(4):
+        for j in range(i + 1, 4):
+            assert not fragmentos[i] & fragmentos[j]
+    # Guloso do maior para o menor: a diferença de carga não passa do maior grupo
+    assert np.diff(inicios).max() - np.diff(inicios).min() <= np.bincount(chaves).max()
+
+def test_chave_regiao_pela_grade():
+    df = pd.DataFrame({'Latitude': [40.70, 40.7001, 40.80, np.nan],
+                       'Longitude': [-74.00, -74.0001, -73.90, -74.0]})
+    regiao = chaves_de_divisao(df, 'regiao', tamanho_regiao_m=1000)
+    assert regiao[0] == regiao[1] != regiao[2]
+    assert regiao[3] == -1
+    with pytest.raises(ValueError):
+        chaves_de_divisao(df, 'cidade')
+    with pytest.raises(ValueError):
+        chaves_de_divisao(df, 'User_ID')
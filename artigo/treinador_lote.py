@@ -0,0 +1,241 @@
+import time
+import numpy as np
+
+# TREINADOR EM LOTE (Q-LEARNING VETORIZADO)
+# Aplica as atualizações do Q-Learning sobre arrays de transições já
+# codificadas (local, período, próximo local, próximo período), direto na
+# tabela densa do QLearningAgentDenso. A escolha epsilon-greedy também é
+# feita em lote, com números aleatórios sorteados de uma vez.
+#
+# Modos:
+#   'sequencial' -> resultado IDÊNTICO ao laço passo a passo (mesma ordem de
+#                   atualização). O lote é cortado em segmentos sem conflito
+#                   (nenhum passo lê uma linha da Tabela Q escrita antes no
+#                   mesmo segmento) e cada segmento vira poucas operações NumPy.
+#   'sincrono'   -> minibatch síncrono: todos os alvos do bloco são calculados
+#                   com a tabela do início do bloco e somados por célula com
+#                   np.add.at (scatter-add sem buffer). Cada célula recebe o alvo
+#                   médio com taxa 1-(1-alpha)^n, o que n atualizações seguidas
+#                   para o mesmo alvo dariam.
+#
+# Com uma Telemetria (telemetria.py), o tempo de escolha da ação, recompensa
+# e atualização é acumulado por segmento/bloco; sem ela, nada é medido.
+
+MODOS_TREINO = ('sequencial', 'sincrono')
+
+def escolher_acoes(q_plana, estados, sorteio, acoes_aleatorias, epsilon):
+    """
+    Epsilon-greedy em lote. q_plana é a tabela (estados × ações); estados sem
+    nada aprendido (linha toda -inf) também recebem ação aleatória.
+    """
+    linhas = q_plana[estados]
+    gulosas = linhas.argmax(axis=1)
+    sem_dados = linhas[np.arange(len(estados)), gulosas] == -np.inf
+    return np.where((sorteio < epsilon) | sem_dados, acoes_aleatorias, gulosas)
+
+def _max_proximo(q_plana, estados_prox):
+    max_next_q = q_plana[estados_prox].max(axis=1)
+    return np.where(max_next_q == -np.inf, np.float32(0), max_next_q)
+
+def _ordem_estavel(codigos):
+    """argsort estável; códigos pequenos (< 2^16) são ordenados como uint16 (radix sort)."""
+    if len(codigos) and 0 <= codigos.min() and codigos.max() < 1 << 16:
+        codigos = codigos.astype(np.uint16)
+    return np.argsort(codigos, kind='stable')
+
+def segmentos_sem_conflito(estados, estados_prox):
+    """
+    Fronteiras dos segmentos em que nenhum passo t lê (linha s_t ou s'_t) algo
+    escrito por um passo anterior do mesmo segmento. Retorna os inícios.
+    """
+    estados = np.asarray(estados, dtype=np.int64)
+    estados_prox = np.asarray(estados_prox, dtype=np.int64)
+    n = len(estados)
+    if n == 0:
+        return [0]
+    tempos = np.arange(n)
+
+    # Última escrita anterior em s_t (-1 se nenhuma): o passo anterior com o
+    # mesmo estado, vizinho na ordenação estável por estado
+    ordem = _ordem_estavel(estados)
+    ordenados = estados[ordem]
+    anterior = np.full(n, -1, dtype=np.int64)
+    mesmo = ordenados[1:] == ordenados[:-1]
+    anterior[ordem[1:][mesmo]] = ordem[:-1][mesmo]
+
+    # Última escrita anterior em s'_t: maior chave estado * n + tempo das escritas
+    # abaixo de s'_t * n + t (consultas também ordenadas: searchsorted sequencial)
+    escritas = ordenados * n + ordem
+    ordem_prox = _ordem_estavel(estados_prox)
+    consultas = estados_prox[ordem_prox] * n + ordem_prox
+    chave = escritas[np.maximum(np.searchsorted(escritas, consultas) - 1, 0)]
+    achou = (chave < consultas) & (chave // n == estados_prox[ordem_prox])
+    anterior[ordem_prox] = np.maximum(anterior[ordem_prox], np.where(achou, chave % n, -1))
+
+    # Um segmento que começa em b termina no primeiro t com anterior[t] >= b:
+    # proximo[b] = min{t : anterior[t] >= b}, um mínimo acumulado (da direita)
+    # do primeiro passo que depende de cada escrita
+    primeiro = np.full(n + 1, n, dtype=np.int64)
+    np.minimum.at(primeiro, anterior + 1, tempos)
+    proximo = np.minimum.accumulate(primeiro[:0:-1])[::-1]
+
+    # Só o encadeamento das fronteiras fica em Python: uma volta por segmento
+    inicios = [0]
+    fim = int(proximo[0])
+    while fim < n:
+        inicios.append(fim)
+        fim = int(proximo[fim])
+    return inicios
+
+class TreinadorLote:
+    def __init__(self, agent, matriz_recompensa, modo='sequencial', semente=None, tamanho_bloco=4096,
+                 telemetria=None):
+        if modo not in MODOS_TREINO:
+            raise ValueError(f"Modo de treino inválido: {modo!r} (use um de {MODOS_TREINO})")
+        self.agent = agent
+        self.matriz_recompensa = matriz_recompensa
+        self.modo = modo
+        self.tamanho_bloco = tamanho_bloco
+        self.rng = np.random.default_rng(semente)
+        self.telemetria = telemetria
+        self.tempos = None if telemetria is None else telemetria.tempos
+
+        n_loc, self.n_periodos, self.n_acoes = agent.q.shape
+        # Visões (estados × ações) da mesma memória: estado = local * n_periodos + período
+        self.q_plana = agent.q.reshape(n_loc * self.n_periodos, self.n_acoes)
+        self.visitas_planas = agent.visitas.reshape(n_loc * self.n_periodos, self.n_acoes)
+
+    def treinar(self, loc, per, loc_prox, per_prox, bonus=None):
+        """
+        Treina sobre um lote de transições. 'bonus' (opcional) é uma recompensa
+        extra por transição, somada à da matriz (ex: hotspot espacial do local do
+        check-in). Retorna (ações, recompensas, erros TD), um valor por transição,
+        na ordem do lote.
+        """
+        estados = np.asarray(loc, dtype=np.int64) * self.n_periodos + per
+        estados_prox = np.asarray(loc_prox, dtype=np.int64) * self.n_periodos + per_prox
+        n = len(estados)
+        sorteio = self.rng.random(n)
+        acoes_aleatorias = self.rng.integers(0, self.n_acoes, size=n)
+
+        if self.modo == 'sequencial':
+            return self._treinar_sequencial(estados, estados_prox, sorteio, acoes_aleatorias, bonus)
+        return self._treinar_sincrono(estados, estados_prox, sorteio, acoes_aleatorias, bonus)
+
+    def aprender(self, loc, per, acoes, recompensas, loc_prox, per_prox, pesos=None):
+        """
+        Atualiza a tabela com transições que já têm ação e recompensa (ex: lotes
+        da memória de replay), com o mesmo resultado de chamar learn uma a uma na
+        ordem dada. 'pesos' (importância, no replay prioritário) escalam o passo.
+        Retorna os erros TD.
+        """
+        estados = np.asarray(loc, dtype=np.int64) * self.n_periodos + per
+        estados_prox = np.asarray(loc_prox, dtype=np.int64) * self.n_periodos + per_prox
+        acoes = np.asarray(acoes, dtype=np.int64)
+        recompensas = np.asarray(recompensas, dtype=np.float32)
+        n = len(estados)
+        td = np.empty(n, dtype=np.float32)
+        fronteiras = segmentos_sem_conflito(estados, estados_prox) + [n]
+        for a, b in zip(fronteiras[:-1], fronteiras[1:]):
+            td[a:b] = self._aplicar(estados[a:b], acoes[a:b], recompensas[a:b], estados_prox[a:b],
+                                    None if pesos is None else pesos[a:b])
+        return td
+
+    def _aplicar(self, s, acoes, recompensas, s2, pesos=None):
+        """Atualização Q-Learning de um segmento sem conflitos. Retorna os erros TD."""
+        q, agent = self.q_plana, self.agent
+        current_q = q[s, acoes]
+        current_q = np.where(current_q == -np.inf, np.float32(0), current_q)
+        td = recompensas + agent.gamma * _max_proximo(q, s2) - current_q
+        passo = td if pesos is None else pesos * td
+        q[s, acoes] = current_q + agent.alpha * passo
+        self.visitas_planas[s, acoes] += 1  # sem conflito: cada (s, a) aparece uma vez no segmento
+        return td
+
+    def _atualizar_segmento(self, s, s2, sorteio, acoes_aleatorias, bonus=None):
+        if self.tempos is None:
+            acoes = escolher_acoes(self.q_plana, s, sorteio, acoes_aleatorias, self.agent.epsilon)
+            recompensas = self.matriz_recompensa[s // self.n_periodos, acoes]
+            if bonus is not None:
+                recompensas = recompensas + bonus
+            return acoes, recompensas, self._aplicar(s, acoes, recompensas, s2)
+
+        t0 = time.perf_counter()
+        acoes = escolher_acoes(self.q_plana, s, sorteio, acoes_aleatorias, self.agent.epsilon)
+        t1 = time.perf_counter()
+        recompensas = self.matriz_recompensa[s // self.n_periodos, acoes]
+        if bonus is not None:
+            recompensas = recompensas + bonus
+        t2 = time.perf_counter()
+        td = self._aplicar(s, acoes, recompensas, s2)
+        t3 = time.perf_counter()
+        tempos = self.tempos
+        tempos['selecao'] += t1 - t0
+        tempos['recompensa'] += t2 - t1
+        tempos['atualizacao'] += t3 - t2
+        return acoes, recompensas, td
+
+    def _treinar_sequencial(self, estados, estados_prox, sorteio, acoes_aleatorias, bonus=None):
+        n = len(estados)
+        acoes = np.empty(n, dtype=np.int64)
+        recompensas = np.empty(n, dtype=np.float32)
+        td = np.empty(n, dtype=np.float32)
+        if self.tempos is not None:
+            t0 = time.perf_counter()
+        fronteiras = segmentos_sem_conflito(estados, estados_prox) + [n]
+        if self.tempos is not None:
+            # A busca dos segmentos faz parte do custo da atualização sequencial
+            self.tempos['atualizacao'] += time.perf_counter() - t0
+            self.telemetria.contadores['segmentos'] += len(fronteiras) - 1
+        for a, b in zip(fronteiras[:-1], fronteiras[1:]):
+            acoes[a:b], recompensas[a:b], td[a:b] = self._atualizar_segmento(
+                estados[a:b], estados_prox[a:b], sorteio[a:b], acoes_aleatorias[a:b],
+                None if bonus is None else bonus[a:b])
+        return acoes, recompensas, td
+
+    def _treinar_sincrono(self, estados, estados_prox, sorteio, acoes_aleatorias, bonus=None):
+        q, agent = self.q_plana, self.agent
+        q_linear = q.reshape(-1)
+        n = len(estados)
+        acoes = np.empty(n, dtype=np.int64)
+        recompensas = np.empty(n, dtype=np.float32)
+        td = np.empty(n, dtype=np.float32)
+
+        medir = self.tempos is not None
+        for a in range(0, n, self.tamanho_bloco):
+            b = min(a + self.tamanho_bloco, n)
+            s, s2 = estados[a:b], estados_prox[a:b]
+            if medir:
+                t0 = time.perf_counter()
+            acoes[a:b] = escolher_acoes(q, s, sorteio[a:b], acoes_aleatorias[a:b], agent.epsilon)
+            if medir:
+                t1 = time.perf_counter()
+            recompensas[a:b] = self.matriz_recompensa[s // self.n_periodos, acoes[a:b]]
+            if bonus is not None:
+                recompensas[a:b] += bonus[a:b]
+            if medir:
+                t2 = time.perf_counter()
+            alvos = recompensas[a:b] + agent.gamma * _max_proximo(q, s2)
+
+            celulas = s * self.n_acoes + acoes[a:b]
+            current_q = q_linear[celulas]
+            td[a:b] = alvos - np.where(current_q == -np.inf, np.float32(0), current_q)
+
+            # Soma dos alvos e nº de atualizações por célula (scatter-add sem buffer)
+            soma = np.zeros(q_linear.size, dtype=np.float64)
+            contagem = np.zeros(q_linear.size, dtype=np.int64)
+            np.add.at(soma, celulas, alvos)
+            np.add.at(contagem, celulas, 1)
+
+            tocadas = np.flatnonzero(contagem)
+            atual = q_linear[tocadas]
+            atual = np.where(atual == -np.inf, np.float32(0), atual)
+            taxa = 1.0 - (1.0 - agent.alpha) ** contagem[tocadas]
+            q_linear[tocadas] = atual + taxa * (soma[tocadas] / contagem[tocadas] - atual)
+            self.visitas_planas.reshape(-1)[tocadas] += contagem[tocadas].astype(np.int32)
+            if medir:
+                self.tempos['selecao'] += t1 - t0
+                self.tempos['recompensa'] += t2 - t1
+                self.tempos['atualizacao'] += time.perf_counter() - t2
+                self.telemetria.contadores['segmentos'] += 1
+        return acoes, recompensas, td
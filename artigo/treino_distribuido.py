@@ -0,0 +1,206 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+import artigo2
+import memoria_compartilhada
+from agente_denso import QLearningAgentDenso
+from amostrador import AmostradorTransicoes
+from grade_espacial import GradeEspacial
+from treinador_lote import TreinadorLote
+from varredura import avaliar_politica, TAMANHO_AVALIACAO
+
+# TREINO DISTRIBUÍDO POR FRAGMENTOS (SHARDS)
+# Os check-ins são divididos por User_ID (ou por Venue_ID, ou por região: a
+# célula de uma grade espacial de TAMANHO_REGIAO_M sobre Latitude/Longitude)
+# entre vários processos. A cada rodada, cada processo parte da Tabela Q global,
+# treina um agente local só com o seu fragmento e devolve a tabela + as visitas
+# da rodada. As tabelas são fundidas por média ponderada pelo nº de visitas de
+# cada célula e a tabela fundida é enviada de volta na rodada seguinte.
+#
+# Uso: python treino_distribuido.py dataset_TSMC2014_NYC.csv --processos 4 --comparar
+#      python treino_distribuido.py dataset_TSMC2014_NYC.csv --chave regiao
+
+PASSOS_POR_RODADA = 50000
+CHAVES_DIVISAO = ('User_ID', 'Venue_ID', 'regiao')
+TAMANHO_REGIAO_M = 5000
+
+# 1. DIVISÃO EM FRAGMENTOS
+def particionar(chaves, n_fragmentos):
+    """
+    Distribui os grupos de linhas com a mesma chave entre n fragmentos,
+    do maior grupo para o menor, sempre no fragmento menos carregado.
+    Retorna (ordem das linhas agrupadas por fragmento, início de cada fragmento).
+    """
+    _, grupos = np.unique(chaves, return_inverse=True)
+    tamanhos = np.bincount(grupos)
+    carga = np.zeros(n_fragmentos, dtype=np.int64)
+    fragmento_do_grupo = np.empty(len(tamanhos), dtype=np.int64)
+    for g in np.argsort(tamanhos)[::-1]:
+        destino = int(carga.argmin())
+        fragmento_do_grupo[g] = destino
+        carga[destino] += tamanhos[g]
+
+    fragmento = fragmento_do_grupo[grupos]
+    ordem = np.argsort(fragmento, kind='stable')
+    inicios = np.concatenate([[0], np.cumsum(np.bincount(fragmento, minlength=n_fragmentos))])
+    return ordem, inicios
+
+def chaves_de_divisao(df, chave, tamanho_regiao_m=TAMANHO_REGIAO_M):
+    """
+    Chave de cada linha para particionar: a própria coluna, ou para 'regiao' o
+    nº da célula da grade espacial (linhas sem coordenadas ficam juntas, em -1).
+    """
+    if chave not in CHAVES_DIVISAO:
+        raise ValueError(f"Chave de divisão inválida: {chave!r} (use uma de {CHAVES_DIVISAO})")
+    if chave != 'regiao':
+        if chave not in df.columns:
+            raise ValueError(f"O dataset não tem a coluna {chave!r}.")
+        return df[chave].to_numpy()
+    if not {'Latitude', 'Longitude'} <= set(df.columns):
+        raise ValueError("A divisão por região precisa das colunas Latitude/Longitude.")
+    lat = df['Latitude'].to_numpy(dtype=np.float64)
+    lon = df['Longitude'].to_numpy(dtype=np.float64)
+    validas = np.isfinite(lat) & np.isfinite(lon)
+    regiao = np.full(len(df), -1, dtype=np.int64)
+    if validas.any():
+        regiao[validas] = GradeEspacial(lat[validas], lon[validas], tamanho_regiao_m).celula_do_ponto
+    return regiao
+
+# 2. FUSÃO DAS TABELAS
+def fundir_tabelas(q_global, tabelas, visitas):
+    """
+    Média das tabelas locais ponderada pelas visitas de cada célula na rodada.
+    Células que ninguém visitou mantêm o valor global.
+    """
+    pesos = np.stack(visitas).astype(np.float64)
+    total = pesos.sum(axis=0)
+    valores = np.stack([np.where(np.isfinite(q), q, 0.0) for q in tabelas])
+    media = (pesos * valores).sum(axis=0) / np.maximum(total, 1)
+    return np.where(total > 0, media, q_global).astype(np.float32)
+
+# 3. PROCESSOS DE TREINO
+_DADOS = {}
+
+def _iniciar_processo(descricoes, contexto):
+    memoria_compartilhada.anexar(descricoes, _DADOS)
+    _DADOS.update(contexto)
+
+def _treinar_fragmento(fragmento, q_global, passos, semente):
+    """Treina um agente local (partindo da tabela global) sobre um fragmento."""
+    d = _DADOS
+    linhas = d['ordem'][d['inicios'][fragmento]:d['inicios'][fragmento + 1]]
+    if len(linhas) == 0:
+        return np.full_like(q_global, -np.inf), np.zeros(q_global.shape, dtype=np.int32), 0
+
+    agent = QLearningAgentDenso(d['actions'], d['locations'], d['periods'], **d['hiperparametros'])
+    agent.q[...] = q_global
+    amostrador = AmostradorTransicoes(d['loc_ids'][linhas], d['per_ids'][linhas], semente=semente)
+    treinador = TreinadorLote(agent, d['matriz_recompensa'], d['modo_treino'], semente)
+    bonus = d['bonus'][linhas] if 'bonus' in d else None
+    for lote in amostrador.lotes(passos):
+        treinador.treinar(lote.loc, lote.per, lote.loc_prox, lote.per_prox,
+                          None if bonus is None else bonus[lote.indice])
+    return agent.q, agent.visitas, passos
+
+def treinar_distribuido(env, total_passos, n_processos=None, chaves=None, passos_por_rodada=PASSOS_POR_RODADA,
+                        modo_treino='sincrono', semente=0, hiperparametros=None):
+    """
+    Treina com n_processos fragmentos e fusões periódicas.
+    Retorna (agente com a tabela fundida, passos por segundo).
+    """
+    n_processos = n_processos or os.cpu_count() or 1
+    hiperparametros = hiperparametros or {}
+    chaves = env.user_ids if chaves is None else chaves
+    ordem, inicios = particionar(chaves, n_processos)
+
+    agent = QLearningAgentDenso(env.actions, env.locations, env.periods, **hiperparametros)
+    arrays = {'loc_ids': env.loc_ids, 'per_ids': env.per_ids, 'ordem': ordem, 'inicios': inicios}
+    if env.bonus_linhas is not None:
+        arrays['bonus'] = env.bonus_linhas
+    blocos, descricoes = memoria_compartilhada.compartilhar(arrays)
+    contexto = {
+        'actions': env.actions, 'locations': env.locations, 'periods': env.periods,
+        'matriz_recompensa': env.matriz_recompensa, 'modo_treino': modo_treino,
+        'hiperparametros': hiperparametros,
+    }
+    # Cada fragmento treina proporcionalmente ao seu tamanho
+    proporcao = np.diff(inicios) / max(inicios[-1], 1)
+    rodadas = max(1, int(np.ceil(total_passos / passos_por_rodada)))
+    print(f"--- TREINO DISTRIBUÍDO: {n_processos} fragmentos, {rodadas} rodadas ---")
+
+    inicio = time.perf_counter()
+    feitos = 0
+    try:
+        with ProcessPoolExecutor(n_processos, initializer=_iniciar_processo,
+                                 initargs=(descricoes, contexto)) as pool:
+            for rodada in range(rodadas):
+                passos_rodada = min(passos_por_rodada, total_passos - rodada * passos_por_rodada)
+                tarefas = [pool.submit(_treinar_fragmento, f, agent.q,
+                                       int(round(passos_rodada * proporcao[f])), (semente, rodada, f))
+                           for f in range(n_processos)]
+                resultados = [t.result() for t in tarefas]
+
+                agent.q[...] = fundir_tabelas(agent.q, [r[0] for r in resultados], [r[1] for r in resultados])
+                for _, visitas, passos in resultados:
+                    agent.visitas += visitas
+                    feitos += passos
+    finally:
+        memoria_compartilhada.liberar(blocos)
+
+    return agent, feitos / (time.perf_counter() - inicio)
+
+def treinar_um_processo(env, total_passos, modo_treino='sincrono', semente=0, hiperparametros=None):
+    """Referência: o mesmo treino num único processo. Retorna (agente, passos por segundo)."""
+    agent = QLearningAgentDenso(env.actions, env.locations, env.periods, **(hiperparametros or {}))
+    amostrador = env.criar_amostrador('uniforme', semente)
+    treinador = TreinadorLote(agent, env.matriz_recompensa, modo_treino, semente)
+    inicio = time.perf_counter()
+    for lote in amostrador.lotes(total_passos):
+        treinador.treinar(lote.loc, lote.per, lote.loc_prox, lote.per_prox, env.bonus_do_lote(lote))
+    return agent, total_passos / (time.perf_counter() - inicio)
+
+# 4. RELATÓRIO
+def comparar_politicas(env, agente_a, agente_b, semente=0):
+    """Concordância das ações gulosas e avaliação comum (ver varredura.avaliar_politica)."""
+    rng = np.random.default_rng(semente)
+    aval = rng.integers(0, len(env.loc_ids), size=min(TAMANHO_AVALIACAO, len(env.loc_ids)))
+    loc, per = env.loc_ids[aval], env.per_ids[aval]
+    concordancia = float((agente_a.q[loc, per].argmax(axis=1) == agente_b.q[loc, per].argmax(axis=1)).mean())
+    return (concordancia,
+            avaliar_politica(agente_a.q, env.matriz_recompensa, loc, per),
+            avaliar_politica(agente_b.q, env.matriz_recompensa, loc, per))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treino Q-Learning distribuído por fragmentos de usuários.")
+    parser.add_argument('csv', nargs='?', default=artigo2.NOME_DO_ARQUIVO_CSV)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--epocas', type=int, default=2)
+    parser.add_argument('--chave', choices=CHAVES_DIVISAO, default='User_ID',
+                        help="como dividir: por usuário, por local ou por região (grade espacial)")
+    parser.add_argument('--tamanho-regiao', type=float, default=TAMANHO_REGIAO_M,
+                        help="lado da célula da região em metros (com --chave regiao)")
+    parser.add_argument('--passos-por-rodada', type=int, default=PASSOS_POR_RODADA)
+    parser.add_argument('--treino', choices=['sequencial', 'sincrono'], default='sincrono')
+    parser.add_argument('--comparar', action='store_true', help="compara com o treino num único processo")
+    args = parser.parse_args()
+
+    df = artigo2.carregar_dados_reais(args.csv)
+    env = artigo2.DataDrivenEnvironment(df)
+    total = len(df) * args.epocas
+
+    chaves = chaves_de_divisao(df, args.chave, args.tamanho_regiao)
+    agente, vazao = treinar_distribuido(env, total, args.processos, chaves,
+                                        args.passos_por_rodada, args.treino, artigo2.SEMENTE)
+    print(f"Distribuído: {vazao:,.0f} passos/s")
+
+    if args.comparar:
+        referencia, vazao_ref = treinar_um_processo(env, total, args.treino, artigo2.SEMENTE)
+        concordancia, (rec_d, otima_d), (rec_r, otima_r) = comparar_politicas(env, agente, referencia)
+        print(f"Um processo: {vazao_ref:,.0f} passos/s (aceleração: {vazao / vazao_ref:.2f}x)")
+        print("\n--- COMPARAÇÃO DAS POLÍTICAS ---")
+        print(f"Concordância das ações gulosas: {concordancia * 100:.1f}%")
+        print(f"Distribuído : recompensa média {rec_d:.3f} | ação ótima em {otima_d * 100:.1f}% dos estados")
+        print(f"Um processo : recompensa média {rec_r:.3f} | ação ótima em {otima_r * 100:.1f}% dos estados")
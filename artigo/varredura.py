@@ -0,0 +1,144 @@
+import os
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import artigo2
+import memoria_compartilhada
+from agente_denso import QLearningAgentDenso
+from amostrador import AmostradorTransicoes
+from treinador_lote import TreinadorLote
+
+# VARREDURA DE HIPERPARÂMETROS (alpha / gamma / epsilon)
+# Carrega o dataset codificado UMA vez, coloca os arrays em memória
+# compartilhada e distribui as configurações (grade ou busca aleatória,
+# cada uma com várias sementes) num pool de processos. Cada política
+# aprendida é avaliada no mesmo conjunto de estados, e tudo vai para uma
+# única tabela com o tempo de cada configuração.
+#
+# Uso: python varredura.py dataset_TSMC2014_NYC.csv --modo grade --saida varredura.csv
+
+GRADE_PADRAO = {
+    'alpha': [0.05, 0.1, 0.3],
+    'gamma': [0.5, 0.9, 0.99],
+    'epsilon': [0.05, 0.1, 0.3],
+}
+FAIXAS_ALEATORIAS = {
+    'alpha': (0.01, 0.5),
+    'gamma': (0.0, 0.99),
+    'epsilon': (0.01, 0.5),
+}
+TAMANHO_AVALIACAO = 50000
+
+# 1. CONFIGURAÇÕES
+def configuracoes_grade(grade=GRADE_PADRAO, sementes=(0,)):
+    chaves = list(grade)
+    return [dict(zip(chaves, valores), semente=semente)
+            for valores in itertools.product(*grade.values()) for semente in sementes]
+
+def configuracoes_aleatorias(n, faixas=FAIXAS_ALEATORIAS, sementes=(0,), semente=None):
+    rng = np.random.default_rng(semente)
+    configs = []
+    for _ in range(n):
+        valores = {nome: float(rng.uniform(*faixa)) for nome, faixa in faixas.items()}
+        configs.extend(dict(valores, semente=s) for s in sementes)
+    return configs
+
+# 2. DADOS EM MEMÓRIA COMPARTILHADA
+_DADOS = {}
+
+def _iniciar_processo(descricoes, contexto):
+    memoria_compartilhada.anexar(descricoes, _DADOS)
+    _DADOS.update(contexto)
+
+# 3. TREINO E AVALIAÇÃO DE UMA CONFIGURAÇÃO
+def avaliar_politica(q, matriz_recompensa, loc_aval, per_aval):
+    """
+    Avaliação comum a todas as configurações: recompensa média da ação gulosa
+    nos mesmos estados, e fração de estados em que ela é a melhor possível.
+    Estados não aprendidos contam como ação aleatória (média da linha).
+    """
+    linhas = q[loc_aval, per_aval]
+    gulosas = linhas.argmax(axis=1)
+    aprendido = linhas[np.arange(len(gulosas)), gulosas] != -np.inf
+    recompensa = np.where(aprendido, matriz_recompensa[loc_aval, gulosas], matriz_recompensa[loc_aval].mean(axis=1))
+    otima = aprendido & (matriz_recompensa[loc_aval, gulosas] == matriz_recompensa[loc_aval].max(axis=1))
+    return float(recompensa.mean()), float(otima.mean())
+
+def treinar_configuracao(config):
+    inicio = time.perf_counter()
+    d = _DADOS
+    agent = QLearningAgentDenso(d['actions'], d['locations'], d['periods'],
+                                alpha=config['alpha'], gamma=config['gamma'], epsilon=config['epsilon'])
+    amostrador = AmostradorTransicoes(d['loc_ids'], d['per_ids'], semente=config['semente'])
+    treinador = TreinadorLote(agent, d['matriz_recompensa'], d['modo_treino'], config['semente'])
+    for lote in amostrador.lotes(len(d['loc_ids']) * d['epocas']):
+        treinador.treinar(lote.loc, lote.per, lote.loc_prox, lote.per_prox,
+                          d['bonus'][lote.indice] if 'bonus' in d else None)
+
+    recompensa_media, fracao_otima = avaliar_politica(agent.q, d['matriz_recompensa'], d['loc_aval'], d['per_aval'])
+    return dict(config, recompensa_media=recompensa_media, fracao_otima=fracao_otima,
+                tempo_s=time.perf_counter() - inicio)
+
+# 4. EXECUÇÃO DA VARREDURA
+def executar_varredura(env, configs, epocas=2, modo_treino='sincrono', n_processos=None, semente_avaliacao=0):
+    """Treina/avalia cada configuração em paralelo e retorna um DataFrame com os resultados."""
+    rng = np.random.default_rng(semente_avaliacao)
+    aval = rng.integers(0, len(env.loc_ids), size=min(TAMANHO_AVALIACAO, len(env.loc_ids)))
+    arrays = {'loc_ids': env.loc_ids, 'per_ids': env.per_ids,
+              'loc_aval': env.loc_ids[aval], 'per_aval': env.per_ids[aval]}
+    if env.bonus_linhas is not None:
+        arrays['bonus'] = env.bonus_linhas
+    blocos, descricoes = memoria_compartilhada.compartilhar(arrays)
+    contexto = {
+        'actions': env.actions, 'locations': env.locations, 'periods': env.periods,
+        'matriz_recompensa': env.matriz_recompensa, 'epocas': epocas, 'modo_treino': modo_treino,
+    }
+    n_processos = n_processos or os.cpu_count() or 1
+    print(f"--- VARREDURA: {len(configs)} configurações em {n_processos} processos ---")
+
+    resultados = []
+    try:
+        with ProcessPoolExecutor(n_processos, initializer=_iniciar_processo,
+                                 initargs=(descricoes, contexto)) as pool:
+            for i, resultado in enumerate(pool.map(treinar_configuracao, configs), 1):
+                resultados.append(resultado)
+                print(f"   [{i}/{len(configs)}] alpha={resultado['alpha']:.3f} gamma={resultado['gamma']:.3f} "
+                      f"epsilon={resultado['epsilon']:.3f} semente={resultado['semente']} -> "
+                      f"recompensa={resultado['recompensa_media']:.3f} ({resultado['tempo_s']:.2f}s)")
+    finally:
+        memoria_compartilhada.liberar(blocos)
+
+    return pd.DataFrame(resultados).sort_values('recompensa_media', ascending=False, ignore_index=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de alpha/gamma/epsilon do agente Q-Learning.")
+    parser.add_argument('csv', nargs='?', default=artigo2.NOME_DO_ARQUIVO_CSV)
+    parser.add_argument('--modo', choices=['grade', 'aleatoria'], default='grade')
+    parser.add_argument('--n', type=int, default=20, help="nº de configurações na busca aleatória")
+    parser.add_argument('--sementes', type=int, default=2, help="sementes por configuração")
+    parser.add_argument('--epocas', type=int, default=2)
+    parser.add_argument('--treino', choices=['sequencial', 'sincrono'], default='sincrono')
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--saida', default='varredura.csv')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    df = artigo2.carregar_dados_reais(args.csv)
+    env = artigo2.DataDrivenEnvironment(df)
+    print(f"Ingestão (uma vez só): {time.perf_counter() - inicio:.2f}s\n")
+
+    sementes = range(args.sementes)
+    if args.modo == 'grade':
+        configs = configuracoes_grade(sementes=sementes)
+    else:
+        configs = configuracoes_aleatorias(args.n, sementes=sementes, semente=artigo2.SEMENTE)
+
+    resultados = executar_varredura(env, configs, args.epocas, args.treino, args.processos)
+    resultados.to_csv(args.saida, index=False)
+    print(f"\n--- MELHORES CONFIGURAÇÕES (tabela completa em {args.saida}) ---")
+    print(resultados.head(10).to_string(index=False))
+    print(f"\nTempo total: {time.perf_counter() - inicio:.2f}s")
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# MÓDULOS DO ARTIGO NO SEMINÁRIO
+# Alguns scripts do seminário reaproveitam módulos de ../artigo (memória de
+# replay, formato do checkpoint, grade espacial). Este é o único lugar que
+# põe a pasta do artigo no sys.path; quem rodar com PYTHONPATH=../artigo já
+# tem os módulos e este import não muda nada.
+#
+# Uso: import caminho_artigo   (antes de 'import checkpoint_q' e afins)
+
+PASTA_ARTIGO = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'artigo'))
+
+if PASTA_ARTIGO not in (os.path.normpath(os.path.abspath(p)) for p in sys.path):
+    sys.path.insert(0, PASTA_ARTIGO)
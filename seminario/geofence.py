@@ -0,0 +1,215 @@
+import os
+import re
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# O índice espacial (grade uniforme) é o mesmo dos hotspots do artigo: artigo/grade_espacial.py
+import caminho_artigo
+from grade_espacial import GradeEspacial, menor_distancia
+
+from servico_politica import OUTRO
+
+# GEOFENCES: DA POSIÇÃO GPS AO 'local' DO ESTADO DO NPC
+# Em produção o evento "jogador entrou no local" chega como uma posição GPS
+# (lat, lon). Antes de qualquer lógica do NPC é preciso saber em qual geofence
+# (um círculo de raio fixo em volta de cada venue) o jogador está, e traduzir a
+# categoria do venue no 'local' que a Camada 1 (RL) conhece (Praça, Museu ou
+# OUTRO).
+#
+# Os venues saem dos próprios check-ins (posição média e categoria de cada
+# venueId) ou de um arquivo de venues já exportado, e ficam numa GradeEspacial
+# com células do tamanho do maior raio: uma consulta só olha as 3×3 células em
+# volta. Se o jogador está dentro de várias geofences, vale a do venue mais
+# próximo.
+#
+# Uso: python geofence.py dataset_TSMC2014_NYC.csv --exportar locais_npc.csv
+#      python geofence.py locais_npc.csv --bench 100000
+
+RAIO_PADRAO_M = 50
+COLUNAS_VENUES = ['venueId', 'venueCategory', 'latitude', 'longitude', 'raio']
+
+# 1. CATEGORIA DO VENUE -> LOCAL DO NPC
+# Categorias do Foursquare com a palavra-chave mas que não são o local do NPC
+# (consultadas antes das palavras-chave)
+CATEGORIAS_LOCAL = {
+    'Theme Park': OUTRO,
+    'Theme Park Ride / Attraction': OUTRO,
+    'Water Park': OUTRO,
+    'Skate Park': OUTRO,
+    'RV Park': OUTRO,
+    'Trailer Park': OUTRO,
+    'Car Park': OUTRO,
+    'Business Park': OUTRO,
+    'Industrial Park': OUTRO,
+}
+# Palavra-chave na categoria -> local do estado do NPC (a primeira que bater).
+# Só palavra inteira: 'Park' não pega 'Parking'
+PALAVRAS_LOCAL = [
+    ('Museum', 'Museu'),
+    ('Plaza', 'Praça'),
+    ('Square', 'Praça'),
+    ('Park', 'Praça'),
+]
+_PADROES_LOCAL = [(re.compile(rf'\b{re.escape(palavra)}\b'), local) for palavra, local in PALAVRAS_LOCAL]
+
+def local_da_categoria(categoria):
+    categoria = str(categoria)
+    if categoria in CATEGORIAS_LOCAL:
+        return CATEGORIAS_LOCAL[categoria]
+    for padrao, local in _PADROES_LOCAL:
+        if padrao.search(categoria):
+            return local
+    return OUTRO
+
+# Geofences de exemplo (usadas quando não há arquivo de venues)
+VENUES_DEMO = pd.DataFrame([
+    ('demo-praca', 'Plaza', 40.73082, -73.99733, 150.0),
+    ('demo-museu', 'Art Museum', 40.77941, -73.96324, 120.0),
+    ('demo-mercado', 'Farmers Market', 40.73591, -73.99054, 80.0),
+], columns=COLUNAS_VENUES)
+
+# 2. ÍNDICE DE GEOFENCES
+class IndiceGeofence:
+    def __init__(self, venues, categorias, lat, lon, raios=None):
+        self.venues = np.asarray(venues, dtype=object)
+        self.categorias = np.asarray(categorias, dtype=object)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.raios = np.full(len(self.lat), RAIO_PADRAO_M, dtype=np.float64) if raios is None \
+            else np.asarray(raios, dtype=np.float64)
+        self.raio_max = float(self.raios.max(initial=RAIO_PADRAO_M))
+        self.raios_lista = self.raios.tolist()
+        # Local do NPC de cada venue (calculado uma vez por categoria distinta)
+        distintas, inverso = np.unique(self.categorias.astype(str), return_inverse=True)
+        self.locais_venues = np.array([local_da_categoria(c) for c in distintas], dtype=object)[inverso.ravel()]
+        self.grade = GradeEspacial(self.lat, self.lon, self.raio_max)
+
+    def __len__(self):
+        return len(self.venues)
+
+    @classmethod
+    def de_tabela(cls, df, raio_m=RAIO_PADRAO_M):
+        """Tabela no formato COLUNAS_VENUES ('raio' é opcional)."""
+        raios = df['raio'] if 'raio' in df else np.full(len(df), raio_m)
+        return cls(df['venueId'].to_numpy(), df['venueCategory'].to_numpy(),
+                   df['latitude'].to_numpy(), df['longitude'].to_numpy(), raios)
+
+    @classmethod
+    def de_checkins(cls, df_limpo, raio_m=RAIO_PADRAO_M):
+        """
+        Venues a partir dos check-ins já processados (artigo2.carregar_dados_reais):
+        posição média e categoria de cada Venue_ID com coordenadas válidas.
+        """
+        validos = df_limpo.dropna(subset=['Latitude', 'Longitude'])
+        venues = (validos.groupby('Venue_ID', observed=True, sort=False)
+                  .agg(venueCategory=('Venue_Category', 'first'),
+                       latitude=('Latitude', 'mean'), longitude=('Longitude', 'mean'))
+                  .reset_index().rename(columns={'Venue_ID': 'venueId'}))
+        venues['venueCategory'] = venues['venueCategory'].astype(str)
+        return cls.de_tabela(venues, raio_m)
+
+    def tabela(self):
+        return pd.DataFrame({'venueId': self.venues, 'venueCategory': self.categorias,
+                             'latitude': self.lat, 'longitude': self.lon, 'raio': self.raios})
+
+    def salvar(self, caminho):
+        self.tabela().to_csv(caminho, index=False)
+
+    # Consultas em lote (arrays de posições)
+    def resolver(self, lat, lon):
+        """Venue da geofence de cada posição (índice ou -1) e a distância até ele."""
+        consulta, venue, distancia = self.grade.no_raio(lat, lon, self.raio_max)
+        dentro = distancia <= self.raios[venue]
+        return menor_distancia(len(np.atleast_1d(lat)), consulta[dentro], venue[dentro], distancia[dentro])
+
+    def locais(self, lat, lon):
+        """'local' do estado do NPC para cada posição (OUTRO fora de qualquer geofence)."""
+        return self.locais_dos_venues(self.resolver(lat, lon)[0])
+
+    def locais_dos_venues(self, indice):
+        """'local' do NPC de cada índice de venue (OUTRO para -1)."""
+        indice = np.asarray(indice)
+        locais = np.full(len(indice), OUTRO, dtype=object)
+        dentro = indice >= 0
+        locais[dentro] = self.locais_venues[indice[dentro]]
+        return locais
+
+    def no_raio(self, lat, lon, raio_m):
+        """Venues a até raio_m de uma posição, do mais próximo ao mais distante: (índices, distâncias)."""
+        _, venue, distancia = self.grade.no_raio(lat, lon, raio_m)
+        ordem = np.argsort(distancia, kind='stable')
+        return venue[ordem], distancia[ordem]
+
+    def mais_proximo(self, lat, lon, raio_max_m):
+        """Venue mais próximo de cada posição (com ou sem geofence), até raio_max_m."""
+        return self.grade.mais_proximo(lat, lon, raio_max_m)
+
+    # Consulta de um jogador só (caminho escalar, sem custo fixo do NumPy)
+    def resolver_um(self, lat, lon):
+        """Dicionário com o venue, a categoria, a distância e o 'local' do NPC da posição."""
+        indice, distancia = self.grade.ponto_mais_proximo(lat, lon, self.raio_max, self.raios_lista)
+        if indice < 0:
+            return {'venue': None, 'categoria': None, 'distancia_m': None, 'local': OUTRO}
+        return {'venue': self.venues[indice], 'categoria': self.categorias[indice],
+                'distancia_m': distancia, 'local': self.locais_venues[indice]}
+
+def ler_venues(caminho, raio_m=RAIO_PADRAO_M):
+    """Arquivo de venues (COLUNAS_VENUES) ou um CSV de check-ins do Foursquare."""
+    colunas = pd.read_csv(caminho, nrows=0).columns
+    if {'venueId', 'venueCategory', 'latitude', 'longitude'} <= set(colunas) and 'utcTimestamp' not in colunas:
+        return IndiceGeofence.de_tabela(pd.read_csv(caminho), raio_m)
+    import artigo2
+    return IndiceGeofence.de_checkins(artigo2.carregar_dados_reais(caminho), raio_m)
+
+def carregar_geofences(caminho=None, raio_m=RAIO_PADRAO_M):
+    """Geofences do arquivo, ou as de exemplo (VENUES_DEMO) se não houver arquivo."""
+    if caminho and os.path.exists(caminho):
+        return ler_venues(caminho, raio_m)
+    return IndiceGeofence.de_tabela(VENUES_DEMO)
+
+# 3. TESTE DE VAZÃO
+def posicoes_aleatorias(indice, n, espalhamento_m=60, semente=0):
+    """Posições em volta de venues sorteados (espalhamento gaussiano em metros)."""
+    rng = np.random.default_rng(semente)
+    escolhidos = rng.integers(0, len(indice), n)
+    lat = indice.lat[escolhidos] + rng.normal(0, espalhamento_m, n) / indice.grade.m_por_grau_lat
+    lon = indice.lon[escolhidos] + rng.normal(0, espalhamento_m, n) / indice.grade.m_por_grau_lon
+    return lat, lon
+
+def bench(indice, n):
+    lat, lon = posicoes_aleatorias(indice, n)
+    inicio = time.perf_counter()
+    locais = indice.locais(lat, lon)
+    lote = time.perf_counter() - inicio
+
+    n_um = min(n, 20000)
+    lat_um, lon_um = lat[:n_um].tolist(), lon[:n_um].tolist()
+    inicio = time.perf_counter()
+    locais_um = [indice.resolver_um(a, b)['local'] for a, b in zip(lat_um, lon_um)]
+    um = time.perf_counter() - inicio
+
+    valores, contagens = np.unique(locais.astype(str), return_counts=True)
+    print(f"{len(indice):,} venues | {n:,} posições | dentro de alguma geofence: "
+          f"{(indice.resolver(lat, lon)[0] >= 0).mean() * 100:.1f}%")
+    print("   locais: " + ", ".join(f"{v}={c:,}" for v, c in zip(valores, contagens)))
+    print(f"Lote:   {lote * 1000:.1f} ms ({lote / n * 1e6:.2f} µs por posição)")
+    print(f"Um a um: {um / n_um * 1e6:.2f} µs por posição "
+          f"(iguais ao lote: {sum(a == b for a, b in zip(locais_um, locais[:n_um]))}/{n_um})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geofences dos venues: posição GPS -> 'local' do NPC.")
+    parser.add_argument('arquivo', nargs='?', default=None,
+                        help="arquivo de venues ou CSV de check-ins (sem ele: geofences de exemplo)")
+    parser.add_argument('--raio', type=float, default=RAIO_PADRAO_M, help="raio de cada geofence (m)")
+    parser.add_argument('--exportar', default=None, help="grava os venues neste CSV")
+    parser.add_argument('--bench', type=int, default=0, help="nº de posições do teste de vazão")
+    args = parser.parse_args()
+
+    indice = carregar_geofences(args.arquivo, args.raio)
+    if args.exportar:
+        indice.salvar(args.exportar)
+        print(f"{len(indice):,} venues gravados em '{args.exportar}'")
+    if args.bench:
+        bench(indice, args.bench)
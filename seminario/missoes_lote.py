@@ -0,0 +1,200 @@
+import io
+import sys
+import time
+import argparse
+import contextlib
+import numpy as np
+import pandas as pd
+
+from servico_politica import INTENCOES, OUTRO
+from teste2 import ENEMY_DB, LOCATION_DB, QUANTIDADES, GeradorMissoesCSP, versao_mundo
+
+# GERADOR DE MISSÕES EM LOTE (CSP ESPECIALIZADO)
+# Milhares de jogadores entram em geofences no mesmo segundo, e resolver o CSP
+# genérico (python-constraint) jogador a jogador não acompanha. As restrições
+# do GeradorMissoesCSP viram máscaras booleanas:
+#   - local_alvo != local atual                 -> máscara (jogador, local_alvo)
+#   - nível do inimigo (missão fácil / média)    -> máscara (jogador, inimigo)
+#   - 'Torre do Mago' só com inimigo de nível 8+ -> máscara fixa (local_alvo, inimigo)
+#   - quantidade não tem restrição               -> sorteada à parte
+# O E lógico das três dá os pares (local_alvo, inimigo) possíveis de cada
+# jogador. Sortear um par uniforme entre eles e uma quantidade uniforme é o
+# mesmo que sortear uma solução uniforme do CSP, tudo vetorizado sobre o lote.
+#
+# Uso: python missoes_lote.py --verificar        (equivalência com o CSP)
+#      python -m pytest test_missoes_lote.py     (a mesma verificação + sorteio uniforme)
+#      python missoes_lote.py --bench 100000
+
+# Tipo de cada intenção (mesmas regras do GeradorMissoesCSP)
+FACIL, MEDIA, SEM_FAIXA, SEM_MISSAO = 0, 1, 2, 3
+
+def tipo_intencao(intencao):
+    if 'Missão' not in intencao:
+        return SEM_MISSAO
+    return {'Oferecer_Missão_Fácil': FACIL, 'Oferecer_Missão_Média': MEDIA}.get(intencao, SEM_FAIXA)
+
+class GeradorMissoesLote:
+    def __init__(self, semente=None):
+        self.rng = np.random.default_rng(semente)
+        self._versao = None
+
+    def compilar(self):
+        """Tabelas fixas do mundo; refeitas sozinhas depois de um mundo_alterado() (ver teste2)."""
+        self.locais_alvo = list(LOCATION_DB)
+        self.inimigos = list(ENEMY_DB)
+        self.niveis = np.array([ENEMY_DB[e][0] for e in self.inimigos], dtype=np.int64)
+        self.recompensas = np.array([ENEMY_DB[e][1] for e in self.inimigos], dtype=np.int64)
+        self.quantidades = np.array(QUANTIDADES, dtype=np.int64)
+        self.indice_locais = pd.Index(self.locais_alvo)
+        # Restrição 3: lugares perigosos só para níveis altos
+        torre = np.array([local == 'Torre do Mago' for local in self.locais_alvo])
+        self.pares_fixos = ~(torre[:, None] & (self.niveis[None, :] < 8))
+        self._versao = versao_mundo()
+
+    def mascaras(self, locais, niveis, intencoes):
+        """
+        Pares possíveis de cada jogador, (jogadores, local_alvo, inimigo), e quem
+        pediu missão (intenções sem 'Missão' não geram nada).
+        """
+        if versao_mundo() != self._versao:
+            self.compilar()
+        # Restrição 1: o local da missão não pode ser o local atual (-1 = fora do LOCATION_DB)
+        atual = self.indice_locais.get_indexer(pd.Index(np.asarray(locais, dtype=object)))
+        local_ok = np.arange(len(self.locais_alvo))[None, :] != atual[:, None]
+
+        # Restrição 2: nível do inimigo compatível com o do jogador
+        codigos, distintas = pd.factorize(np.asarray(intencoes, dtype=object))
+        tipo = np.array([tipo_intencao(i) for i in distintas], dtype=np.int8)[codigos]
+        nivel = np.asarray(niveis)[:, None]
+        facil = self.niveis[None, :] <= nivel + 1
+        media = (self.niveis[None, :] > nivel + 1) & (self.niveis[None, :] <= nivel + 4)
+        inimigo_ok = np.where((tipo == FACIL)[:, None], facil, np.where((tipo == MEDIA)[:, None], media, True))
+
+        pares = local_ok[:, :, None] & inimigo_ok[:, None, :] & self.pares_fixos[None]
+        return pares, tipo != SEM_MISSAO
+
+    def gerar(self, locais, niveis, intencoes):
+        """
+        Uma missão por jogador (arrays do mesmo tamanho). Retorna um dict de
+        arrays: índices de local_alvo e inimigo, quantidade, recompensa e
+        'valida' (False = intenção sem missão ou sem solução; índices -1).
+        """
+        pares, pediu = self.mascaras(locais, niveis, intencoes)
+        n = len(pares)
+        acumulado = pares.reshape(n, -1).cumsum(axis=1)
+        possiveis = acumulado[:, -1]
+        valida = pediu & (possiveis > 0)
+
+        # k-ésimo par possível de cada jogador, com k uniforme em [0, possiveis)
+        k = (self.rng.random(n) * possiveis).astype(np.int64)
+        par = (acumulado > k[:, None]).argmax(axis=1)
+        local_alvo, inimigo = np.divmod(par, len(self.inimigos))
+        quantidade = self.quantidades[self.rng.integers(0, len(self.quantidades), n)]
+        return {
+            'local_alvo': np.where(valida, local_alvo, -1),
+            'inimigo': np.where(valida, inimigo, -1),
+            'quantidade': np.where(valida, quantidade, 0),
+            'recompensa': np.where(valida, self.recompensas[inimigo] * quantidade, 0),
+            'valida': valida,
+        }
+
+    def como_dicts(self, missoes):
+        """Missões no formato do generate_quest (dict ou None por jogador)."""
+        return [{'local_alvo': self.locais_alvo[l], 'inimigo': self.inimigos[i],
+                 'quantidade': int(q), 'recompensa': int(r)} if v else None
+                for l, i, q, r, v in zip(missoes['local_alvo'].tolist(), missoes['inimigo'].tolist(),
+                                         missoes['quantidade'].tolist(), missoes['recompensa'].tolist(),
+                                         missoes['valida'].tolist())]
+
+    def generate_quests(self, states, intentions):
+        """Versão em lote do GeradorMissoesCSP.generate_quest (estados como dicts)."""
+        missoes = self.gerar([s['local'] for s in states], [s['nivel'] for s in states], intentions)
+        return self.como_dicts(missoes)
+
+# VERIFICAÇÃO: MESMAS SOLUÇÕES QUE O CSP
+def verificar_equivalencia(niveis=range(0, 16), sorteios=50, semente=0):
+    """
+    Para cada (local atual, nível, intenção), compara o conjunto de missões das
+    máscaras com o getSolutions() do CSP, e confere que as missões sorteadas
+    pelo lote são soluções do CSP. Retorna True se tudo bater.
+    """
+    csp = GeradorMissoesCSP()
+    lote = GeradorMissoesLote(semente)
+    intencoes = INTENCOES + ['Oferecer_Missão_Épica']   # missão sem regra de nível
+    combinacoes = [(local, nivel, intencao) for local in LOCATION_DB + ['Praça', 'Museu', OUTRO]
+                   for nivel in niveis for intencao in intencoes]
+    locais, nivs, ints = (list(coluna) for coluna in zip(*combinacoes))
+    pares, pediu = lote.mascaras(locais, nivs, ints)
+
+    divergentes = 0
+    esperado = []
+    for i, (local, nivel, intencao) in enumerate(combinacoes):
+        solucoes = None
+        if 'Missão' in intencao:
+            solucoes = {(s['local_alvo'], s['inimigo'], s['quantidade'])
+                        for s in csp.solve_quests(local, nivel, intencao)}
+        do_lote = None
+        if pediu[i]:
+            do_lote = {(lote.locais_alvo[a], lote.inimigos[b], int(q))
+                       for a, b in np.argwhere(pares[i]) for q in lote.quantidades}
+        esperado.append(solucoes)
+        if solucoes != do_lote:
+            divergentes += 1
+            print(f"   DIVERGE: {local}, nível {nivel}, {intencao}")
+
+    # As missões sorteadas são soluções (e só faltam quando o CSP não tem solução)
+    repetidas = lambda coluna: np.repeat(np.asarray(coluna, dtype=object), sorteios)
+    sorteadas = lote.como_dicts(lote.gerar(repetidas(locais), np.repeat(nivs, sorteios), repetidas(ints)))
+    invalidas = 0
+    for j, missao in enumerate(sorteadas):
+        solucoes = esperado[j // sorteios]
+        if missao is None:
+            invalidas += bool(solucoes)
+        elif solucoes is None or (missao['local_alvo'], missao['inimigo'], missao['quantidade']) not in solucoes \
+                or missao['recompensa'] != ENEMY_DB[missao['inimigo']][1] * missao['quantidade']:
+            invalidas += 1
+
+    print(f"Conjuntos de soluções: {len(combinacoes) - divergentes}/{len(combinacoes)} iguais ao CSP")
+    print(f"Missões sorteadas: {len(sorteadas) - invalidas}/{len(sorteadas)} válidas")
+    return divergentes == 0 and invalidas == 0
+
+# TESTE DE VAZÃO
+def jogadores_aleatorios(n, semente=0):
+    rng = np.random.default_rng(semente)
+    locais = np.array(LOCATION_DB + ['Praça', 'Museu', OUTRO], dtype=object)
+    return (locais[rng.integers(0, len(locais), n)], rng.integers(1, 16, n),
+            np.array(INTENCOES, dtype=object)[rng.integers(0, len(INTENCOES), n)])
+
+def bench(n):
+    locais, niveis, intencoes = jogadores_aleatorios(n)
+    lote = GeradorMissoesLote(semente=0)
+    lote.compilar()
+    inicio = time.perf_counter()
+    missoes = lote.gerar(locais, niveis, intencoes)
+    duracao = time.perf_counter() - inicio
+    print(f"Lote: {n:,} jogadores em {duracao * 1000:.1f} ms ({duracao / n * 1e6:.2f} µs por jogador, "
+          f"{missoes['valida'].sum():,} missões)")
+
+    estados = [{'local': l, 'nivel': int(v)} for l, v in zip(locais, niveis)]
+    for nome, usar_cache, limite in (('CSP com cache', True, 20000), ('CSP sem cache', False, 500)):
+        csp = GeradorMissoesCSP(semente=0)
+        m = min(n, limite)
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for estado, intencao in zip(estados[:m], intencoes[:m]):
+                if not usar_cache:
+                    csp.cache.clear()
+                csp.generate_quest(estado, intencao)
+        duracao = time.perf_counter() - inicio
+        print(f"{nome}: {duracao / m * 1e6:.2f} µs por jogador ({m:,} jogadores, um a um)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Geração de missões em lote (máscaras no lugar do CSP genérico).")
+    parser.add_argument('--verificar', action='store_true', help="confere a equivalência com o GeradorMissoesCSP")
+    parser.add_argument('--bench', type=int, default=0, help="nº de jogadores do teste de vazão")
+    args = parser.parse_args()
+
+    if args.verificar and not verificar_equivalencia():
+        sys.exit(1)
+    if args.bench:
+        bench(args.bench)
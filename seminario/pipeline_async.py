@@ -0,0 +1,429 @@
+import os
+import json
+import time
+import asyncio
+import numbers
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+
+from servico_politica import carregar_politica, EstatisticasLatencia
+from geofence import carregar_geofences, posicoes_aleatorias
+from missoes_lote import GeradorMissoesLote
+from dialogos import carregar_roteiros, ARQUIVO_DIALOGOS
+from teste2 import CHECKPOINT_POLITICA, ARQUIVO_GEOFENCES
+
+# PIPELINE ASSÍNCRONO DE INTERAÇÕES DO NPC
+# O run_demo do teste2.py encadeia RL -> CSP -> diálogo para um jogador só, com
+# time.sleep entre as etapas (~10 s por encontro). Aqui cada camada é uma etapa
+# asyncio, ligada à seguinte por uma fila limitada:
+#
+#   evento GPS -> [geofence] -> [rl] -> [csp] -> [dialogo] -> apresentação
+#
+#   - cada etapa tira da fila tudo o que já chegou (até lote_max) e processa
+#     como um lote: geofences e argmax da política são vetorizados no próprio
+#     laço de eventos; missões (GeradorMissoesLote) e roteiros de diálogo rodam
+#     num pool de processos (ou numa thread, com processos=0)
+#   - filas cheias seguram quem envia (backpressure): enviar() só volta quando
+#     há espaço na primeira fila
+#   - a apresentação é um temporizador por jogador (asyncio.sleep numa tarefa
+#     do próprio jogador), nunca um sleep global: milhares de NPCs falam ao
+#     mesmo tempo, e as falas de um mesmo jogador não se misturam
+#   - latência por etapa (espera na fila + processamento), de ponta a ponta e
+#     até a última fala entregue
+# O modo demonstração (ritmo_demo) mostra cada encontro como o run_demo, com as
+# mesmas pausas de leitura, para a apresentação em aula.
+#
+# Uso: python pipeline_async.py --demo
+#      python pipeline_async.py --jogadores 5000 --eventos-por-jogador 4 --processos 2
+#      python pipeline_async.py --porta 8766   (servidor JSON por linha; ver teste_carga.py)
+
+ETAPAS = ('geofence', 'rl', 'csp', 'dialogo')
+PAUSA_ETAPA_DEMO = 1.0   # entre as camadas (como os time.sleep(1) do run_demo)
+PAUSA_FALA_DEMO = 1.5    # entre as falas do NPC
+
+# 1. TRABALHO PESADO (RODA NO POOL)
+# Como nos pools do artigo: cada processo monta os seus geradores uma vez no initializer
+_DADOS = {}
+
+def _iniciar_processo(semente, arquivo_dialogos, por_processo=True):
+    _DADOS['missoes'] = GeradorMissoesLote((semente, os.getpid()) if por_processo else semente)
+    _DADOS['roteiros'] = carregar_roteiros(arquivo_dialogos)
+
+def _gerar_missoes(locais, niveis, intencoes):
+    gerador = _DADOS['missoes']
+    return gerador.como_dicts(gerador.gerar(locais, niveis, intencoes))
+
+def _renderizar(itens):
+    return _DADOS['roteiros'].render_plans(itens)
+
+# 2. PIPELINE
+def problema_no_evento(evento):
+    """Por que o evento não pode atravessar as etapas (None se estiver completo)."""
+    if not isinstance(evento, dict):
+        return f"esperado um objeto, recebido {type(evento).__name__}"
+    faltando = [campo for campo in ('nome', 'nivel', 'historico') if campo not in evento]
+    if evento.get('local') is None and not ('lat' in evento and 'lon' in evento):
+        faltando.append('local (ou lat e lon)')
+    if faltando:
+        return f"campos ausentes: {', '.join(faltando)}"
+    if not isinstance(evento['nome'], str) or not isinstance(evento['historico'], str):
+        return "nome e historico devem ser texto"
+    if not isinstance(evento['nivel'], numbers.Integral) or isinstance(evento['nivel'], bool):
+        return f"nivel inválido: {evento['nivel']!r}"
+    numero = lambda valor: isinstance(valor, numbers.Real) and not isinstance(valor, bool)
+    if evento.get('local') is None and not (numero(evento['lat']) and numero(evento['lon'])):
+        return f"posição inválida: ({evento['lat']!r}, {evento['lon']!r})"
+    return None
+
+class Encontro:
+    """Um evento de jogador atravessando as etapas (evento malformado já nasce com erro)."""
+    def __init__(self, evento):
+        self.evento = evento
+        problema = problema_no_evento(evento)
+        dados = evento if isinstance(evento, dict) else {}
+        self.estado = {campo: dados.get(campo) for campo in ('nome', 'local', 'nivel', 'historico')}
+        self.geofence = None
+        self.intencao = None
+        self.missao = None
+        self.plano = None
+        self.erro = None if problema is None else f"evento: {problema}"
+        self.latencias = {}   # etapa -> segundos (fila + processamento); 'total' = até o roteiro pronto
+        self.pronto = asyncio.get_running_loop().create_future()
+        self.inicio = self.entrada = time.perf_counter()
+
+class PipelineNPC:
+    def __init__(self, geofences, politica, tamanho_fila=1024, lote_max=256, processos=0, semente=0,
+                 arquivo_dialogos=ARQUIVO_DIALOGOS, ritmo_demo=False, pausa_fala=0.0, entregar=None):
+        self.geofences = geofences
+        self.politica = politica
+        self.tamanho_fila = tamanho_fila
+        self.lote_max = lote_max
+        self.processos = processos
+        self.semente = semente
+        self.arquivo_dialogos = arquivo_dialogos
+        self.ritmo_demo = ritmo_demo
+        self.pausa_fala = PAUSA_FALA_DEMO if ritmo_demo else pausa_fala
+        self.entregar = entregar        # entregar(encontro, fala), chamado a cada fala apresentada
+
+        self.metricas = {nome: EstatisticasLatencia() for nome in ETAPAS + ('total', 'entrega')}
+        self.fila_maxima = dict.fromkeys(ETAPAS, 0)
+        self.erros = 0
+        self.concluidos = 0
+        self.filas = []
+        self._tarefas = []
+        self._apresentando = {}   # jogador -> tarefa da apresentação em andamento
+        self._executor = None
+
+    async def iniciar(self):
+        if self.processos > 0:
+            self._executor = ProcessPoolExecutor(self.processos, initializer=_iniciar_processo,
+                                                 initargs=(self.semente, self.arquivo_dialogos))
+        else:
+            # Uma thread só: o gerador de missões (e o seu RNG) não é compartilhado entre threads
+            _iniciar_processo(self.semente, self.arquivo_dialogos, por_processo=False)
+            self._executor = ThreadPoolExecutor(1)
+        self.filas = [asyncio.Queue(self.tamanho_fila) for _ in ETAPAS]
+        processar = [self._etapa_geofence, self._etapa_rl, self._etapa_csp, self._etapa_dialogo]
+        for i, nome in enumerate(ETAPAS):
+            saida = self.filas[i + 1] if i + 1 < len(ETAPAS) else None
+            self._tarefas.append(asyncio.create_task(self._rodar_etapa(nome, self.filas[i], saida, processar[i])))
+
+    async def enviar(self, evento):
+        """Coloca o evento no pipeline; espera se a primeira fila estiver cheia."""
+        encontro = Encontro(evento)
+        if encontro.erro:
+            # Segue pelas filas mesmo assim (as etapas o pulam): a resposta e a ordem do jogador não mudam
+            print(f"[PIPELINE] Evento recusado para '{encontro.estado['nome']}': {encontro.erro}")
+            self.erros += 1
+        await self.filas[0].put(encontro)
+        return encontro
+
+    async def parar(self):
+        """Espera tudo o que já entrou passar pelas etapas e ser apresentado."""
+        for fila in self.filas:
+            await fila.join()
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        await asyncio.gather(*list(self._apresentando.values()), return_exceptions=True)
+        self._executor.shutdown()
+
+    async def _na_pool(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, funcao, *args)
+
+    async def _rodar_etapa(self, nome, entrada, saida, processar):
+        while True:
+            lote = [await entrada.get()]
+            while len(lote) < self.lote_max and not entrada.empty():
+                lote.append(entrada.get_nowait())
+            self.fila_maxima[nome] = max(self.fila_maxima[nome], len(lote) + entrada.qsize())
+
+            validos = [e for e in lote if e.erro is None]
+            try:
+                if validos:
+                    await processar(validos)
+            except Exception:
+                # Algum encontro malformado: processa um de cada vez para isolar o erro
+                # (como o _agrupar do servico_politica); só quem falhar fica marcado
+                for encontro in validos:
+                    try:
+                        await processar([encontro])
+                    except Exception as e:
+                        print(f"[PIPELINE] Falha na etapa '{nome}' para '{encontro.estado['nome']}': "
+                              f"{type(e).__name__}: {e}")
+                        encontro.erro = f"{nome}: {type(e).__name__}: {e}"
+                        self.erros += 1
+
+            agora = time.perf_counter()
+            self.metricas[nome].registrar_lote([agora - e.entrada for e in lote], len(lote))
+            for encontro in lote:
+                # task_done sempre, senão o parar() fica esperando a fila para sempre
+                try:
+                    encontro.latencias[nome] = agora - encontro.entrada
+                    encontro.entrada = agora
+                    if saida is not None:
+                        await saida.put(encontro)   # fila seguinte cheia: esta etapa espera (backpressure)
+                    else:
+                        self._concluir(encontro, agora)
+                finally:
+                    entrada.task_done()
+
+    # Etapas (recebem só encontros sem erro)
+    async def _etapa_geofence(self, lote):
+        sem_local = [e for e in lote if e.estado['local'] is None]
+        if not sem_local:
+            return
+        lat = np.array([e.evento['lat'] for e in sem_local], dtype=np.float64)
+        lon = np.array([e.evento['lon'] for e in sem_local], dtype=np.float64)
+        indices, _ = self.geofences.resolver(lat, lon)
+        for encontro, indice, local in zip(sem_local, indices, self.geofences.locais_dos_venues(indices)):
+            encontro.geofence = int(indice)
+            encontro.estado['local'] = local
+
+    async def _etapa_rl(self, lote):
+        politica = self.politica   # referência fixa durante o lote
+        for encontro, intencao in zip(lote, politica.get_intentions([e.estado for e in lote])):
+            encontro.intencao = intencao
+
+    async def _etapa_csp(self, lote):
+        missoes = await self._na_pool(_gerar_missoes, [e.estado['local'] for e in lote],
+                                      [e.estado['nivel'] for e in lote], [e.intencao for e in lote])
+        for encontro, missao in zip(lote, missoes):
+            encontro.missao = missao
+
+    async def _etapa_dialogo(self, lote):
+        planos = await self._na_pool(_renderizar, [(e.intencao, e.missao, e.estado) for e in lote])
+        for encontro, plano in zip(lote, planos):
+            encontro.plano = plano
+
+    # 3. APRESENTAÇÃO (TEMPORIZADOR POR JOGADOR)
+    def _concluir(self, encontro, agora):
+        encontro.latencias['total'] = agora - encontro.inicio
+        if encontro.erro is None:
+            self.metricas['total'].registrar_lote([encontro.latencias['total']], 1)
+        if not encontro.pronto.done():
+            encontro.pronto.set_result(encontro)
+        jogador = encontro.estado['nome']
+        anterior = self._apresentando.get(jogador)
+        if not (self.ritmo_demo or self.pausa_fala) and anterior is None:
+            self._apresentar_agora(encontro)   # sem ritmo: entrega já, sem criar tarefa
+            return
+        tarefa = asyncio.create_task(self._apresentar(encontro, anterior))
+        self._apresentando[jogador] = tarefa
+        tarefa.add_done_callback(lambda t: self._fim_da_apresentacao(jogador, t))
+
+    def _fim_da_apresentacao(self, jogador, tarefa):
+        if self._apresentando.get(jogador) is tarefa:
+            del self._apresentando[jogador]
+
+    def _apresentar_agora(self, encontro):
+        for fala in encontro.plano or []:
+            if not self._entregar(encontro, fala):
+                break
+        self._registrar_entrega(encontro)
+
+    def _entregar(self, encontro, fala):
+        """Chama o entregar() do usuário; uma falha é registrada como erro do encontro (como nas etapas)."""
+        if not self.entregar:
+            return True
+        try:
+            self.entregar(encontro, fala)
+            return True
+        except Exception as e:
+            print(f"[PIPELINE] Falha ao entregar fala para '{encontro.estado['nome']}': {type(e).__name__}: {e}")
+            if encontro.erro is None:
+                encontro.erro = f"entrega: {type(e).__name__}: {e}"
+                self.erros += 1
+            return False
+
+    def _registrar_entrega(self, encontro):
+        self.concluidos += 1
+        if encontro.erro is None:
+            self.metricas['entrega'].registrar_lote([time.perf_counter() - encontro.inicio], 1)
+
+    async def _apresentar(self, encontro, anterior):
+        if anterior is not None:
+            await asyncio.gather(anterior, return_exceptions=True)   # uma conversa por vez com cada jogador
+        if self.ritmo_demo:
+            await self._narrar(encontro)
+        for fala in encontro.plano or []:
+            if not self._entregar(encontro, fala):
+                break
+            if self.ritmo_demo:
+                print(f"NPC -> {encontro.estado['nome']}: {fala}")
+            await asyncio.sleep(self.pausa_fala)
+        if self.ritmo_demo:
+            print(f"--- FIM DA INTERAÇÃO COM {encontro.estado['nome']} ---")
+        self._registrar_entrega(encontro)
+
+    async def _narrar(self, encontro):
+        """As mensagens das camadas do run_demo, com as mesmas pausas (sem travar os outros jogadores)."""
+        estado, evento = encontro.estado, encontro.evento
+        if encontro.erro:
+            print(f"\nEVENTO: {estado['nome']} -> falha no pipeline ({encontro.erro})")
+            return
+        if encontro.geofence is not None and encontro.geofence >= 0:
+            venue = self.geofences.venues[encontro.geofence]
+            print(f"\nEVENTO: posição ({evento['lat']:.5f}, {evento['lon']:.5f}) -> venue '{venue}'")
+        print(f"EVENTO: {estado['nome']} (Nível {estado['nivel']}) entrou na '{estado['local']}'.")
+        await asyncio.sleep(PAUSA_ETAPA_DEMO)
+        print(f"[CAMADA 1: RL] {estado['nome']}: Decisão: {encontro.intencao}")
+        await asyncio.sleep(PAUSA_ETAPA_DEMO)
+        print(f"[CAMADA 2: CSP] {estado['nome']}: "
+              f"{encontro.missao if encontro.missao else 'nenhuma missão gerada'}")
+        await asyncio.sleep(PAUSA_ETAPA_DEMO)
+        print(f"--- INÍCIO DA INTERAÇÃO COM {estado['nome']} ---")
+
+    def descrever(self):
+        linhas = []
+        for nome in ETAPAS + ('total', 'entrega'):
+            fila = f" | fila máx {self.fila_maxima[nome]}" if nome in self.fila_maxima else ""
+            linhas.append(f"   {nome:<9} {self.metricas[nome].descrever()}{fila}")
+        linhas.append(f"   {self.concluidos:,} encontros apresentados, {self.erros:,} com erro")
+        return '\n'.join(linhas)
+
+# 4. SIMULAÇÃO DE JOGADORES
+def eventos_aleatorios(geofences, n_jogadores, eventos_por_jogador=1, semente=0):
+    """Posições GPS em volta dos venues, com nível e histórico sorteados por jogador."""
+    rng = np.random.default_rng(semente)
+    total = n_jogadores * eventos_por_jogador
+    lat, lon = posicoes_aleatorias(geofences, total, semente=semente)
+    niveis = rng.integers(1, 16, n_jogadores)
+    historicos = np.array(['Novo', 'Veterano'])[rng.integers(0, 2, n_jogadores)]
+    return [[{'nome': f'Jogador{j}', 'lat': float(lat[k]), 'lon': float(lon[k]),
+              'nivel': int(niveis[j]), 'historico': str(historicos[j])}
+             for k in range(j * eventos_por_jogador, (j + 1) * eventos_por_jogador)]
+            for j in range(n_jogadores)]
+
+async def simular(pipeline, eventos_por_jogador, intervalo=0.0):
+    """Uma tarefa por jogador, todas enviando ao mesmo tempo (o pipeline segura quem passar do limite)."""
+    async def jogador(eventos):
+        for evento in eventos:
+            await pipeline.enviar(evento)
+            if intervalo:
+                await asyncio.sleep(intervalo)
+
+    await pipeline.iniciar()
+    inicio = time.perf_counter()
+    await asyncio.gather(*(jogador(eventos) for eventos in eventos_por_jogador))
+    await pipeline.parar()
+    return time.perf_counter() - inicio
+
+# 5. SERVIDOR (JSON POR LINHA, COMO O servico_politica.py)
+#   {"id": 1, "evento": {"nome": "J1", "lat": 40.73, "lon": -73.99, "nivel": 5, "historico": "Novo"}}
+#   {"id": 2, "comando": "estatisticas"}
+# A resposta do evento sai quando o roteiro fica pronto (a apresentação é do cliente).
+def resposta_do_encontro(encontro):
+    resposta = {'local': encontro.estado['local'], 'intencao': encontro.intencao, 'missao': encontro.missao,
+                'plano': encontro.plano, 'latencias_ms': {k: v * 1000 for k, v in encontro.latencias.items()}}
+    if encontro.erro:
+        resposta['falha'] = encontro.erro
+    return resposta
+
+async def _atender_pedido(pipeline, linha, writer):
+    pedido = {}
+    try:
+        pedido = json.loads(linha)
+        if pedido.get('comando') == 'estatisticas':
+            resposta = {'estatisticas': {nome: m.resumo() for nome, m in pipeline.metricas.items()},
+                        'erros': pipeline.erros}
+        else:
+            encontro = await pipeline.enviar(pedido['evento'])
+            resposta = resposta_do_encontro(await encontro.pronto)
+    except Exception as e:
+        resposta = {'erro': f"{type(e).__name__}: {e}"}
+    resposta['id'] = pedido.get('id') if isinstance(pedido, dict) else None
+    if not writer.is_closing():
+        writer.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b'\n')
+
+async def atender_conexao(pipeline, reader, writer):
+    pendentes = set()
+    try:
+        while linha := await reader.readline():
+            tarefa = asyncio.create_task(_atender_pedido(pipeline, linha, writer))
+            pendentes.add(tarefa)
+            tarefa.add_done_callback(pendentes.discard)
+        await asyncio.gather(*pendentes)
+    finally:
+        writer.close()
+
+async def iniciar_servidor(pipeline, porta=None, socket_unix=None, host='127.0.0.1'):
+    await pipeline.iniciar()
+    atender = lambda reader, writer: atender_conexao(pipeline, reader, writer)
+    if socket_unix:
+        return await asyncio.start_unix_server(atender, path=socket_unix)
+    return await asyncio.start_server(atender, host, porta)
+
+async def servir(args):
+    pipeline = PipelineNPC(carregar_geofences(args.geofences), carregar_politica(args.checkpoint),
+                           args.tamanho_fila, args.lote_max, args.processos)
+    servidor = await iniciar_servidor(pipeline, args.porta, args.socket)
+    print(f"[PIPELINE] Ouvindo em {args.socket or f'127.0.0.1:{args.porta}'}")
+    try:
+        async with servidor:
+            while True:
+                await asyncio.sleep(args.relatorio)
+                print(f"[PIPELINE]\n{pipeline.descrever()}")
+    finally:
+        await pipeline.parar()
+
+EVENTO_DEMO = {'nome': 'JogadorX', 'lat': 40.73095, 'lon': -73.99710, 'nivel': 5, 'historico': 'Novo'}
+
+async def principal(args):
+    geofences = carregar_geofences(args.geofences)
+    politica = carregar_politica(args.checkpoint)
+    if args.demo:
+        print("--- INICIANDO DEMONSTRAÇÃO DO PIPELINE ASSÍNCRONO DO NPC ---")
+        eventos = [[dict(EVENTO_DEMO)]] + eventos_aleatorios(geofences, args.jogadores - 1)
+    else:
+        eventos = eventos_aleatorios(geofences, args.jogadores, args.eventos_por_jogador)
+    pipeline = PipelineNPC(geofences, politica, args.tamanho_fila, args.lote_max, args.processos,
+                           ritmo_demo=args.demo, pausa_fala=args.pausa_fala)
+    duracao = await simular(pipeline, eventos)
+    total = sum(map(len, eventos))
+    print(f"\n--- {total:,} eventos de {len(eventos):,} jogadores em {duracao:.2f}s "
+          f"({total / duracao:,.0f} eventos/s) ---")
+    print(pipeline.descrever())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline assíncrono RL -> CSP -> diálogo para muitos jogadores.")
+    parser.add_argument('--demo', action='store_true', help="ritmo de apresentação em aula (narra cada encontro)")
+    parser.add_argument('--jogadores', type=int, default=None, help="padrão: 1 no --demo, 2000 no teste")
+    parser.add_argument('--eventos-por-jogador', type=int, default=1)
+    parser.add_argument('--tamanho-fila', type=int, default=1024)
+    parser.add_argument('--lote-max', type=int, default=256)
+    parser.add_argument('--processos', type=int, default=0, help="pool de processos das etapas pesadas (0 = thread)")
+    parser.add_argument('--pausa-fala', type=float, default=0.0, help="pausa entre as falas de cada jogador (s)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_POLITICA)
+    parser.add_argument('--geofences', default=ARQUIVO_GEOFENCES)
+    parser.add_argument('--porta', type=int, default=None, help="sobe o servidor TCP nesta porta em vez da simulação")
+    parser.add_argument('--socket', default=None, help="sobe o servidor num socket Unix em vez da simulação")
+    parser.add_argument('--relatorio', type=float, default=10.0, help="intervalo entre relatórios do servidor (s)")
+    args = parser.parse_args()
+    if args.jogadores is None:
+        args.jogadores = 1 if args.demo else 2000
+    try:
+        asyncio.run(servir(args) if args.porta or args.socket else principal(args))
+    except KeyboardInterrupt:
+        pass
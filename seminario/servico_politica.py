@@ -0,0 +1,434 @@
+import os
+import json
+import time
+import bisect
+import asyncio
+import argparse
+from collections import deque
+import numpy as np
+
+# O formato do checkpoint (cabeçalho + arrays mapeados em memória) é o do artigo: artigo/checkpoint_q.py
+import caminho_artigo
+import checkpoint_q
+
+# SERVIÇO DE INFERÊNCIA DA POLÍTICA DO NPC
+# Carrega uma Tabela Q treinada (checkpoint .npcq) e responde qual a melhor
+# intenção para um estado, ou para um lote de estados (um único argmax
+# vetorizado sobre os estados codificados).
+#
+# O servidor asyncio fala JSON por linha, em TCP local ou socket Unix:
+#   {"id": 1, "estado": {"local": "Praça", "nivel": 5, "historico": "Novo"}}
+#   {"id": 2, "estados": [{...}, {...}]}
+#   {"id": 3, "comando": "estatisticas"}
+#   {"id": 4, "comando": "recarregar", "caminho": "politica_npc.npcq"}
+# Pedidos que chegam juntos são agrupados (micro-batching) num só argmax.
+# A recarga troca a referência da política de uma vez: lotes em andamento
+# terminam com a tabela antiga e nenhum pedido é perdido.
+#
+# O checkpoint precisa ter eixos do estado do NPC: cada eixo é um campo do
+# estado (CAMPOS_ESTADO) ou sai dele por um EXTRATOR (ex: faixa_nivel), como
+# em EIXOS_NPC. A tabela do artigo2.py (categoria do Foursquare × período)
+# não serve e é recusada na carga. Uma tabela treinada em outro lugar entra
+# com exportar_politica(caminho, q) (q com forma EIXOS_NPC × INTENCOES).
+#
+# Uso: python servico_politica.py --checkpoint politica_npc.npcq --porta 8765
+#      python servico_politica.py --exportar politica_npc.npcq   (grava a política padrão)
+#      python servico_politica.py --bench 20000                  (carga local + latências)
+
+# 1. ESTADOS E INTENÇÕES DO NPC
+OUTRO = '<outro>'   # valor para qualquer coisa fora do vocabulário do eixo
+LIMITES_NIVEL = [10]
+
+INTENCOES = ['Oferecer_Missão_Fácil', 'Oferecer_Missão_Média', 'Saudação_Amigável',
+             'Dar_Dica_Local', 'Saudação_Padrão']
+INTENCAO_PADRAO = 'Saudação_Padrão'
+
+EIXOS_NPC = [
+    ('local', ['Praça', 'Museu', OUTRO]),
+    ('faixa_nivel', ['<10', '10+']),
+    ('historico', ['Novo', 'Veterano', OUTRO]),
+]
+# Campos que o estado do NPC traz (teste2.py: nome, local, nivel, historico)
+CAMPOS_ESTADO = ('local', 'nivel', 'historico')
+
+def faixa_nivel(nivel):
+    rotulos = EIXOS_NPC[1][1]
+    return rotulos[bisect.bisect_right(LIMITES_NIVEL, nivel)]
+
+# Como tirar o valor de cada eixo do estado (padrão: estado[nome_do_eixo])
+EXTRATORES = {
+    'faixa_nivel': lambda estado: faixa_nivel(estado['nivel']),
+}
+
+def regra_padrao(local, faixa, historico):
+    """A política que o AgenteRLTreinado trazia escrita em if/elif."""
+    if local == 'Praça' and historico == 'Novo':
+        return 'Oferecer_Missão_Fácil' if faixa == '<10' else 'Oferecer_Missão_Média'
+    if local == 'Praça' and historico == 'Veterano':
+        return 'Saudação_Amigável'
+    if local == 'Museu':
+        return 'Dar_Dica_Local'
+    return 'Saudação_Padrão'
+
+def tabela_padrao():
+    """Compila a regra numa Tabela Q (1 na intenção escolhida, 0 nas demais)."""
+    q = np.zeros(tuple(len(vocab) for _, vocab in EIXOS_NPC) + (len(INTENCOES),), dtype=np.float32)
+    for indices in np.ndindex(q.shape[:-1]):
+        valores = [vocab[i] for (_, vocab), i in zip(EIXOS_NPC, indices)]
+        q[indices + (INTENCOES.index(regra_padrao(*valores)),)] = 1.0
+    return q
+
+# 2. POLÍTICA (ARGMAX VETORIZADO)
+class Politica:
+    """
+    Política gulosa sobre uma Tabela Q com eixos nomeados. Estados com algum
+    valor desconhecido (e sem OUTRO no eixo) ou sem nada aprendido recebem a
+    intenção padrão.
+    """
+    def __init__(self, q, eixos, acoes, acao_padrao=INTENCAO_PADRAO, extratores=None, origem='padrão'):
+        self.eixos = [(nome, list(vocab)) for nome, vocab in eixos]
+        self.acoes = list(acoes)
+        self.origem = origem
+        self.extratores = EXTRATORES if extratores is None else extratores
+        sem_origem = [nome for nome, _ in self.eixos if nome not in self.extratores and nome not in CAMPOS_ESTADO]
+        if sem_origem:
+            raise ValueError(
+                f"Política '{origem}': eixos {[nome for nome, _ in self.eixos]} não batem com o estado do NPC "
+                f"({', '.join(sem_origem)} não é campo do estado {list(CAMPOS_ESTADO)} nem tem extrator). "
+                f"Esperado algo como {[nome for nome, _ in EIXOS_NPC]}; a tabela do artigo2.py "
+                f"(local × periodo) não é uma política de NPC")
+        self.indices = [{valor: i for i, valor in enumerate(vocab)} for _, vocab in self.eixos]
+        self.outros = [indice.get(OUTRO, -1) for indice in self.indices]
+        self.forma = tuple(len(vocab) for _, vocab in self.eixos)
+
+        # A política gulosa é pré-calculada: consultar é só indexar um array
+        q_plana = np.asarray(q).reshape(-1, len(self.acoes))
+        melhores = q_plana.argmax(axis=1)
+        padrao = self.acoes.index(acao_padrao) if acao_padrao in self.acoes else len(self.acoes) - 1
+        sem_dados = q_plana[np.arange(len(melhores)), melhores] == -np.inf
+        self.gulosa = np.append(np.where(sem_dados, padrao, melhores), padrao)  # último = estado inválido
+
+    @classmethod
+    def de_checkpoint(cls, caminho, **kwargs):
+        checkpoint = checkpoint_q.abrir_checkpoint(caminho)
+        acao_padrao = checkpoint.metadados.get('acao_padrao', INTENCAO_PADRAO)
+        return cls(checkpoint.q, checkpoint.eixos, checkpoint.acoes, acao_padrao, origem=caminho, **kwargs)
+
+    def codificar(self, estados):
+        """Estados (dicts) -> índice plano de cada um; len(gulosa)-1 marca estado inválido."""
+        colunas = []
+        for (nome, _), indice, outro in zip(self.eixos, self.indices, self.outros):
+            extrair = self.extratores.get(nome, lambda estado, nome=nome: estado[nome])
+            colunas.append(np.fromiter((indice.get(extrair(e), outro) for e in estados),
+                                       dtype=np.int64, count=len(estados)))
+        codigos = np.stack(colunas) if colunas else np.zeros((0, len(estados)), dtype=np.int64)
+        invalidos = (codigos < 0).any(axis=0)
+        planos = np.ravel_multi_index(np.maximum(codigos, 0), self.forma)
+        return np.where(invalidos, len(self.gulosa) - 1, planos)
+
+    def intencoes_codificadas(self, estados_planos):
+        return self.gulosa[estados_planos]
+
+    def get_intentions(self, estados):
+        return [self.acoes[a] for a in self.intencoes_codificadas(self.codificar(estados))]
+
+    def get_intention(self, estado):
+        return self.get_intentions([estado])[0]
+
+def carregar_politica(caminho=None):
+    """Política do checkpoint, ou a política padrão compilada se não houver arquivo."""
+    if caminho and os.path.exists(caminho):
+        return Politica.de_checkpoint(caminho)
+    return Politica(tabela_padrao(), EIXOS_NPC, INTENCOES)
+
+def exportar_politica(caminho, q, eixos=EIXOS_NPC, acoes=INTENCOES, origem='externa'):
+    """Grava uma Tabela Q de NPC (forma = eixos × ações) no formato que o serviço carrega."""
+    Politica(q, eixos, acoes, origem=origem)   # mesma validação dos eixos que a carga faz
+    checkpoint_q.salvar_checkpoint(caminho, q, eixos, acoes,
+                                   metadados={'acao_padrao': INTENCAO_PADRAO, 'origem': origem})
+
+def exportar_politica_padrao(caminho):
+    exportar_politica(caminho, tabela_padrao(), origem='regra_padrao')
+
+# 3. MÉTRICAS
+class EstatisticasLatencia:
+    """Latências dos últimos pedidos (janela fixa) e vazão desde o início."""
+    def __init__(self, janela=10000):
+        self.latencias = deque(maxlen=janela)
+        self.inicio = time.perf_counter()
+        self.pedidos = 0
+        self.estados = 0
+        self.lotes = 0
+
+    def registrar_lote(self, latencias, n_estados):
+        self.latencias.extend(latencias)
+        self.pedidos += len(latencias)
+        self.estados += n_estados
+        self.lotes += 1
+
+    def resumo(self):
+        duracao = time.perf_counter() - self.inicio
+        latencias = np.fromiter(self.latencias, dtype=np.float64) * 1000
+        p50, p99 = np.percentile(latencias, [50, 99]) if len(latencias) else (0.0, 0.0)
+        return {
+            'pedidos': self.pedidos, 'estados': self.estados,
+            'pedidos_por_lote': self.pedidos / max(self.lotes, 1),
+            'rps': self.pedidos / max(duracao, 1e-9),
+            'p50_ms': float(p50), 'p99_ms': float(p99),
+        }
+
+    def descrever(self):
+        r = self.resumo()
+        return (f"{r['pedidos']:,} pedidos | {r['rps']:,.0f} req/s | p50 {r['p50_ms']:.3f} ms | "
+                f"p99 {r['p99_ms']:.3f} ms | {r['pedidos_por_lote']:.1f} pedidos/lote")
+
+# 4. SERVIDOR ASYNCIO COM MICRO-BATCHING
+class ServicoPolitica:
+    def __init__(self, politica, lote_max=1024, espera_max=0.0005):
+        self.politica = politica
+        self.lote_max = lote_max
+        self.espera_max = espera_max
+        self.estatisticas = EstatisticasLatencia()
+        self.fila = None
+        self._agrupador = None
+
+    def iniciar(self):
+        self.fila = asyncio.Queue()
+        self._agrupador = asyncio.get_running_loop().create_task(self._agrupar())
+
+    async def parar(self):
+        if self._agrupador:
+            self._agrupador.cancel()
+            await asyncio.gather(self._agrupador, return_exceptions=True)
+
+    async def consultar(self, estados):
+        """Entra na fila do próximo lote e espera as intenções desses estados."""
+        futuro = asyncio.get_running_loop().create_future()
+        self.fila.put_nowait((estados, futuro, time.perf_counter()))
+        return await futuro
+
+    def _drenar(self, lote):
+        while len(lote) < self.lote_max and not self.fila.empty():
+            lote.append(self.fila.get_nowait())
+
+    async def _agrupar(self):
+        while True:
+            lote = [await self.fila.get()]
+            self._drenar(lote)
+            if len(lote) < self.lote_max and self.espera_max > 0:
+                await asyncio.sleep(self.espera_max)  # junta quem chegar nesse meio tempo
+                self._drenar(lote)
+
+            politica = self.politica  # referência fixa durante o lote (recarga atômica)
+            todos = [estado for estados, _, _ in lote for estado in estados]
+            try:
+                intencoes = politica.get_intentions(todos)
+            except Exception:
+                # Algum estado malformado: resolve um pedido de cada vez para isolar o erro
+                # (quem já desistiu, ex: cancelado por um wait_for, fica de fora)
+                for estados, futuro, _ in lote:
+                    if futuro.done():
+                        continue
+                    try:
+                        futuro.set_result(politica.get_intentions(estados))
+                    except Exception as e:
+                        futuro.set_exception(e)
+                continue
+
+            agora = time.perf_counter()
+            posicao = 0
+            for estados, futuro, _ in lote:
+                if not futuro.done():
+                    futuro.set_result(intencoes[posicao:posicao + len(estados)])
+                posicao += len(estados)
+            self.estatisticas.registrar_lote([agora - t0 for _, _, t0 in lote], len(todos))
+
+    async def recarregar(self, caminho):
+        """Carrega o novo checkpoint fora do laço de eventos e troca a política."""
+        nova = await asyncio.get_running_loop().run_in_executor(None, Politica.de_checkpoint, caminho)
+        self.politica = nova
+        print(f"[SERVIÇO] Política recarregada de '{caminho}'")
+        return nova
+
+    async def observar_checkpoint(self, caminho, intervalo=1.0):
+        """Recarrega sozinho quando o arquivo do checkpoint é substituído."""
+        assinatura = None
+        while True:
+            try:
+                info = os.stat(caminho)
+                atual = (info.st_ino, info.st_mtime_ns)
+                if assinatura is not None and atual != assinatura:
+                    await self.recarregar(caminho)
+                assinatura = atual
+            except (OSError, ValueError) as e:
+                print(f"[SERVIÇO] Falha ao recarregar '{caminho}': {e}")
+            await asyncio.sleep(intervalo)
+
+    async def _responder(self, pedido):
+        comando = pedido.get('comando')
+        if comando == 'estatisticas':
+            return {'estatisticas': self.estatisticas.resumo(), 'politica': self.politica.origem}
+        if comando == 'recarregar':
+            await self.recarregar(pedido['caminho'])
+            return {'ok': True}
+        if 'estados' in pedido:
+            return {'intencoes': await self.consultar(pedido['estados'])}
+        return {'intencao': (await self.consultar([pedido['estado']]))[0]}
+
+    async def _atender_pedido(self, linha, writer):
+        pedido = {}
+        try:
+            pedido = json.loads(linha)
+            resposta = await self._responder(pedido)
+        except Exception as e:
+            resposta = {'erro': f"{type(e).__name__}: {e}"}
+        resposta['id'] = pedido.get('id') if isinstance(pedido, dict) else None
+        if not writer.is_closing():
+            writer.write(json.dumps(resposta, ensure_ascii=False).encode('utf-8') + b'\n')
+
+    async def atender_conexao(self, reader, writer):
+        # Pedidos da mesma conexão são atendidos em paralelo (as respostas levam o 'id')
+        pendentes = set()
+        try:
+            while linha := await reader.readline():
+                tarefa = asyncio.create_task(self._atender_pedido(linha, writer))
+                pendentes.add(tarefa)
+                tarefa.add_done_callback(pendentes.discard)
+            await asyncio.gather(*pendentes)
+        finally:
+            writer.close()
+
+async def iniciar_servidor(servico, porta=None, socket_unix=None, host='127.0.0.1'):
+    servico.iniciar()
+    if socket_unix:
+        return await asyncio.start_unix_server(servico.atender_conexao, path=socket_unix)
+    return await asyncio.start_server(servico.atender_conexao, host, porta)
+
+# 5. CLIENTE E TESTE DE CARGA LOCAL
+class ClientePolitica:
+    def __init__(self, reader, writer):
+        self.reader, self.writer = reader, writer
+        self.proximo_id = 0
+        self.esperando = {}
+        self._leitor = asyncio.create_task(self._ler())
+
+    @classmethod
+    async def conectar(cls, porta=None, socket_unix=None, host='127.0.0.1'):
+        if socket_unix:
+            return cls(*await asyncio.open_unix_connection(socket_unix))
+        return cls(*await asyncio.open_connection(host, porta))
+
+    async def _ler(self):
+        try:
+            while linha := await self.reader.readline():
+                resposta = json.loads(linha)
+                futuro = self.esperando.pop(resposta['id'], None)
+                if futuro and not futuro.done():
+                    futuro.set_result(resposta)
+        finally:
+            # Conexão fechada (ou leitor cancelado): quem ainda espera resposta falha na hora
+            for futuro in self.esperando.values():
+                if not futuro.done():
+                    futuro.set_exception(ConnectionError("conexão com o servidor fechada"))
+            self.esperando.clear()
+
+    async def pedir(self, pedido):
+        if self._leitor.done():
+            raise ConnectionError("conexão com o servidor fechada")
+        self.proximo_id += 1
+        id_pedido = self.proximo_id
+        futuro = asyncio.get_running_loop().create_future()
+        self.esperando[id_pedido] = futuro
+        try:
+            self.writer.write(json.dumps(dict(pedido, id=id_pedido), ensure_ascii=False).encode('utf-8') + b'\n')
+            resposta = await futuro
+        finally:
+            self.esperando.pop(id_pedido, None)   # desistiu (timeout/cancelamento): não fica pendurado
+        if 'erro' in resposta:
+            raise RuntimeError(resposta['erro'])
+        return resposta
+
+    async def get_intention(self, estado):
+        return (await self.pedir({'estado': estado}))['intencao']
+
+    async def get_intentions(self, estados):
+        return (await self.pedir({'estados': estados}))['intencoes']
+
+    async def fechar(self):
+        self.writer.close()
+        self._leitor.cancel()
+        await asyncio.gather(self._leitor, return_exceptions=True)
+
+def estados_aleatorios(n, semente=0):
+    rng = np.random.default_rng(semente)
+    locais = ['Praça', 'Museu', 'Mercado', 'Taverna']
+    historicos = ['Novo', 'Veterano']
+    return [{'local': locais[l], 'nivel': int(v), 'historico': historicos[h]}
+            for l, v, h in zip(rng.integers(0, len(locais), n), rng.integers(1, 20, n), rng.integers(0, 2, n))]
+
+async def bench(servico, n_pedidos, conexoes=8, concorrencia=64, socket_unix=None):
+    """Sobe o servidor, dispara pedidos por várias conexões e imprime as métricas."""
+    servidor = await iniciar_servidor(servico, porta=0, socket_unix=socket_unix)
+    porta = None if socket_unix else servidor.sockets[0].getsockname()[1]
+    clientes = [await ClientePolitica.conectar(porta, socket_unix) for _ in range(conexoes)]
+    estados = estados_aleatorios(n_pedidos)
+    fatia = asyncio.Semaphore(concorrencia)
+
+    async def um_pedido(i):
+        async with fatia:
+            return await clientes[i % conexoes].get_intention(estados[i])
+
+    inicio = time.perf_counter()
+    respostas = await asyncio.gather(*(um_pedido(i) for i in range(n_pedidos)))
+    duracao = time.perf_counter() - inicio
+
+    esperado = servico.politica.get_intentions(estados)
+    print(f"Respostas corretas: {sum(a == b for a, b in zip(respostas, esperado))}/{n_pedidos}")
+    print(f"Cliente: {n_pedidos / duracao:,.0f} req/s (ida e volta pela rede local)")
+    print(f"Servidor: {servico.estatisticas.descrever()}")
+    for cliente in clientes:
+        await cliente.fechar()
+    servidor.close()
+    await servidor.wait_closed()
+    await servico.parar()
+
+async def servir(args):
+    servico = ServicoPolitica(carregar_politica(args.checkpoint), args.lote_max, args.espera_max / 1000)
+    servidor = await iniciar_servidor(servico, args.porta, args.socket)
+    print(f"[SERVIÇO] Política: {servico.politica.origem} | ouvindo em {args.socket or f'127.0.0.1:{args.porta}'}")
+    tarefas = []
+    if args.checkpoint:
+        tarefas.append(asyncio.create_task(servico.observar_checkpoint(args.checkpoint)))
+    try:
+        async with servidor:
+            while True:
+                await asyncio.sleep(args.relatorio)
+                print(f"[SERVIÇO] {servico.estatisticas.descrever()}")
+    finally:
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await servico.parar()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço de inferência da política do NPC (Tabela Q).")
+    parser.add_argument('--checkpoint', default=None, help="arquivo .npcq (sem ele: política padrão)")
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--socket', default=None, help="caminho de um socket Unix (em vez de TCP)")
+    parser.add_argument('--lote-max', type=int, default=1024)
+    parser.add_argument('--espera-max', type=float, default=0.5, help="espera máxima para juntar um lote (ms)")
+    parser.add_argument('--relatorio', type=float, default=10.0, help="intervalo entre relatórios (s)")
+    parser.add_argument('--exportar', default=None, help="grava a política padrão neste checkpoint e sai")
+    parser.add_argument('--bench', type=int, default=0, help="nº de pedidos do teste de carga local")
+    args = parser.parse_args()
+
+    if args.exportar:
+        exportar_politica_padrao(args.exportar)
+        print(f"Política padrão gravada em '{args.exportar}'")
+    elif args.bench:
+        servico = ServicoPolitica(carregar_politica(args.checkpoint), args.lote_max, args.espera_max / 1000)
+        asyncio.run(bench(servico, args.bench, socket_unix=args.socket))
+    else:
+        try:
+            asyncio.run(servir(args))
+        except KeyboardInterrupt:
+            pass
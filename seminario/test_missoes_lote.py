@@ -0,0 +1,42 @@
+import numpy as np
+
+from missoes_lote import GeradorMissoesLote, verificar_equivalencia
+import teste2
+from teste2 import GeradorMissoesCSP
+
+def test_mesmas_solucoes_que_o_csp():
+    assert verificar_equivalencia()
+
+def test_sorteio_uniforme_entre_as_solucoes():
+    # Todas as soluções do CSP devem sair com a mesma frequência (qui-quadrado folgado)
+    local, nivel, intencao, n = 'Praça', 6, 'Oferecer_Missão_Fácil', 60000
+    solucoes = sorted((s['local_alvo'], s['inimigo'], s['quantidade'])
+                      for s in GeradorMissoesCSP().solve_quests(local, nivel, intencao))
+    assert len(solucoes) > 1
+
+    lote = GeradorMissoesLote(semente=123)
+    missoes = lote.como_dicts(lote.gerar([local] * n, [nivel] * n, [intencao] * n))
+    sorteadas = [(m['local_alvo'], m['inimigo'], m['quantidade']) for m in missoes]
+    valores, contagens = np.unique(np.array(sorteadas, dtype=object).astype(str), axis=0, return_counts=True)
+    assert sorted(map(tuple, valores.tolist())) == sorted(tuple(map(str, s)) for s in solucoes)
+
+    esperado = n / len(solucoes)
+    qui2 = ((contagens - esperado) ** 2 / esperado).sum()
+    graus = len(solucoes) - 1
+    assert qui2 < graus + 5 * np.sqrt(2 * graus)   # ~5 desvios acima da média da qui-quadrado
+
+def test_mundo_alterado_refaz_o_que_foi_pre_calculado(monkeypatch):
+    local, nivel, intencao, n = 'Praça', 20, 'Oferecer_Missão_Fácil', 2000
+    csp, lote = GeradorMissoesCSP(), GeradorMissoesLote(semente=0)
+    inimigos = lambda: {m['inimigo'] for m in lote.como_dicts(lote.gerar([local] * n, [nivel] * n, [intencao] * n))}
+    assert all(s['inimigo'] != 'Troll' for s in csp.get_solutions({'local': local, 'nivel': nivel}, intencao))
+    assert 'Troll' not in inimigos()
+
+    monkeypatch.setitem(teste2.ENEMY_DB, 'Troll', (12, 400))
+    teste2.mundo_alterado()
+    try:
+        assert any(s['inimigo'] == 'Troll' for s in csp.get_solutions({'local': local, 'nivel': nivel}, intencao))
+        assert 'Troll' in inimigos()
+    finally:
+        monkeypatch.undo()
+        teste2.mundo_alterado()
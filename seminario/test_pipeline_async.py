@@ -0,0 +1,63 @@
+import asyncio
+
+from geofence import carregar_geofences, VENUES_DEMO
+from servico_politica import carregar_politica
+from pipeline_async import PipelineNPC, problema_no_evento
+
+def eventos_validos(n):
+    praca = VENUES_DEMO.iloc[0]
+    return [{'nome': f'Jogador{k}', 'lat': float(praca['latitude']), 'lon': float(praca['longitude']),
+             'nivel': 1 + k % 15, 'historico': 'Novo'} for k in range(n)]
+
+def rodar(eventos, politica=None, lote_max=64):
+    """Envia tudo antes de as etapas rodarem (um lote cheio por etapa) e devolve os encontros."""
+    async def principal():
+        pipeline = PipelineNPC(carregar_geofences(), politica or carregar_politica(),
+                               tamanho_fila=len(eventos), lote_max=lote_max)
+        await pipeline.iniciar()
+        encontros = [await pipeline.enviar(evento) for evento in eventos]
+        await pipeline.parar()
+        return pipeline, encontros
+    return asyncio.run(principal())
+
+def test_evento_malformado_nao_derruba_o_lote():
+    eventos = eventos_validos(64)
+    del eventos[10]['lat'], eventos[10]['lon']      # sem posição e sem local
+    eventos[20]['nivel'] = 'cinco'
+    del eventos[30]['historico']
+    pipeline, encontros = rodar(eventos)
+
+    ruins = {10, 20, 30}
+    for k, encontro in enumerate(encontros):
+        assert encontro.pronto.done()
+        if k in ruins:
+            assert encontro.erro.startswith('evento:') and encontro.plano is None
+        else:
+            assert encontro.erro is None
+            assert encontro.estado['local'] == 'Praça' and encontro.intencao and encontro.plano
+    assert pipeline.erros == len(ruins)
+    assert pipeline.concluidos == len(eventos)
+
+def test_falha_numa_etapa_marca_so_o_encontro_que_falhou():
+    class PoliticaFragil:
+        """Falha em qualquer lote que tenha o Jogador7 (um estado que o validador não pega)."""
+        def __init__(self):
+            self.politica = carregar_politica()
+        def get_intentions(self, estados):
+            if any(estado['nome'] == 'Jogador7' for estado in estados):
+                raise ValueError('estado quebrado')
+            return self.politica.get_intentions(estados)
+
+    pipeline, encontros = rodar(eventos_validos(64), PoliticaFragil())
+    assert encontros[7].erro == 'rl: ValueError: estado quebrado' and encontros[7].plano is None
+    assert all(e.erro is None and e.plano for k, e in enumerate(encontros) if k != 7)
+    assert pipeline.erros == 1
+
+def test_problema_no_evento():
+    valido = eventos_validos(1)[0]
+    assert problema_no_evento(valido) is None
+    assert problema_no_evento({'nome': 'J', 'local': 'Museu', 'nivel': 3, 'historico': 'Novo'}) is None
+    assert 'local (ou lat e lon)' in problema_no_evento({'nome': 'J', 'nivel': 3, 'historico': 'Novo'})
+    assert 'nivel' in problema_no_evento(dict(valido, nivel=True))
+    assert 'posição' in problema_no_evento(dict(valido, lat='40.7'))
+    assert problema_no_evento(['não', 'é', 'dict']).startswith('esperado um objeto')
@@ -0,0 +1,31 @@
+import asyncio
+
+from servico_politica import ServicoPolitica
+
+class PoliticaFalsa:
+    """Responde 'ok' por estado; um estado None é malformado."""
+    def get_intentions(self, estados):
+        if any(estado is None for estado in estados):
+            raise ValueError('estado malformado')
+        return ['ok'] * len(estados)
+
+def test_lote_com_erro_e_pedido_cancelado():
+    async def cenario():
+        servico = ServicoPolitica(PoliticaFalsa(), espera_max=0.01)
+        servico.iniciar()
+        try:
+            cancelado = asyncio.ensure_future(servico.consultar([{}]))
+            malformado = asyncio.ensure_future(servico.consultar([None]))
+            valido = asyncio.ensure_future(servico.consultar([{}, {}]))
+            await asyncio.sleep(0)
+            cancelado.cancel()   # desiste antes do lote ser resolvido
+            resultados = await asyncio.wait_for(asyncio.gather(malformado, valido, return_exceptions=True), 2)
+            # O agrupador continua vivo depois do lote com erro
+            depois = await asyncio.wait_for(servico.consultar([{}]), 2)
+            return resultados, depois
+        finally:
+            await servico.parar()
+
+    (erro, intencoes), depois = asyncio.run(cenario())
+    assert isinstance(erro, ValueError)
+    assert intencoes == ['ok', 'ok'] and depois == ['ok']
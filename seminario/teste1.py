@@ -1,6 +1,17 @@
 import random
 from collections import defaultdict
 
+# --- MEMÓRIA DE REPLAY ---
+# Em vez de aprender com cada (s, a, r, s') uma única vez, guarda as experiências
+# e reaprende com minibatches sorteados delas (prioritário = maior erro TD primeiro).
+# Desligada por padrão: a demonstração original não depende do NumPy nem da
+# pasta artigo/ (a memória é a de artigo/memoria_replay.py)
+USAR_REPLAY = False
+REPLAY_PRIORITARIO = True
+CAPACIDADE_REPLAY = 5000
+TAMANHO_REPLAY = 32     # experiências por minibatch
+REPLAY_A_CADA = 10      # um minibatch a cada N encontros
+
 # Codigo dividido em 3 partes:  
 # 1. Ambiente Simulado (mundo) 
 #   Criei um ambiente simulado que define os estados possíveis e, o mais importante, a função de 'recompensa' (get_reward) que o agente tentará maximizar.
@@ -128,13 +139,16 @@ class QLearningNPCAgent:
         q_values = self.q_table[state_key]
         return max(q_values, key=q_values.get)
 
-    def learn(self, state, action, reward, next_state):
+    def learn(self, state, action, reward, next_state, peso=1.0):
         """
         O coração do algoritmo. Atualiza a Tabela Q com base
         na experiência (s, a, r, s').
         
         A Fórmula do Q-Learning:
         Q(s,a) <- Q(s,a) + alpha * [recompensa + gamma * max(Q(s',a')) - Q(s,a)]
+
+        'peso' escala o passo (correção de importância do replay prioritário).
+        Retorna o erro TD (alvo - valor antigo).
         """
         state_key = self._get_state_key(state)
         next_state_key = self._get_state_key(next_state)
@@ -152,8 +166,9 @@ class QLearningNPCAgent:
         
         # 4. Atualizar o valor de Q(s,a)
         # O novo valor é o antigo "puxado" um pouco (alpha) na direção do alvo
-        new_q = current_q + self.alpha * (target_q - current_q)
+        new_q = current_q + self.alpha * peso * (target_q - current_q)
         self.q_table[state_key][action] = new_q
+        return target_q - current_q
 
     def print_q_table(self):
         """Exibe a Tabela Q aprendida."""
@@ -193,6 +208,21 @@ def run_simulation():
     
     print(f"Treinando o agente por {num_episodes} episódios (encontros)...")
 
+    # Memória de replay: os estados são guardados como códigos (índice do local, índice do histórico)
+    memoria = None
+    if USAR_REPLAY:
+        import caminho_artigo
+        from memoria_replay import MemoriaReplay
+        memoria = MemoriaReplay(CAPACIDADE_REPLAY, prioritaria=REPLAY_PRIORITARIO)
+        print(memoria.descrever())
+
+    def codificar(state):
+        location, history = state
+        return env.locations.index(location), env.player_history.index(history)
+
+    def decodificar(loc, hist):
+        return (env.locations[loc], env.player_history[hist])
+
     # 3. Loop de Treinamento
     for i in range(num_episodes):
         # Um jogador aparece em um local (estado s)
@@ -209,7 +239,18 @@ def run_simulation():
         next_state = env.get_random_state()
         
         # O agente aprende com essa experiência (s, a, r, s')
-        agent.learn(state, action, reward, next_state)
+        erro_td = agent.learn(state, action, reward, next_state)
+
+        # Guarda a experiência e, de tempos em tempos, reaprende com um minibatch delas
+        if memoria is not None:
+            memoria.adicionar(*codificar(state), env.actions.index(action), reward, *codificar(next_state), erro_td)
+            if (i + 1) % REPLAY_A_CADA == 0:
+                posicoes, lote, pesos = memoria.amostrar(TAMANHO_REPLAY)
+                erros = [agent.learn(decodificar(lote.loc[j], lote.per[j]), env.actions[lote.acao[j]],
+                                     float(lote.recompensa[j]), decodificar(lote.loc_prox[j], lote.per_prox[j]),
+                                     float(pesos[j]))
+                         for j in range(len(posicoes))]
+                memoria.atualizar_prioridades(posicoes, erros)
         
         if (i + 1) % 5000 == 0:
             print(f"Episódio {i+1}/{num_episodes} concluído.")
@@ -1,7 +1,18 @@
 import random
 import time
+import bisect
+from collections import OrderedDict
 from constraint import Problem, AllDifferentConstraint
 
+from servico_politica import carregar_politica
+from geofence import carregar_geofences
+from dialogos import carregar_roteiros, ARQUIVO_DIALOGOS
+
+# Tabela Q treinada (ver servico_politica.py); None ou arquivo ausente = política padrão
+CHECKPOINT_POLITICA = 'politica_npc.npcq'
+# Venues com as geofences (ver geofence.py); None ou arquivo ausente = geofences de exemplo
+ARQUIVO_GEOFENCES = 'locais_npc.csv'
+
 # O Agente RL recebe o estado (Praça, Nível 5, Novo) e, com base na sua política pré-treinada, decide que a melhor intenção é Oferecer_Missão_Fácil.
 # O sistema recebe a intenção 'Missão Fácil'. Ele usa o python-constraint para gerar uma missão que obedeça às regras. 
 # planejador recebe a intenção 'Missão Fácil' e os detalhes da missão do CSP. Ele então monta o roteiro de diálogo.
@@ -19,76 +30,96 @@ ENEMY_DB = {
 
 LOCATION_DB = ['Bosque Sombrio', 'Caverna Ecoante', 'Ruínas Antigas', 'Torre do Mago']
 
+QUANTIDADES = range(3, 11) # De 3 a 10 inimigos
+
+# Versão dos bancos do mundo: quem pré-calcula algo a partir deles guarda a
+# versão e refaz quando ela muda. Comparar um inteiro não custa nada no caminho
+# quente (ao contrário de refazer um hash dos bancos a cada encontro).
+_VERSAO_MUNDO = 0
+
+def mundo_alterado():
+    """Chame depois de mudar ENEMY_DB ou LOCATION_DB: invalida o que foi pré-calculado."""
+    global _VERSAO_MUNDO
+    _VERSAO_MUNDO += 1
+
+def versao_mundo():
+    return _VERSAO_MUNDO
+
 # CAMADA 1: AGENTE RL (O DECISOR DE INTENÇÃO)
 class AgenteRLTreinado:
     """
-    Simula um agente de Q-Learning JÁ TREINADO.
-    Em vez de uma Tabela Q, se mostra a *política* resultante
-    (o melhor 'Q' para cada estado).
+    Agente de Q-Learning JÁ TREINADO: consulta a política (o melhor 'Q' para
+    cada estado) de uma Tabela Q salva em checkpoint. Sem checkpoint, usa a
+    política padrão compilada em tabela (ver servico_politica.regra_padrao).
     """
     
+    def __init__(self, caminho_checkpoint=CHECKPOINT_POLITICA):
+        self.politica = carregar_politica(caminho_checkpoint)
+    
     def get_intention(self, state):
         """Recebe o estado e retorna a melhor intenção."""
         print(f"[CAMADA 1: RL] Estado recebido: {state}")
-        
-        local = state['local']
-        nivel = state['nivel']
-        historico = state['historico']
-        
-        # --- Regras aprendidas pelo RL (Política) ---
-        if local == 'Praça' and historico == 'Novo' and nivel < 10:
-            # A Tabela Q aprendeu que esta é a melhor ação
-            return 'Oferecer_Missão_Fácil'
-        
-        elif local == 'Praça' and historico == 'Novo' and nivel >= 10:
-            return 'Oferecer_Missão_Média'
-
-        elif local == 'Praça' and historico == 'Veterano':
-            # Já fez missões, só saudar
-            return 'Saudação_Amigável'
-            
-        elif local == 'Museu':
-            # RL aprendeu que no Museu, dar dicas é melhor
-            return 'Dar_Dica_Local'
-            
-        else:
-            return 'Saudação_Padrão'
+        return self.politica.get_intention(state)
+
+    def get_intentions(self, states):
+        """Vários estados de uma vez (um único argmax vetorizado)."""
+        return self.politica.get_intentions(states)
 
 # CAMADA 2: GERADOR DE MISSÕES (CSP)
 class GeradorMissoesCSP:
     """
     Usa a biblioteca 'constraint' para gerar dinamicamente
     o conteúdo da missão, garantindo que seja coerente.
+
+    As missões válidas só dependem de (local atual, faixa de nível, intenção)
+    e dos bancos do mundo (ENEMY_DB, LOCATION_DB). Cada chave é resolvida uma
+    vez (todas as soluções), guardada num cache LRU e sorteada a cada encontro;
+    depois de mudar os bancos do mundo, mundo_alterado() invalida o cache.
     """
     
-    def generate_quest(self, state, intention):
-        """Gera uma missão válida com base nas restrições."""
-        print("\n[CAMADA 2: CSP] Gerador de Missões ativado.")
-        
-        if not 'Missão' in intention:
-            print("[CAMADA 2: CSP] Intenção não requer geração de missão.")
-            return None
+    def __init__(self, tamanho_cache=1024, semente=None):
+        self.tamanho_cache = tamanho_cache
+        self.rng = random.Random(semente)
+        self.cache = OrderedDict()   # chave -> tupla com todas as soluções
+        self.acertos = 0
+        self.faltas = 0
+        self._versao = None
+        self._niveis = []
+
+    def invalidar(self):
+        """Esvazia o cache (chamado sozinho na próxima consulta depois de mundo_alterado())."""
+        self.cache.clear()
+        self._versao = versao_mundo()
+        self._niveis = sorted({nivel for nivel, _ in ENEMY_DB.values()})
+
+    def faixa_nivel(self, player_level):
+        """
+        Níveis que liberam os mesmos inimigos caem na mesma faixa: quantos
+        níveis do ENEMY_DB ficam até nível+1 e até nível+4 (os limites das
+        restrições de missão fácil e média).
+        """
+        return (bisect.bisect_right(self._niveis, player_level + 1),
+                bisect.bisect_right(self._niveis, player_level + 4))
 
+    def solve_quests(self, current_local, player_level, intention):
+        """Resolve o CSP e retorna TODAS as missões válidas (já com a recompensa)."""
         # 1. Definir o problema
         problem = Problem()
         
         # 2. Definir Variáveis e Domínios
         problem.addVariable("local_alvo", [loc for loc in LOCATION_DB])
         problem.addVariable("inimigo", [enemy for enemy in ENEMY_DB.keys()])
-        problem.addVariable("quantidade", range(3, 11)) # De 3 a 10 inimigos
+        problem.addVariable("quantidade", QUANTIDADES)
         
         # 3. Definir Restrições
         
         # Restrição 1: O local da missão NÃO PODE ser o local atual.
-        current_local = state['local']
         problem.addConstraint(
             lambda local: local != current_local,
             ["local_alvo"]
         )
 
         # Restrição 2: O nível do inimigo deve ser compatível.
-        player_level = state['nivel']
-        
         if intention == 'Oferecer_Missão_Fácil':
             # Missão fácil: inimigo com nível <= nível do jogador + 1
             problem.addConstraint(
@@ -109,17 +140,44 @@ class GeradorMissoesCSP:
             ["local_alvo", "inimigo"]
         )
 
-        # 4. Encontrar uma solução
-        solution = problem.getSolution()
+        # 4. Encontrar todas as soluções e calcular a Recompensa (fora do CSP, mas baseado nele)
+        solutions = problem.getSolutions()
+        for solution in solutions:
+            solution['recompensa'] = ENEMY_DB[solution['inimigo']][1] * solution['quantidade']
+        return tuple(solutions)
+
+    def get_solutions(self, state, intention):
+        """Missões válidas para o estado, do cache ou resolvendo o CSP (uma vez por chave)."""
+        if _VERSAO_MUNDO != self._versao:
+            self.invalidar()
+        chave = (state['local'], self.faixa_nivel(state['nivel']), intention)
+        solutions = self.cache.get(chave)
+        if solutions is not None:
+            self.acertos += 1
+            self.cache.move_to_end(chave)
+            return solutions
+        self.faltas += 1
+        solutions = self.solve_quests(state['local'], state['nivel'], intention)
+        self.cache[chave] = solutions
+        if len(self.cache) > self.tamanho_cache:
+            self.cache.popitem(last=False)   # descarta a chave usada há mais tempo
+        return solutions
+    
+    def generate_quest(self, state, intention):
+        """Gera uma missão válida com base nas restrições."""
+        print("\n[CAMADA 2: CSP] Gerador de Missões ativado.")
         
-        if not solution:
+        if not 'Missão' in intention:
+            print("[CAMADA 2: CSP] Intenção não requer geração de missão.")
+            return None
+
+        solutions = self.get_solutions(state, intention)
+        if not solutions:
             print("[CAMADA 2: CSP] Não foi possível gerar uma missão com as restrições.")
             return None
-            
-        # 5. Calcular a Recompensa (fora do CSP, mas baseado nele)
-        base_reward = ENEMY_DB[solution['inimigo']][1]
-        solution['recompensa'] = base_reward * solution['quantidade']
-        
+
+        # Sorteio entre as soluções: jogadores no mesmo lugar não recebem todos a mesma missão
+        solution = dict(self.rng.choice(solutions))
         print(f"[CAMADA 2: CSP] Missão gerada: {solution}")
         return solution
 
@@ -128,42 +186,23 @@ class PlanejadorDialogo:
     """
     Seleciona um "plano" de diálogo (um roteiro)
     com base na intenção do RL e nos dados do CSP.
+    Os roteiros de cada intenção vêm de um arquivo de dados (ver dialogos.py).
     """
     
+    def __init__(self, arquivo_dialogos=ARQUIVO_DIALOGOS):
+        self.roteiros = carregar_roteiros(arquivo_dialogos)
+    
     def get_dialogue_plan(self, intention, quest, state):
         """Retorna uma lista de falas (o plano de diálogo)."""
         print("\n[CAMADA 3: PLANO] Gerando roteiro de diálogo...")
-        plan = []
-
-        if intention == 'Oferecer_Missão_Fácil':
-            plan.append(f"Olá, aventureiro! Bem-vindo à {state['local']}.")
-            plan.append(f"Vejo que você é novo por aqui... Sabe, o {quest['local_alvo']} está infestado de {quest['inimigo']}s ultimamente.")
-            plan.append(f"Eu preciso que alguém derrote {quest['quantidade']} deles.")
-            plan.append(f"Se você fizer isso por mim, eu te darei {quest['recompensa']}g de ouro!")
-            plan.append("(Você aceita a missão? [S/N])")
-            
-        elif intention == 'Oferecer_Missão_Média':
-            plan.append(f"Ah, {state['nome']}! Que bom te ver.")
-            plan.append(f"Você já provou seu valor, então tenho um desafio maior.")
-            plan.append(f"O {quest['local_alvo']} está sendo dominado por {quest['inimigo']}s.")
-            plan.append(f"É perigoso, mas a recompensa é alta: {quest['recompensa']}g para derrotar {quest['quantidade']} deles.")
-            plan.append("(Você encara o desafio? [S/N])")
-            
-        elif intention == 'Dar_Dica_Local':
-            plan.append(f"Bem-vindo ao {state['local']}, {state['nome']}.")
-            plan.append("Você sabia? Dizem que este museu foi construído sobre as ruínas de uma antiga civilização.")
-            plan.append("Muitos exploradores vêm aqui buscar pistas...")
-
-        elif intention == 'Saudação_Amigável':
-            plan.append(f"E aí, {state['nome']}! Bom te ver de novo.")
-            plan.append("Os negócios estão parados... nenhuma missão por agora.")
-
-        else: # Saudação_Padrão
-            plan.append("Olá. O dia está calmo.")
-            
+        plan = self.roteiros.render_plan(intention, quest, state)
         print("[CAMADA 3: PLANO] Roteiro de diálogo criado.")
         return plan
 
+    def get_dialogue_plans(self, encounters):
+        """Vários encontros (intenção, missão, estado) de uma vez."""
+        return self.roteiros.render_plans(encounters)
+
 # FUNÇÃO PRINCIPAL: SIMULAÇÃO DO EVENTO
 def run_demo():
     
@@ -174,14 +213,29 @@ def run_demo():
     gerador_csp = GeradorMissoesCSP()
     planejador = PlanejadorDialogo()
     
-    # 2. O EVENTO: Jogador entra na Geofence
-    current_state = {
+    geofences = carregar_geofences(ARQUIVO_GEOFENCES)
+    
+    # 2. O EVENTO: chega a posição GPS do jogador; a geofence em que ele está dá o 'local'
+    evento = {
         'nome': 'JogadorX',
-        'local': 'Praça',
+        'lat': 40.73095,
+        'lon': -73.99710,
         'nivel': 5,
         'historico': 'Novo'
     }
-    print(f"\nEVENTO: {current_state['nome']} (Nível {current_state['nivel']}) entrou na '{current_state['local']}'.")
+    geofence = geofences.resolver_um(evento['lat'], evento['lon'])
+    current_state = {
+        'nome': evento['nome'],
+        'local': geofence['local'],
+        'nivel': evento['nivel'],
+        'historico': evento['historico']
+    }
+    if geofence['venue'] is None:
+        print(f"\nEVENTO: posição ({evento['lat']:.5f}, {evento['lon']:.5f}) fora de qualquer geofence.")
+    else:
+        print(f"\nEVENTO: posição ({evento['lat']:.5f}, {evento['lon']:.5f}) -> venue '{geofence['venue']}' "
+              f"({geofence['categoria']}, a {geofence['distancia_m']:.0f} m)")
+    print(f"EVENTO: {current_state['nome']} (Nível {current_state['nivel']}) entrou na '{current_state['local']}'.")
     print("-" * 60)
     time.sleep(1) # Pausa para leitura
        
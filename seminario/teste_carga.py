@@ -0,0 +1,344 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+from datetime import datetime, timezone
+import numpy as np
+
+from servico_politica import ClientePolitica, carregar_politica, OUTRO
+from geofence import carregar_geofences
+from pipeline_async import PipelineNPC, resposta_do_encontro, ETAPAS
+from teste2 import CHECKPOINT_POLITICA, ARQUIVO_GEOFENCES
+
+# TESTE DE CARGA DA ARQUITETURA DE 3 CAMADAS (RL + CSP + DIÁLOGO)
+# Quantos encontros por segundo a pilha aguenta, e onde ela satura:
+#   1. eventos de jogadores sintéticos, com mix configurável de local (Praça,
+#      Museu, OUTRO: a posição GPS cai dentro de uma geofence desse tipo),
+#      faixa de nível e histórico (Novo/Veterano)
+#   2. chegadas em malha aberta (não esperam a resposta anterior) a uma taxa
+#      constante, Poisson ou em rajadas (Poisson com taxa alta numa fração de
+#      cada período e baixa no resto, mantendo a média)
+#   3. os eventos passam pelo pipeline_async.py no próprio processo ou por um
+#      servidor local (pipeline_async.py --porta), via JSON por linha
+#   4. para cada taxa: vazão, latência p50/p95/p99 por camada (espera na fila +
+#      processamento) e de ponta a ponta, taxa de falha do CSP (missão pedida
+#      e sem solução) e atraso no envio (o próprio gerador ficou para trás)
+# Os resultados vão para um JSON (configuração, ambiente e uma rodada por
+# taxa), e --comparar mostra a diferença entre dois arquivos.
+#
+# Uso: python teste_carga.py --taxas 1000,5000,20000 --duracao 5 --saida carga.json
+#      python teste_carga.py --chegada rajadas --mix-local "Praça=0.6,Museu=0.2,OUTRO=0.2"
+#      python teste_carga.py --porta 8766        (com um 'pipeline_async.py --porta 8766' no ar)
+#      python teste_carga.py --comparar antes.json depois.json
+
+VERSAO_RESULTADO = 1
+MIX_LOCAL = 'Praça=0.4,Museu=0.2,OUTRO=0.4'
+MIX_NIVEL = '1-9=0.7,10-20=0.3'
+MIX_HISTORICO = 'Novo=0.5,Veterano=0.5'
+PERCENTIS = (50, 95, 99)
+TIMEOUT_PEDIDO_S = 10.0   # servidor: resposta que não chega nesse tempo conta como falha
+
+# 1. EVENTOS SINTÉTICOS
+def ler_mix(texto):
+    """'Praça=0.6,Museu=0.4' -> (valores, probabilidades que somam 1)."""
+    valores, pesos = [], []
+    for item in texto.split(','):
+        valor, _, peso = item.strip().rpartition('=')
+        if not valor:
+            raise ValueError(f"Mix inválido: '{texto}' (esperado valor=peso,...)")
+        valores.append(valor)
+        pesos.append(float(peso))
+    pesos = np.array(pesos)
+    if (pesos < 0).any() or pesos.sum() <= 0:
+        raise ValueError(f"Mix inválido: '{texto}' (pesos devem ser >= 0 e não todos zero)")
+    return valores, pesos / pesos.sum()
+
+def ler_faixas(valores):
+    faixas = []
+    for valor in valores:
+        inicio, _, fim = valor.partition('-')
+        faixas.append((int(inicio), int(fim or inicio)))
+    return faixas
+
+def gerar_eventos(geofences, n, mix_local, mix_nivel, mix_historico, n_jogadores, rng):
+    """
+    n eventos de n_jogadores jogadores (nível e histórico fixos por jogador).
+    Um local sem nenhuma geofence desse tipo vai direto no evento, sem posição.
+    """
+    faixas = ler_faixas(mix_nivel[0])
+    faixa = rng.choice(len(faixas), n_jogadores, p=mix_nivel[1])
+    inicios = np.array([a for a, _ in faixas])[faixa]
+    fins = np.array([b for _, b in faixas])[faixa]
+    niveis = rng.integers(inicios, fins + 1)
+    historicos = np.array(mix_historico[0], dtype=object)[rng.choice(len(mix_historico[0]), n_jogadores,
+                                                                      p=mix_historico[1])]
+
+    jogador = rng.integers(0, n_jogadores, n)
+    locais = [OUTRO if local == 'OUTRO' else local for local in mix_local[0]]
+    local_do_evento = rng.choice(len(locais), n, p=mix_local[1])
+    # Posição uniforme no disco de meio raio em volta de um venue do tipo pedido
+    raio = np.sqrt(rng.random(n)) * 0.5
+    angulo = rng.random(n) * 2 * np.pi
+    lat = np.full(n, np.nan)
+    lon = np.full(n, np.nan)
+    for i, local in enumerate(locais):
+        candidatos = np.flatnonzero(geofences.locais_venues == local) if len(geofences) else np.array([], int)
+        eventos_local = np.flatnonzero(local_do_evento == i)
+        if len(candidatos) == 0 or len(eventos_local) == 0:
+            continue
+        venue = candidatos[rng.integers(0, len(candidatos), len(eventos_local))]
+        distancia = raio[eventos_local] * geofences.raios[venue]
+        lat[eventos_local] = geofences.lat[venue] + distancia * np.sin(angulo[eventos_local]) / geofences.grade.m_por_grau_lat
+        lon[eventos_local] = geofences.lon[venue] + distancia * np.cos(angulo[eventos_local]) / geofences.grade.m_por_grau_lon
+
+    eventos = []
+    for k in range(n):
+        j = int(jogador[k])
+        evento = {'nome': f'Jogador{j}', 'nivel': int(niveis[j]), 'historico': historicos[j]}
+        if np.isnan(lat[k]):
+            evento['local'] = locais[local_do_evento[k]]
+        else:
+            evento['lat'], evento['lon'] = float(lat[k]), float(lon[k])
+        eventos.append(evento)
+    return eventos
+
+# 2. PROCESSOS DE CHEGADA
+def tempos_de_chegada(processo, taxa, duracao, rng, fator_rajada=4.0, periodo_rajada=1.0, fracao_rajada=0.2):
+    """Instantes de chegada (s desde o início) em [0, duracao), com média de 'taxa' eventos/s."""
+    if processo == 'constante':
+        return np.arange(0, duracao, 1 / taxa)
+    if processo == 'poisson':
+        return np.sort(rng.uniform(0, duracao, rng.poisson(taxa * duracao)))
+    if processo == 'rajadas':
+        # Taxa fator*taxa na rajada e o que sobra fora dela (a média continua 'taxa')
+        if fator_rajada * fracao_rajada > 1:
+            raise ValueError("fator_rajada * fracao_rajada deve ser <= 1 (senão a média passa da taxa)")
+        pico = fator_rajada * taxa
+        fora = taxa * (1 - fator_rajada * fracao_rajada) / (1 - fracao_rajada)
+        # Poisson no pico e afinamento: cada chegada fica com prob. taxa(t) / pico
+        candidatos = np.sort(rng.uniform(0, duracao, rng.poisson(pico * duracao)))
+        na_rajada = (candidatos % periodo_rajada) < fracao_rajada * periodo_rajada
+        manter = na_rajada | (rng.random(len(candidatos)) < fora / pico)
+        return candidatos[manter]
+    raise ValueError(f"Processo de chegada desconhecido: {processo}")
+
+# 3. EXECUÇÃO (NO PROCESSO OU CONTRA O SERVIDOR)
+async def disparar(eventos, chegadas, enviar):
+    """
+    Malha aberta: cada evento é disparado no seu instante, sem esperar os
+    anteriores. Retorna (resultados, atrasos de envio em s, duração em s).
+    """
+    inicio = time.perf_counter()
+    atrasos = np.zeros(len(eventos))
+    tarefas = []
+    for i, (evento, instante) in enumerate(zip(eventos, chegadas)):
+        espera = inicio + instante - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+        elif i % 64 == 0:
+            await asyncio.sleep(0)   # atrasado: ainda assim deixa o pipeline andar
+        atrasos[i] = max(0.0, time.perf_counter() - inicio - instante)
+        tarefas.append(asyncio.create_task(enviar(evento)))
+    resultados = await asyncio.gather(*tarefas)
+    return resultados, atrasos, time.perf_counter() - inicio
+
+async def rodar_no_processo(args, geofences, politica, eventos, chegadas):
+    pipeline = PipelineNPC(geofences, politica, args.tamanho_fila, args.lote_max, args.processos, args.semente)
+    await pipeline.iniciar()
+
+    async def enviar(evento):
+        inicio = time.perf_counter()
+        encontro = await pipeline.enviar(evento)
+        resposta = resposta_do_encontro(await encontro.pronto)
+        resposta['latencias_ms']['cliente'] = (time.perf_counter() - inicio) * 1000
+        return resposta
+
+    try:
+        return await disparar(eventos, chegadas, enviar)
+    finally:
+        await pipeline.parar()
+
+async def rodar_no_servidor(args, eventos, chegadas):
+    # O cliente JSON por linha do serviço de política serve para qualquer pedido {"id": ...}
+    clientes = [await ClientePolitica.conectar(args.porta, args.socket) for _ in range(args.conexoes)]
+    contador = iter(range(len(eventos)))
+
+    async def enviar(evento):
+        inicio = time.perf_counter()
+        cliente = clientes[next(contador) % len(clientes)]
+        try:
+            resposta = await asyncio.wait_for(cliente.pedir({'evento': evento}), args.timeout)
+        except asyncio.TimeoutError:
+            resposta = {'falha': f"sem resposta em {args.timeout:g}s", 'timeout': True,
+                        'intencao': None, 'missao': None, 'latencias_ms': {}}
+        except (RuntimeError, ConnectionError) as e:
+            resposta = {'falha': str(e) or type(e).__name__, 'intencao': None, 'missao': None, 'latencias_ms': {}}
+        resposta['latencias_ms']['cliente'] = (time.perf_counter() - inicio) * 1000
+        return resposta
+
+    try:
+        return await disparar(eventos, chegadas, enviar)
+    finally:
+        for cliente in clientes:
+            await cliente.fechar()
+
+# 4. RELATÓRIO
+def percentis(valores):
+    if not len(valores):
+        return None
+    p = np.percentile(valores, PERCENTIS)
+    return {**{f'p{q}': float(v) for q, v in zip(PERCENTIS, p)},
+            'media': float(np.mean(valores)), 'max': float(np.max(valores))}
+
+def resumir(taxa, taxa_oferecida, resultados, atrasos, duracao, slo_ms):
+    camadas = ETAPAS + ('total', 'cliente')
+    latencias = {c: percentis([r['latencias_ms'][c] for r in resultados if c in r['latencias_ms']])
+                 for c in camadas}
+    com_falha = sum(1 for r in resultados if r.get('falha'))
+    timeouts = sum(1 for r in resultados if r.get('timeout'))
+    pediram = [r for r in resultados if not r.get('falha') and r['intencao'] and 'Missão' in r['intencao']]
+    sem_missao = sum(1 for r in pediram if r['missao'] is None)
+    locais, contagens = np.unique([str(r.get('local')) for r in resultados], return_counts=True)
+    rodada = {
+        'taxa_alvo': taxa,
+        'eventos': len(resultados),
+        'duracao_s': duracao,
+        'vazao': (len(resultados) - com_falha) / duracao if duracao else 0.0,   # só respostas sem falha
+        'taxa_oferecida': taxa_oferecida,
+        'latencias_ms': latencias,
+        'missoes_pedidas': len(pediram),
+        'falha_csp': sem_missao / len(pediram) if pediram else 0.0,
+        'falhas_pipeline': com_falha,
+        'timeouts': timeouts,
+        'atraso_envio_ms': percentis(atrasos * 1000),
+        'locais': {l: int(c) for l, c in zip(locais, contagens)},
+    }
+    p99 = (latencias['cliente'] or {}).get('p99', 0.0)
+    # Saturou: não deu vazão à taxa oferecida, o gerador ficou para trás ou a cauda passou do limite
+    rodada['saturou'] = bool(rodada['vazao'] < 0.9 * taxa_oferecida or p99 > slo_ms
+                             or (rodada['atraso_envio_ms'] or {}).get('p99', 0.0) > slo_ms)
+    return rodada
+
+def descrever_rodada(rodada):
+    linhas = [f"--- Taxa alvo {rodada['taxa_alvo']:,.0f}/s: {rodada['eventos']:,} eventos em "
+              f"{rodada['duracao_s']:.2f}s (oferecidos {rodada['taxa_oferecida']:,.0f}/s) -> "
+              f"{rodada['vazao']:,.0f} encontros/s"
+              f"{' (SATUROU)' if rodada['saturou'] else ''} ---",
+              f"   {'camada':<9} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}  (ms)"]
+    for camada, p in rodada['latencias_ms'].items():
+        if p:
+            linhas.append(f"   {camada:<9} {p['p50']:>9.3f} {p['p95']:>9.3f} {p['p99']:>9.3f} {p['max']:>9.3f}")
+    atraso = rodada['atraso_envio_ms'] or {'p99': 0.0}
+    linhas.append(f"   CSP: {rodada['falha_csp']:.1%} das {rodada['missoes_pedidas']:,} missões pedidas sem solução"
+                  f" | falhas no pipeline: {rodada['falhas_pipeline']:,}"
+                  f" ({rodada.get('timeouts', 0):,} sem resposta) | atraso de envio p99: {atraso['p99']:.1f} ms")
+    linhas.append("   locais: " + ", ".join(f"{l}={c:,}" for l, c in rodada['locais'].items()))
+    return '\n'.join(linhas)
+
+def comparar(caminho_a, caminho_b):
+    """Diferença entre dois arquivos de resultado, rodada a rodada (mesma taxa alvo)."""
+    with open(caminho_a, encoding='utf-8') as f:
+        a = json.load(f)
+    with open(caminho_b, encoding='utf-8') as f:
+        b = json.load(f)
+    por_taxa = {r['taxa_alvo']: r for r in a['rodadas']}
+    print(f"A: {caminho_a} ({a['criado_em']})\nB: {caminho_b} ({b['criado_em']})")
+    diferentes = [k for k in sorted(set(a['configuracao']) | set(b['configuracao']))
+                  if a['configuracao'].get(k) != b['configuracao'].get(k) and k != 'taxas']
+    if diferentes:
+        print("Configuração diferente: " + ", ".join(
+            f"{k}: {a['configuracao'].get(k)} -> {b['configuracao'].get(k)}" for k in diferentes))
+    if a['ambiente'] != b['ambiente']:
+        print(f"Ambiente diferente: {a['ambiente']} -> {b['ambiente']}")
+    for rodada in b['rodadas']:
+        anterior = por_taxa.get(rodada['taxa_alvo'])
+        if anterior is None:
+            continue
+        print(f"--- Taxa alvo {rodada['taxa_alvo']:,.0f}/s ---")
+        metricas = [('vazão (enc/s)', anterior['vazao'], rodada['vazao']),
+                    ('falha CSP (%)', anterior['falha_csp'] * 100, rodada['falha_csp'] * 100)]
+        for camada in ETAPAS + ('total', 'cliente'):
+            pa, pb = anterior['latencias_ms'].get(camada), rodada['latencias_ms'].get(camada)
+            if pa and pb:
+                metricas.append((f'{camada} p99 (ms)', pa['p99'], pb['p99']))
+        for nome, va, vb in metricas:
+            variacao = f"{(vb - va) / va * 100:+.1f}%" if va else "-"
+            print(f"   {nome:<20} {va:>12.3f} -> {vb:>12.3f}  ({variacao})")
+
+async def principal(args):
+    geofences = carregar_geofences(args.geofences)
+    politica = carregar_politica(args.checkpoint)
+    mixes = ler_mix(args.mix_local), ler_mix(args.mix_nivel), ler_mix(args.mix_historico)
+    destino = args.socket or (f'127.0.0.1:{args.porta}' if args.porta else 'no processo')
+    print(f"--- TESTE DE CARGA ({destino}, chegada {args.chegada}, {args.duracao}s por taxa) ---")
+
+    rodadas = []
+    for i, taxa in enumerate(args.taxas):
+        rng = np.random.default_rng((args.semente, i))
+        chegadas = tempos_de_chegada(args.chegada, taxa, args.duracao, rng, args.fator_rajada,
+                                     args.periodo_rajada, args.fracao_rajada)
+        eventos = gerar_eventos(geofences, len(chegadas), *mixes, args.jogadores, rng)
+        if args.porta or args.socket:
+            resultados, atrasos, duracao = await rodar_no_servidor(args, eventos, chegadas)
+        else:
+            resultados, atrasos, duracao = await rodar_no_processo(args, geofences, politica, eventos, chegadas)
+        rodada = resumir(taxa, len(chegadas) / args.duracao, resultados, atrasos, duracao, args.slo_ms)
+        rodadas.append(rodada)
+        print(descrever_rodada(rodada))
+
+    sustentadas = [r['vazao'] for r in rodadas if not r['saturou']]
+    if sustentadas:
+        print(f"\nMaior vazão sem saturar (p99 <= {args.slo_ms:g} ms): {max(sustentadas):,.0f} encontros/s")
+    else:
+        print(f"\nTodas as taxas saturaram (p99 > {args.slo_ms:g} ms ou gerador atrasado)")
+
+    if args.saida:
+        resultado = {
+            'versao': VERSAO_RESULTADO,
+            'criado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform(),
+                         'cpus': os.cpu_count()},
+            'configuracao': {k: v for k, v in vars(args).items() if k not in ('saida', 'comparar')},
+            'rodadas': rodadas,
+        }
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"Resultado gravado em '{args.saida}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da arquitetura RL + CSP + diálogo do NPC.")
+    parser.add_argument('--taxas', type=lambda t: [float(x) for x in t.split(',')], default=[1000, 5000, 20000],
+                        help="taxas alvo em eventos/s, uma rodada por taxa (ex: 1000,5000,20000)")
+    parser.add_argument('--duracao', type=float, default=5.0, help="segundos de carga por taxa")
+    parser.add_argument('--chegada', choices=['constante', 'poisson', 'rajadas'], default='poisson')
+    parser.add_argument('--fator-rajada', type=float, default=4.0, help="taxa na rajada / taxa média")
+    parser.add_argument('--periodo-rajada', type=float, default=1.0, help="s entre o início de duas rajadas")
+    parser.add_argument('--fracao-rajada', type=float, default=0.2, help="fração do período em rajada")
+    parser.add_argument('--mix-local', default=MIX_LOCAL)
+    parser.add_argument('--mix-nivel', default=MIX_NIVEL, help="faixas de nível com pesos (ex: 1-9=0.7,10-20=0.3)")
+    parser.add_argument('--mix-historico', default=MIX_HISTORICO)
+    parser.add_argument('--jogadores', type=int, default=10000, help="jogadores distintos que geram os eventos")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--slo-ms', type=float, default=250.0, help="p99 acima disso conta como saturado")
+    parser.add_argument('--processos', type=int, default=0, help="pool do pipeline no processo (0 = thread)")
+    parser.add_argument('--tamanho-fila', type=int, default=1024)
+    parser.add_argument('--lote-max', type=int, default=256)
+    parser.add_argument('--porta', type=int, default=None, help="servidor do pipeline_async.py (TCP local)")
+    parser.add_argument('--socket', default=None, help="servidor do pipeline_async.py (socket Unix)")
+    parser.add_argument('--conexoes', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_PEDIDO_S,
+                        help="s de espera por resposta do servidor (depois disso o pedido conta como falha)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_POLITICA)
+    parser.add_argument('--geofences', default=ARQUIVO_GEOFENCES)
+    parser.add_argument('--saida', default=None, help="arquivo JSON com o resultado")
+    parser.add_argument('--comparar', nargs=2, metavar=('A', 'B'), default=None,
+                        help="compara dois arquivos de resultado e sai")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        sys.exit(0)
+    asyncio.run(principal(args))